@@ -0,0 +1,116 @@
+"""Benchmark re-arming the reset timers of many chattering motion sensors.
+
+Every simulated sensor re-arms its reset timer on each motion event, like
+`MotionWithReset` and `OccupancyWithReset` do. This compares cancelling and
+re-creating a `loop.call_later` handle per event with re-arming a timer of
+the shared `TimerWheel`:
+
+    python script/benchmark_reset_timers.py --sensors 1500 5000 --events 20
+"""
+
+import argparse
+import asyncio
+from collections.abc import Callable
+import json
+import random
+import time
+import tracemalloc
+from typing import Any
+
+from zhaquirks import TimerWheel
+
+
+class CallLaterSensor:
+    """Sensor keeping its own event loop handle, like the clusters used to."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Init."""
+        self._loop = loop
+        self._timer_handle = None
+
+    def _turn_off(self) -> None:
+        self._timer_handle = None
+
+    def motion_event(self, reset_s: float) -> None:
+        """Handle a motion event."""
+        if self._timer_handle:
+            self._timer_handle.cancel()
+        self._timer_handle = self._loop.call_later(reset_s, self._turn_off)
+
+
+class WheelSensor:
+    """Sensor re-arming a timer of the shared wheel."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Init."""
+        self._reset_timer = TimerWheel.for_loop(loop).timer(self._turn_off)
+
+    def _turn_off(self) -> None:
+        pass
+
+    def motion_event(self, reset_s: float) -> None:
+        """Handle a motion event."""
+        self._reset_timer.arm(reset_s)
+
+
+async def run_sensors(
+    factory: Callable[[asyncio.AbstractEventLoop], Any],
+    sensors: int,
+    events: int,
+    seed: int,
+) -> dict[str, Any]:
+    """Send `events` motion events to every sensor in random order."""
+    loop = asyncio.get_running_loop()
+    devices = [factory(loop) for _ in range(sensors)]
+    rng = random.Random(seed)
+    order = [
+        (device, rng.choice((30, 60, 120, 600)))
+        for device in devices
+        for _ in range(events)
+    ]
+    rng.shuffle(order)
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    for index, (device, reset_s) in enumerate(order):
+        device.motion_event(reset_s)
+        if index % sensors == 0:
+            await asyncio.sleep(0)  # let the loop run between bursts
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "events_per_second": len(order) / elapsed,
+        "peak_alloc_bytes": peak,
+        # cancelled handles stay in the loop's heap until they are due
+        "loop_scheduled_handles": len(loop._scheduled),
+    }
+
+
+def benchmark(sensors: int, events: int, seed: int) -> dict[str, Any]:
+    """Benchmark both timer implementations with a fresh event loop each."""
+    return {
+        "sensors": sensors,
+        "events": sensors * events,
+        "call_later": asyncio.run(run_sensors(CallLaterSensor, sensors, events, seed)),
+        "timer_wheel": asyncio.run(run_sensors(WheelSensor, sensors, events, seed)),
+    }
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--sensors", type=int, nargs="+", default=[1500, 5000])
+    parser.add_argument("--events", type=int, default=20, help="events per sensor")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    results = [benchmark(n, args.events, args.seed) for n in args.sensors]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
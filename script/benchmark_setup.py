@@ -0,0 +1,115 @@
+"""Benchmark cold and warm `zhaquirks.setup()` starts.
+
+Every run happens in a fresh interpreter. A cold start imports all quirks and
+writes the registry snapshot, a warm start loads quirks lazily from it. With
+`--profile`, the slowest quirk modules of a cold start are listed instead.
+"""
+
+import argparse
+import json
+import pathlib
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = pathlib.Path(__file__).parent.parent
+
+RUN = """
+import json, resource, sys, time
+
+start = time.perf_counter()
+import zhaquirks
+
+kwargs = json.loads(sys.argv[1])
+zhaquirks.setup(**kwargs)
+elapsed = time.perf_counter() - start
+
+print(json.dumps({
+    "seconds": elapsed,
+    "max_rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    "modules": sum(name.startswith("zhaquirks.") for name in sys.modules),
+}))
+"""
+
+PROFILE = """
+import json, sys
+import zhaquirks
+
+report = zhaquirks.setup(profile=True, **json.loads(sys.argv[1]))
+print(json.dumps(report.as_dict()))
+"""
+
+
+def run(code: str = RUN, **kwargs) -> dict:
+    """Run `zhaquirks.setup(**kwargs)` in a fresh interpreter."""
+    result = subprocess.run(
+        [sys.executable, "-c", code, json.dumps(kwargs)],
+        capture_output=True,
+        check=True,
+        cwd=ROOT,
+        text=True,
+    )
+    return json.loads(result.stdout)
+
+
+def summarize(name: str, runs: list[dict]) -> None:
+    """Print the median of all runs."""
+    print(
+        f"{name:<10}"
+        f" {statistics.median(r['seconds'] for r in runs) * 1000:8.1f} ms"
+        f" {statistics.median(r['max_rss_kib'] for r in runs) / 1024:8.1f} MiB"
+        f" {statistics.median(r['modules'] for r in runs):6.0f} modules"
+    )
+
+
+def print_profile(report: dict, count: int) -> None:
+    """Print the totals and the slowest modules of a profiled setup."""
+    print(
+        f"{report['seconds'] * 1000:8.1f} ms"
+        f" {report['memory_bytes'] / 1024 / 1024:8.1f} MiB"
+        f" {report['v1_quirks']} v1 quirks, {report['v2_quirks']} v2 quirks"
+    )
+    modules = sorted(report["modules"], key=lambda m: m["seconds"], reverse=True)
+    for module in modules[:count]:
+        print(
+            f"{module['seconds'] * 1000:8.1f} ms"
+            f" {module['memory_bytes'] / 1024:8.1f} KiB"
+            f" {module['v1_quirks']:4} v1 {module['v2_quirks']:4} v2"
+            f"  {module['module']}"
+        )
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--custom-quirks-path", default=None)
+    parser.add_argument("--profile", type=int, metavar="COUNT", default=None)
+    args = parser.parse_args()
+
+    if args.profile is not None:
+        report = run(PROFILE, custom_quirks_path=args.custom_quirks_path)
+        print_profile(report, args.profile)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot_path = str(pathlib.Path(tmp) / "quirk_snapshot.json")
+        kwargs = {
+            "custom_quirks_path": args.custom_quirks_path,
+            "snapshot_path": snapshot_path,
+        }
+
+        cold = []
+        for _ in range(args.runs):
+            pathlib.Path(snapshot_path).unlink(missing_ok=True)
+            cold.append(run(**kwargs))
+
+        warm = [run(**kwargs) for _ in range(args.runs)]
+
+    summarize("cold", cold)
+    summarize("warm", warm)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Benchmark decoding Tuya datapoint payloads.
+
+Compares the former if/elif chain of zigpy `deserialize` calls with the table
+driven codec used by `TuyaData.payload`:
+
+    python script/benchmark_tuya_data.py --number 200000
+"""
+
+import argparse
+import timeit
+
+import zigpy.types as t
+
+from zhaquirks.tuya import TuyaData, TuyaDPType
+
+PAYLOADS = {
+    TuyaDPType.VALUE: b"\x00\x00\x01\x27",
+    TuyaDPType.BOOL: b"\x01",
+    TuyaDPType.ENUM: b"\x02",
+    TuyaDPType.BITMAP: b"\x01\x02",
+    TuyaDPType.RAW: b"\x01\x02\x03\x04\x05\x06",
+}
+
+
+def legacy_payload(data: TuyaData):
+    """Decode a payload like `TuyaData.payload` did before the codec table."""
+    if data.dp_type == TuyaDPType.VALUE:
+        return t.int32s_be.deserialize(data.raw)[0]
+    elif data.dp_type == TuyaDPType.BOOL:
+        return t.Bool.deserialize(data.raw)[0]
+    elif data.dp_type == TuyaDPType.STRING:
+        return t.CharacterString(data.raw.decode("utf8"))
+    elif data.dp_type == TuyaDPType.ENUM:
+        return t.enum8.deserialize(data.raw)[0]
+    elif data.dp_type == TuyaDPType.BITMAP:
+        bitmaps = {1: t.bitmap8, 2: t.bitmap16, 4: t.bitmap32}
+        try:
+            return bitmaps[len(data.raw)].deserialize(data.raw)[0]
+        except KeyError as exc:
+            raise ValueError(f"Wrong bitmap length: {len(data.raw)}") from exc
+    elif data.dp_type == TuyaDPType.RAW:
+        return data.raw
+    else:
+        raise ValueError(f"Unknown {data.dp_type} datapoint type")
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=200_000)
+    args = parser.parse_args()
+
+    print(f"{'type':<8} {'legacy':>10} {'codec':>10}  (ns/decode)")
+    for dp_type, raw in PAYLOADS.items():
+        data = TuyaData()
+        data.dp_type = dp_type
+        data.raw = raw
+        assert legacy_payload(data) == data.payload
+
+        namespace = {"data": data, "legacy_payload": legacy_payload}
+        results = [
+            timeit.timeit(stmt, number=args.number, globals=namespace)
+            for stmt in ("legacy_payload(data)", "data.payload")
+        ]
+        print(
+            f"{dp_type.name:<8}"
+            + "".join(f" {r / args.number * 1e9:10.0f}" for r in results)
+        )
+
+
+if __name__ == "__main__":
+    main()
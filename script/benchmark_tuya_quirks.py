@@ -0,0 +1,235 @@
+"""Benchmark the datapoint handling of every `TuyaQuirkBuilder` quirk.
+
+Each quirk is applied to a device of a mock application. A `get_data` frame is
+synthesized for every datapoint of its `tuya_dp_to_attribute` mapping, with a
+payload matching the type of the mapped attribute, and fed through the Tuya
+cluster. Results are written as JSON, to compare runs over time:
+
+    python script/benchmark_tuya_quirks.py --output before.json
+"""
+
+import argparse
+import asyncio
+import enum
+import json
+import pathlib
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Any
+from unittest import mock
+
+import zigpy.device
+import zigpy.quirks
+import zigpy.types as t
+from zigpy.zcl import foundation
+from zigpy.zcl.clusters.general import Basic
+from zigpy.zdo.types import NodeDescriptor
+
+import zhaquirks
+from zhaquirks.tuya import (
+    TUYA_GET_DATA,
+    TuyaCommand,
+    TuyaData,
+    TuyaDatapointData,
+    TuyaDPType,
+)
+from zhaquirks.tuya.mcu import TuyaMCUCluster
+
+IEEE = t.EUI64.convert("01:02:03:04:05:06:07:08")
+
+
+def tuya_entries(registry) -> list[tuple[str, str, type[TuyaMCUCluster]]]:
+    """Return manufacturer, model and Tuya cluster of every quirk built by TuyaQuirkBuilder."""
+    entries = {}
+    for entries_by_model in registry.registry_v2.values():
+        for entry in entries_by_model:
+            for replace in entry.replaces_metadata:
+                cluster = replace.add.cluster
+                if (
+                    isinstance(cluster, type)
+                    and issubclass(cluster, TuyaMCUCluster)
+                    and cluster.dp_to_attribute
+                ):
+                    signature = entry.manufacturer_model_metadata[0]
+                    entries[id(entry)] = (
+                        signature.manufacturer,
+                        signature.model,
+                        cluster,
+                    )
+    return sorted(entries.values(), key=lambda entry: entry[:2])
+
+
+def create_device(manufacturer: str, model: str) -> zigpy.device.Device:
+    """Create a quirked device for the mock application."""
+    raw_device = zigpy.device.Device(mock.MagicMock(), IEEE, t.NWK(0x1234))
+    raw_device.manufacturer = manufacturer
+    raw_device.model = model
+    raw_device.node_desc = NodeDescriptor(manufacturer_code=1234)
+    raw_device.add_endpoint(1).add_input_cluster(Basic.cluster_id)
+    return zigpy.quirks.get_device(raw_device)
+
+
+def synthesize_data(attr_type: type) -> TuyaData:
+    """Create a datapoint value fitting an attribute type."""
+    data = TuyaData()
+    if issubclass(attr_type, t.Bool | bool):
+        data.dp_type, data.raw = TuyaDPType.BOOL, b"\x01"
+    elif issubclass(attr_type, enum.Enum):
+        data.dp_type = TuyaDPType.ENUM
+        data.raw = int(next(iter(attr_type))).to_bytes(1, "big")
+    elif issubclass(attr_type, str):
+        data.dp_type, data.raw = TuyaDPType.STRING, b"bench"
+    elif issubclass(attr_type, bytes):
+        data.dp_type, data.raw = TuyaDPType.RAW, bytes(range(8))
+    else:
+        data.dp_type, data.raw = TuyaDPType.VALUE, (1).to_bytes(4, "big")
+    return data
+
+
+def synthesize_frames(cluster: TuyaMCUCluster) -> tuple[list[bytes], list[int]]:
+    """Build a valid get_data frame for every datapoint the cluster handles.
+
+    Returns the frames and the datapoints no valid frame could be built for.
+    """
+    frames, invalid = [], []
+    for tsn, (dp, mappings) in enumerate(sorted(cluster.dp_to_attribute.items())):
+        mapping = mappings[0]
+        attribute_name = mapping.attribute_name
+        if isinstance(attribute_name, tuple):
+            attribute_name = attribute_name[0]
+        try:
+            endpoint = cluster.endpoint.device.endpoints[mapping.endpoint_id or 1]
+            target = getattr(endpoint, mapping.ep_attribute)
+            attr_type = target.find_attribute(attribute_name).type
+            command = TuyaCommand(
+                status=0,
+                tsn=tsn,
+                datapoints=[TuyaDatapointData(dp, synthesize_data(attr_type))],
+            )
+            hdr = foundation.ZCLHeader.cluster(
+                tsn, TUYA_GET_DATA, direction=foundation.Direction.Server_to_Client
+            )
+            frame = hdr.serialize() + command.serialize()
+            hdr, args = cluster.deserialize(frame)
+            cluster.handle_message(hdr, args)
+        except Exception:
+            invalid.append(dp)
+            continue
+        frames.append(frame)
+    return frames, invalid
+
+
+def handle_frames(cluster: TuyaMCUCluster, frames: list[bytes]) -> None:
+    """Receive frames like they came from the radio."""
+    for frame in frames:
+        hdr, args = cluster.deserialize(frame)
+        cluster.handle_message(hdr, args)
+
+
+def benchmark(
+    manufacturer: str, model: str, cluster_type: type, repeat: int
+) -> dict[str, Any]:
+    """Benchmark a single quirk."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    device = create_device(manufacturer, model)
+    device_bytes = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    cluster = next(
+        (
+            cluster
+            for endpoint_id, endpoint in device.endpoints.items()
+            if endpoint_id
+            for cluster in endpoint.in_clusters.values()
+            if isinstance(cluster, cluster_type)
+        ),
+        None,
+    )
+    result = {
+        "manufacturer": manufacturer,
+        "model": model,
+        "device_bytes": device_bytes,
+    }
+    if cluster is None:
+        return result | {"error": "quirk not applied"}
+
+    frames, invalid = synthesize_frames(cluster)
+    result |= {"datapoints": len(frames), "invalid_datapoints": invalid}
+    if not frames:
+        return result
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        handle_frames(cluster, frames)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    peaks = []
+    blocks = sys.getallocatedblocks()
+    for frame in frames:
+        tracemalloc.reset_peak()
+        current = tracemalloc.get_traced_memory()[0]
+        handle_frames(cluster, [frame])
+        peaks.append(tracemalloc.get_traced_memory()[1] - current)
+    retained_blocks = sys.getallocatedblocks() - blocks
+    tracemalloc.stop()
+
+    return result | {
+        "datapoints_per_second": len(frames) * repeat / elapsed,
+        "alloc_bytes_per_frame": statistics.fmean(peaks),
+        "retained_blocks_per_frame": retained_blocks / len(frames),
+    }
+
+
+async def run(args: argparse.Namespace) -> dict[str, Any]:
+    """Benchmark all matching quirks."""
+    zhaquirks.setup(packages=["tuya"])
+    results = [
+        benchmark(manufacturer, model, cluster_type, args.repeat)
+        for manufacturer, model, cluster_type in tuya_entries(
+            zigpy.quirks.DEVICE_REGISTRY
+        )
+        if args.filter is None or args.filter in f"{manufacturer} {model}"
+    ]
+    rates = [
+        r["datapoints_per_second"] for r in results if "datapoints_per_second" in r
+    ]
+    return {
+        "python": sys.version.split()[0],
+        "repeat": args.repeat,
+        "quirks": len(results),
+        "datapoints": sum(r.get("datapoints", 0) for r in results),
+        "median_datapoints_per_second": statistics.median(rates) if rates else None,
+        "results": results,
+    }
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--repeat", type=int, default=100)
+    parser.add_argument(
+        "--filter", help="only quirks with a matching manufacturer or model"
+    )
+    parser.add_argument("--output", type=pathlib.Path, help="write JSON to this file")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    output = json.dumps(report, indent=2)
+    if args.output is None:
+        print(output)
+    else:
+        args.output.write_text(output + "\n")
+        print(
+            f"{report['quirks']} quirks, {report['datapoints']} datapoints,"
+            f" median {report['median_datapoints_per_second']:.0f} datapoints/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Benchmark parsing of ambiguous Xiaomi attribute reports.
+
+Some Xiaomi devices send attribute reports with wrong string lengths, which are
+repaired by trying lengths off by one. A report of empty strings whose length
+bytes can also be read as one byte long has a number of valid interpretations
+growing like the Fibonacci sequence. This compares the previous recursive
+repair, enumerating all of them, with the current one:
+
+    python script/benchmark_xiaomi_reports.py --attributes 5 10 15 20
+"""
+
+import argparse
+from collections.abc import Iterable
+import json
+import timeit
+from typing import Any
+from unittest import mock
+
+from zigpy.zcl import foundation
+
+from zhaquirks.xiaomi import BasicCluster, XiaomiCluster
+
+# attribute 0xFF01 holding an empty string, its length byte 0 is also parsed as 1
+AMBIGUOUS_ATTRIBUTE = b"\x01\xff\x42\x00"
+
+
+def legacy_interpret(
+    cluster: XiaomiCluster, data: bytes
+) -> Iterable[tuple[foundation.Attribute, ...]]:
+    """Yield all valid interpretations of a report, like the previous parser."""
+    if not data:
+        yield ()
+        return
+
+    try:
+        parsed = list(cluster._iter_parse_attr_report(data))
+    except (KeyError, ValueError):
+        return
+
+    for attr, remaining_data in parsed:
+        for remaining_attrs in legacy_interpret(cluster, remaining_data):
+            yield (attr,) + remaining_attrs
+
+
+def benchmark(cluster: XiaomiCluster, attributes: int, number: int) -> dict[str, Any]:
+    """Time both parsers on a report with a number of ambiguous attributes."""
+    data = AMBIGUOUS_ATTRIBUTE * attributes
+    report, interpretations = cluster._interpret_attr_reports(data, count=True)
+    assert report == next(legacy_interpret(cluster, data))
+
+    legacy = timeit.timeit(lambda: list(legacy_interpret(cluster, data)), number=number)
+    linear = timeit.timeit(
+        lambda: cluster._interpret_attr_reports(data, count=True), number=number
+    )
+    return {
+        "attributes": attributes,
+        "interpretations": interpretations,
+        "legacy_seconds": legacy / number,
+        "linear_seconds": linear / number,
+        "speedup": legacy / linear,
+    }
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--attributes", type=int, nargs="+", default=[1, 5, 10, 15, 20])
+    parser.add_argument("--number", type=int, default=5)
+    args = parser.parse_args()
+
+    cluster = BasicCluster(mock.MagicMock())
+    results = [benchmark(cluster, n, args.number) for n in args.attributes]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,9 @@
+"""Regenerate `zhaquirks/quirk_manifest.json` used by `zhaquirks.setup(lazy=True)`."""
+
+import zhaquirks
+from zhaquirks.loader import MANIFEST_PATH
+
+if __name__ == "__main__":
+    zhaquirks.setup()
+    zhaquirks.build_quirk_manifest().save(MANIFEST_PATH)
+    print(f"Wrote {MANIFEST_PATH}")
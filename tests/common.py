@@ -2,6 +2,7 @@
 
 import asyncio
 import datetime
+import math
 
 ZCL_IAS_MOTION_COMMAND = b"\t!\x00\x01\x00\x00\x00\x00\x00"
 ZCL_OCC_ATTR_RPT_OCC = b"\x18d\n\x00\x00\x18\x01"
@@ -41,6 +42,26 @@ class MockDatetime(datetime.datetime):
         return cls(1970, 1, 1, 2, 0, 0)
 
 
+class FakeClock:
+    """Event loop clock only advancing when told to."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Init instance, starting at the next whole second of the loop clock."""
+        self.loop = loop
+        self.now = float(math.ceil(loop.time()))
+
+    def time(self) -> float:
+        """Return the current time."""
+        return self.now
+
+    async def advance(self, seconds: float = 0) -> None:
+        """Advance the clock, running the callbacks due until then."""
+        self.now += seconds
+        # callbacks that are due may schedule further due callbacks
+        for _ in range(3):
+            await asyncio.sleep(0)
+
+
 async def wait_for_zigpy_tasks() -> None:
     """Wait for all running zigpy tasks to finish."""
     tasks = []
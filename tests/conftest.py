@@ -1,6 +1,7 @@
 """Fixtures for all tests."""
 
-from unittest.mock import AsyncMock, Mock
+import asyncio
+from unittest.mock import AsyncMock, Mock, patch
 
 import pytest
 import zigpy.application
@@ -24,6 +25,7 @@ from zhaquirks.const import (
 )
 
 from .async_mock import sentinel
+from .common import FakeClock
 
 
 class MockApp(zigpy.application.ControllerApplication):
@@ -274,3 +276,14 @@ def assert_signature_matches_quirk():
         assert isinstance(device, quirk)
 
     return _check
+
+
+@pytest.fixture
+async def fake_clock():
+    """Replace the event loop clock and `time.monotonic` with a fake clock."""
+    clock = FakeClock(asyncio.get_running_loop())
+    with (
+        patch.object(clock.loop, "time", clock.time),
+        patch("time.monotonic", clock.time),
+    ):
+        yield clock
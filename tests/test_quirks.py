@@ -2,10 +2,14 @@
 
 from __future__ import annotations
 
+import asyncio
 import collections
 import importlib
 import json
 from pathlib import Path
+import sys
+import tracemalloc
+from types import ModuleType
 from unittest import mock
 
 import pytest
@@ -53,6 +57,13 @@ from zhaquirks.const import (
     SKIP_CONFIGURATION,
 )
 import zhaquirks.konke
+from zhaquirks.loader import (
+    CustomQuirksReload,
+    LazyQuirkLoader,
+    QuirkManifest,
+    QuirkSnapshot,
+    RegistryWatcher,
+)
 import zhaquirks.philips
 from zhaquirks.xiaomi import XIAOMI_NODE_DESC
 import zhaquirks.xiaomi.aqara.vibration_aq1
@@ -473,30 +484,7 @@ def test_quirk_loading_error(tmp_path: Path, caplog) -> None:
     assert "cannot import name 'foobarbaz7' from 'os'" in caplog.text
 
 
-def test_custom_quirk_loading(
-    zigpy_device_from_quirk: CustomDevice, tmp_path: Path
-) -> None:
-    """Make sure custom quirks take priority over regular quirks."""
-
-    device = zigpy_device_from_quirk(
-        zhaquirks.bosch.motion.ISWZPR1WP13, apply_quirk=False
-    )
-    assert type(device) is zigpy.device.Device
-
-    # Make sure our target quirk will load after we re-setup zhaquirks
-    zhaquirks.setup()
-    assert type(zq.get_device(device)) is zhaquirks.bosch.motion.ISWZPR1WP13
-
-    custom_quirks = tmp_path / "custom_zha_quirks"
-    custom_quirks.mkdir()
-
-    # Make our own custom quirk
-    (custom_quirks / "__init__.py").touch()
-
-    (custom_quirks / "bosch").mkdir()
-    (custom_quirks / "bosch/__init__.py").touch()
-    (custom_quirks / "bosch/custom_quirk.py").write_text(
-        '''
+CUSTOM_BOSCH_QUIRK = '''
 """Device handler for Bosch motion sensors."""
 from zigpy.profiles import zha
 from zigpy.quirks import CustomDevice
@@ -561,7 +549,31 @@ class TestReplacementISWZPR1WP13(CustomDevice):
         }
     }
 '''
+
+
+def test_custom_quirk_loading(
+    zigpy_device_from_quirk: CustomDevice, tmp_path: Path
+) -> None:
+    """Make sure custom quirks take priority over regular quirks."""
+
+    device = zigpy_device_from_quirk(
+        zhaquirks.bosch.motion.ISWZPR1WP13, apply_quirk=False
     )
+    assert type(device) is zigpy.device.Device
+
+    # Make sure our target quirk will load after we re-setup zhaquirks
+    zhaquirks.setup()
+    assert type(zq.get_device(device)) is zhaquirks.bosch.motion.ISWZPR1WP13
+
+    custom_quirks = tmp_path / "custom_zha_quirks"
+    custom_quirks.mkdir()
+
+    # Make our own custom quirk
+    (custom_quirks / "__init__.py").touch()
+
+    (custom_quirks / "bosch").mkdir()
+    (custom_quirks / "bosch/__init__.py").touch()
+    (custom_quirks / "bosch/custom_quirk.py").write_text(CUSTOM_BOSCH_QUIRK)
 
     zhaquirks.setup(custom_quirks_path=str(custom_quirks))
 
@@ -873,3 +885,491 @@ async def test_local_data_cluster(device_mock) -> None:
         {2: None},
         {},
     )
+
+
+def test_quirk_manifest_up_to_date() -> None:
+    """Ensure the shipped quirk manifest matches the registered quirks."""
+
+    assert zhaquirks.build_quirk_manifest() == QuirkManifest.load(), (
+        "Quirk manifest is outdated, run `script/generate_quirk_manifest.py`"
+    )
+
+
+def test_lazy_quirk_loader(zigpy_device_from_quirk) -> None:
+    """Ensure the lazy loader only imports modules for devices being looked up."""
+    registry = DeviceRegistry()
+    manifest = QuirkManifest.load()
+    imported = []
+
+    def import_module(name: str) -> ModuleType:
+        """Register the v1 quirks of an already imported module with `registry`."""
+        imported.append(name)
+        module = importlib.import_module(name)
+        for quirk in vars(module).values():
+            if quirk in ALL_QUIRK_CLASSES and quirk.__module__ == name:
+                registry.add_to_registry(quirk)
+        return module
+
+    loader = LazyQuirkLoader(manifest, registry, import_module=import_module)
+    loader.install()
+    assert imported == manifest.eager
+
+    device = zigpy_device_from_quirk(
+        zhaquirks.bosch.motion.ISWZPR1WP13, apply_quirk=False
+    )
+    assert type(registry.get_device(device)) is zhaquirks.bosch.motion.ISWZPR1WP13
+    assert "zhaquirks.bosch.motion" in loader.loaded_modules
+    assert "zhaquirks.tuya.ts0601_trv" not in loader.loaded_modules
+
+    # modules are only imported once
+    imported.clear()
+    registry.get_device(device)
+    assert imported == []
+
+    loader.uninstall()
+    assert LazyQuirkLoader.installed(registry) is None
+
+
+def test_lazy_quirk_loader_priority() -> None:
+    """Ensure quirks imported out of order keep their registry priority."""
+    registry = DeviceRegistry()
+    manifest = QuirkManifest(
+        modules=["first", "second"],
+        quirks={("manuf", "model"): ["second", "first"]},
+    )
+
+    quirks = {}
+    for name in ("custom", "first", "second"):
+        # set the signature afterwards to keep the quirk out of the global registry
+        quirks[name] = type(f"Quirk{name}", (CustomDevice,), {"__module__": name})
+        quirks[name].signature = {MODELS_INFO: [("manuf", "model")]}
+
+    registry.add_to_registry(quirks["custom"])
+    loader = LazyQuirkLoader(
+        manifest,
+        registry,
+        import_module=lambda name: registry.add_to_registry(quirks[name]),
+    )
+    loader.load_modules(["second"])
+    loader.load_modules(["first"])
+
+    assert list(registry.registry_v1["manuf"]["model"]) == [
+        quirks["custom"],
+        quirks["second"],
+        quirks["first"],
+    ]
+
+
+def test_setup_lazy() -> None:
+    """Ensure lazy setup installs the loader and eager setup removes it again."""
+
+    zhaquirks.setup(lazy=True)
+    loader = LazyQuirkLoader.installed(zq.DEVICE_REGISTRY)
+    assert loader is not None
+    assert set(loader.manifest.eager) <= loader.loaded_modules
+
+    zhaquirks.setup()
+    assert LazyQuirkLoader.installed(zq.DEVICE_REGISTRY) is None
+
+
+def test_setup_profile(tmp_path: Path) -> None:
+    """Ensure profiling reports the cost and quirks of every imported module."""
+
+    custom_quirks = tmp_path / "custom_zha_quirks"
+    custom_quirks.mkdir()
+    (custom_quirks / "bosch_quirk.py").write_text(CUSTOM_BOSCH_QUIRK)
+
+    assert zhaquirks.setup() is None
+
+    report = zhaquirks.setup(custom_quirks_path=str(custom_quirks), profile=True)
+    stats = {module.module: module for module in report.modules}
+
+    assert len(stats) == len(zhaquirks.quirk_modules()) + 1
+    assert stats["bosch_quirk"].v1_quirks == 1
+    assert stats["bosch_quirk"].v2_quirks == 0
+    assert stats["bosch_quirk"].memory_bytes > 0
+    assert report.v1_quirks == 1
+    assert report.slowest(1)[0].seconds == max(s.seconds for s in report.modules)
+    assert report.seconds >= sum(s.seconds for s in report.modules)
+    assert json.loads(json.dumps(report.as_dict()))["v1_quirks"] == 1
+    assert not tracemalloc.is_tracing()
+    # the registry is not watched after profiling
+    assert RegistryWatcher.installed(zq.DEVICE_REGISTRY) is None
+
+    # only the eager modules are imported by a lazy setup
+    report = zhaquirks.setup(lazy=True, profile=True)
+    loader = LazyQuirkLoader.installed(zq.DEVICE_REGISTRY)
+    assert [s.module for s in report.modules] == list(loader.manifest.eager)
+
+    zq.DEVICE_REGISTRY.purge_custom_quirks(custom_quirks)
+    zhaquirks.setup()
+
+
+def test_setup_profile_exclusive(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Ensure modules imported by a quirk module are not charged to it."""
+
+    helpers = tmp_path / "helpers"
+    helpers.mkdir()
+    (helpers / "profiled_helper.py").write_text("PAYLOAD = bytearray(4_000_000)\n")
+    monkeypatch.syspath_prepend(str(helpers))
+
+    custom_quirks = tmp_path / "custom_zha_quirks"
+    custom_quirks.mkdir()
+    (custom_quirks / "bosch_quirk.py").write_text(
+        "import profiled_helper\n" + CUSTOM_BOSCH_QUIRK
+    )
+
+    meta_path = list(sys.meta_path)
+    try:
+        report = zhaquirks.setup(custom_quirks_path=str(custom_quirks), profile=True)
+    finally:
+        sys.modules.pop("profiled_helper", None)
+
+    stats = {module.module: module for module in report.modules}
+    assert stats["profiled_helper"].memory_bytes >= 4_000_000
+    assert stats["profiled_helper"].v1_quirks == 0
+    assert stats["bosch_quirk"].memory_bytes < 4_000_000
+    assert stats["bosch_quirk"].v1_quirks == 1
+    assert sys.meta_path == meta_path
+
+    # the lazy loader keeps importing modules after setup without profiling them
+    report = zhaquirks.setup(lazy=True, profile=True)
+    loader = LazyQuirkLoader.installed(zq.DEVICE_REGISTRY)
+    loader.load_modules(loader.manifest.modules)
+    assert [s.module for s in report.modules] == list(loader.manifest.eager)
+    assert not tracemalloc.is_tracing()
+
+    zq.DEVICE_REGISTRY.purge_custom_quirks(custom_quirks)
+    zhaquirks.setup()
+
+
+def test_registry_watcher() -> None:
+    """Ensure the registry watcher counts quirks and registry changes."""
+
+    registry = DeviceRegistry()
+    watcher = RegistryWatcher.for_registry(registry)
+    assert RegistryWatcher.for_registry(registry) is watcher
+    assert RegistryWatcher.installed(DeviceRegistry()) is None
+
+    (
+        QuirkBuilder("manufacturer", "model", registry=registry)
+        .also_applies_to("manufacturer", "model2")
+        .add_to_registry()
+    )
+    assert (watcher.v1_added, watcher.v2_added) == (0, 1)
+
+    generation = watcher.generation
+    registry.purge_custom_quirks(Path("/nonexistent"))
+    assert watcher.generation > generation
+
+    watcher.uninstall()
+    assert RegistryWatcher.installed(registry) is None
+    assert "add_to_registry" not in vars(registry)
+    QuirkBuilder("manufacturer", "model3", registry=registry).add_to_registry()
+    assert watcher.v2_added == 1
+
+
+def test_setup_snapshot(
+    zigpy_device_from_quirk: CustomDevice, tmp_path: Path, caplog
+) -> None:
+    """Ensure warm starts load quirks lazily from the snapshot."""
+
+    device = zigpy_device_from_quirk(
+        zhaquirks.bosch.motion.ISWZPR1WP13, apply_quirk=False
+    )
+
+    custom_quirks = tmp_path / "custom_zha_quirks"
+    custom_quirks.mkdir()
+    (custom_quirks / "__init__.py").touch()
+    (custom_quirks / "bosch").mkdir()
+    (custom_quirks / "bosch/__init__.py").touch()
+    (custom_quirks / "bosch/custom_quirk.py").write_text(CUSTOM_BOSCH_QUIRK)
+    snapshot = tmp_path / "quirk_snapshot.json"
+
+    # cold start imports all quirks and writes the snapshot
+    zhaquirks.setup(custom_quirks_path=str(custom_quirks), snapshot_path=str(snapshot))
+    assert snapshot.exists()
+    assert "Loaded custom quirks" in caplog.text
+    assert LazyQuirkLoader.installed(zq.DEVICE_REGISTRY) is None
+    assert type(zq.get_device(device)).__name__ == "TestReplacementISWZPR1WP13"
+
+    # warm start doesn't import custom quirks until a matching device is looked up
+    caplog.clear()
+    with mock.patch("zhaquirks.load_custom_quirks") as load_custom_quirks:
+        zhaquirks.setup(
+            custom_quirks_path=str(custom_quirks), snapshot_path=str(snapshot)
+        )
+
+    assert load_custom_quirks.call_count == 0
+    assert "Loaded custom quirks" in caplog.text
+    loader = LazyQuirkLoader.installed(zq.DEVICE_REGISTRY)
+    assert loader is not None
+    assert "bosch.custom_quirk" in loader.manifest.paths
+    assert "bosch.custom_quirk" not in loader.loaded_modules
+    assert type(zq.get_device(device)).__name__ == "TestReplacementISWZPR1WP13"
+    assert "bosch.custom_quirk" in loader.loaded_modules
+
+    # changing a custom quirk invalidates the snapshot
+    (custom_quirks / "bosch/custom_quirk.py").write_text(
+        CUSTOM_BOSCH_QUIRK.replace("TestReplacement", "ChangedReplacement")
+    )
+    zhaquirks.setup(custom_quirks_path=str(custom_quirks), snapshot_path=str(snapshot))
+    assert LazyQuirkLoader.installed(zq.DEVICE_REGISTRY) is None
+    assert type(zq.get_device(device)).__name__ == "ChangedReplacementISWZPR1WP13"
+
+    zq.DEVICE_REGISTRY.purge_custom_quirks(custom_quirks)
+    assert type(zq.get_device(device)) is zhaquirks.bosch.motion.ISWZPR1WP13
+
+
+def test_setup_snapshot_packages(
+    zigpy_device_from_quirk: CustomDevice, tmp_path: Path
+) -> None:
+    """Ensure a cold start honours packages but still writes a full snapshot."""
+
+    device = zigpy_device_from_quirk(
+        zhaquirks.bosch.motion.ISWZPR1WP13, apply_quirk=False
+    )
+
+    custom_quirks = tmp_path / "custom_zha_quirks"
+    custom_quirks.mkdir()
+    (custom_quirks / "bosch_quirk.py").write_text(CUSTOM_BOSCH_QUIRK)
+    snapshot = tmp_path / "quirk_snapshot.json"
+
+    zhaquirks.setup(
+        custom_quirks_path=str(custom_quirks),
+        snapshot_path=str(snapshot),
+        packages=["bosch"],
+    )
+    loader = LazyQuirkLoader.installed(zq.DEVICE_REGISTRY)
+    assert loader is not None
+    assert loader.loaded_modules
+    assert all(m.startswith("zhaquirks.bosch.") for m in loader.loaded_modules)
+    assert type(zq.get_device(device)).__name__ == "TestReplacementISWZPR1WP13"
+
+    shipped = QuirkManifest.load()
+    manifest = QuirkSnapshot.load(snapshot).manifest
+    assert manifest.modules == [*shipped.modules, "bosch_quirk"]
+    assert manifest.eager == shipped.eager
+    assert manifest.quirks[(zhaquirks.bosch.BOSCH, "ISW-ZPR1-WP13")] == [
+        "bosch_quirk",
+        *shipped.quirks[(zhaquirks.bosch.BOSCH, "ISW-ZPR1-WP13")],
+    ]
+    assert manifest.paths == {"bosch_quirk": str(custom_quirks / "bosch_quirk.py")}
+
+    zq.DEVICE_REGISTRY.purge_custom_quirks(custom_quirks)
+    zhaquirks.setup()
+
+
+def test_quirk_snapshot_unreadable(tmp_path: Path) -> None:
+    """Ensure broken snapshots are ignored."""
+
+    assert QuirkSnapshot.load(tmp_path / "missing.json") is None
+
+    (tmp_path / "broken.json").write_text("{")
+    assert QuirkSnapshot.load(tmp_path / "broken.json") is None
+
+    (tmp_path / "other.json").write_text("{}")
+    assert QuirkSnapshot.load(tmp_path / "other.json") is None
+
+
+def test_reload_custom_quirks(
+    zigpy_device_from_quirk: CustomDevice, tmp_path: Path
+) -> None:
+    """Ensure only changed custom quirk modules are re-executed."""
+
+    device = zigpy_device_from_quirk(
+        zhaquirks.bosch.motion.ISWZPR1WP13, apply_quirk=False
+    )
+
+    custom_quirks = tmp_path / "custom_zha_quirks"
+    custom_quirks.mkdir()
+    (custom_quirks / "__init__.py").touch()
+    (custom_quirks / "bosch").mkdir()
+    (custom_quirks / "bosch/__init__.py").touch()
+    (custom_quirks / "bosch/custom_quirk.py").write_text(CUSTOM_BOSCH_QUIRK)
+    (custom_quirks / "other.py").write_text('"""Unrelated custom quirk."""')
+
+    zhaquirks.setup(custom_quirks_path=str(custom_quirks))
+    assert type(zq.get_device(device)).__name__ == "TestReplacementISWZPR1WP13"
+    other = sys.modules["other"]
+
+    # nothing changed
+    assert zhaquirks.reload_custom_quirks(str(custom_quirks)) == CustomQuirksReload()
+
+    # only the changed module is executed again and its quirk is replaced
+    (custom_quirks / "bosch/custom_quirk.py").write_text(
+        CUSTOM_BOSCH_QUIRK.replace("TestReplacement", "ChangedReplacement")
+    )
+    (custom_quirks / "new.py").write_text('"""New custom quirk."""')
+    assert zhaquirks.reload_custom_quirks(str(custom_quirks)) == CustomQuirksReload(
+        added=["new"], changed=["bosch.custom_quirk"]
+    )
+    assert sys.modules["other"] is other
+    assert type(zq.get_device(device)).__name__ == "ChangedReplacementISWZPR1WP13"
+    assert not any(
+        quirk.__name__ == "TestReplacementISWZPR1WP13"
+        for quirk in zq.DEVICE_REGISTRY.registry_v1[zhaquirks.bosch.BOSCH][
+            "ISW-ZPR1-WP13"
+        ]
+    )
+
+    # broken modules are reported
+    (custom_quirks / "new.py").write_text("1/")
+    assert zhaquirks.reload_custom_quirks(str(custom_quirks)) == CustomQuirksReload(
+        failed=["new"]
+    )
+
+    # removed modules have their quirks removed
+    (custom_quirks / "bosch/custom_quirk.py").unlink()
+    assert zhaquirks.reload_custom_quirks(str(custom_quirks)) == CustomQuirksReload(
+        removed=["bosch.custom_quirk"]
+    )
+    assert type(zq.get_device(device)) is zhaquirks.bosch.motion.ISWZPR1WP13
+
+    zq.DEVICE_REGISTRY.purge_custom_quirks(custom_quirks)
+
+
+def test_quirk_manifest_filter() -> None:
+    """Ensure manifests can be restricted to packages and devices."""
+    manifest = QuirkManifest(
+        modules=[
+            "zhaquirks.tuya.plug",
+            "zhaquirks.tuya.wildcard",
+            "zhaquirks.xbee.io",
+            "zhaquirks.xiaomi",
+            "zhaquirks.xiaomi.motion",
+            "custom",
+        ],
+        eager=["zhaquirks.xiaomi", "zhaquirks.xiaomi.motion"],
+        quirks={
+            ("_TZ3000", "TS011F"): ["zhaquirks.tuya.plug"],
+            (None, "TS011F"): ["zhaquirks.tuya.wildcard"],
+            (None, None): ["zhaquirks.xbee.io"],
+            ("LUMI", "lumi.motion"): ["zhaquirks.xiaomi.motion"],
+            ("Custom", "custom"): ["custom"],
+        },
+        paths={"custom": "/config/custom_quirks/custom.py"},
+    )
+
+    assert manifest.filter() is manifest
+
+    filtered = manifest.filter(packages=["tuya"])
+    assert filtered.modules == [
+        "zhaquirks.tuya.plug",
+        "zhaquirks.tuya.wildcard",
+        "custom",
+    ]
+    assert filtered.eager == []
+
+    filtered = manifest.filter(
+        device_filter=lambda manufacturer, model: manufacturer in ("_TZ3000", "LUMI")
+    )
+    assert filtered.modules == [
+        "zhaquirks.tuya.plug",
+        "zhaquirks.xiaomi",
+        "zhaquirks.xiaomi.motion",
+        "custom",
+    ]
+    assert filtered.eager == ["zhaquirks.xiaomi", "zhaquirks.xiaomi.motion"]
+    assert filtered.modules_for("_TZ3000", "TS011F") == ["zhaquirks.tuya.plug"]
+
+
+def test_setup_packages(zigpy_device_from_quirk: CustomDevice) -> None:
+    """Ensure setup only loads allowed packages and reports matching modules."""
+
+    device = zigpy_device_from_quirk(
+        zhaquirks.bosch.motion.ISWZPR1WP13, apply_quirk=False
+    )
+
+    zhaquirks.setup(packages=["bosch"])
+    loader = LazyQuirkLoader.installed(zq.DEVICE_REGISTRY)
+    assert loader is not None
+    assert loader.loaded_modules
+    assert all(m.startswith("zhaquirks.bosch.") for m in loader.loaded_modules)
+
+    assert type(zq.get_device(device)) is zhaquirks.bosch.motion.ISWZPR1WP13
+    report = zhaquirks.quirk_match_report()
+    assert report["zhaquirks.bosch.motion"] == 1
+    assert report.keys() == loader.loaded_modules
+    assert sum(report.values()) == 1
+
+    zhaquirks.setup()
+    assert zhaquirks.quirk_match_report() == {}
+
+
+def test_keyed_bus_routing():
+    """Test keyed bus events only reach the listeners of their key."""
+
+    bus = zhaquirks.KeyedBus()
+    listeners = {key: mock.MagicMock() for key in (1, 2, None)}
+    for key, listener in listeners.items():
+        bus.add_listener(listener, key=key)
+
+    bus.route_event(2, "switch_event", 2, 1)
+    assert not listeners[1].switch_event.called
+    listeners[2].switch_event.assert_called_once_with(2, 1)
+    listeners[None].switch_event.assert_called_once_with(2, 1)
+
+    # unrouted events still reach every listener
+    bus.listener_event("cover_event", 5)
+    for listener in listeners.values():
+        listener.cover_event.assert_called_once_with(5)
+
+    bus.remove_listener(listeners[2])
+    bus.route_event(2, "switch_event", 2, 0)
+    assert listeners[2].switch_event.call_count == 1
+    assert listeners[None].switch_event.call_count == 2
+
+
+async def test_timer_wheel(fake_clock):
+    """Test timers of the shared wheel fire once per deadline and can be re-armed."""
+
+    loop = asyncio.get_running_loop()
+    assert zhaquirks.TimerWheel.for_loop() is zhaquirks.TimerWheel.for_loop(loop)
+
+    start = fake_clock.now
+    fired = []
+    wheel = zhaquirks.TimerWheel(loop, tick=1, slots=4)
+    early, late, cancelled, short = (
+        wheel.timer(lambda name=name: fired.append((name, fake_clock.now - start)))
+        for name in ("early", "late", "cancelled", "short")
+    )
+
+    early.arm(2)
+    late.arm(2)
+    cancelled.arm(3)
+    short.arm(0.5)
+    # re-arming replaces the deadline, which may be more than a turn of the wheel away
+    late.arm(9)
+    cancelled.cancel()
+    assert len(wheel) == 2
+    assert not cancelled.armed
+
+    await fake_clock.advance(0.5)
+    assert fired == [("short", 0.5)]
+
+    await fake_clock.advance(0.5)
+    for _ in range(7):
+        await fake_clock.advance(1)
+    assert fired == [("short", 0.5), ("early", 2)]
+    assert late.armed
+
+    await fake_clock.advance(1)
+    assert fired == [("short", 0.5), ("early", 2), ("late", 9)]
+    assert len(wheel) == 0
+
+    # timers fire at most one tick late
+    early.arm(1.5)
+    await fake_clock.advance(1.5)
+    assert fired[-1] == ("late", 9)
+    await fake_clock.advance(0.5)
+    assert fired[-1] == ("early", 11)
+
+    # a loop blocked for several turns of the wheel fires every timer once
+    early.arm(2)
+    late.arm(6)
+    await fake_clock.advance(20)
+    assert fired[-2:] == [("early", 31), ("late", 31)]
+    assert len(wheel) == 0
@@ -15,6 +15,7 @@ from zigpy.zcl.clusters.general import PowerConfiguration
 from zigpy.zcl.clusters.security import IasZone, ZoneStatus
 
 from tests.common import ClusterListener, MockDatetime, wait_for_zigpy_tasks
+from tests.tuya_replay import TuyaFrameRecorder, TuyaTrace, replay_trace
 import zhaquirks
 from zhaquirks.const import (
     DEVICE_TYPE,
@@ -26,7 +27,23 @@ from zhaquirks.const import (
     OUTPUT_CLUSTERS,
     PROFILE_ID,
 )
-from zhaquirks.tuya import Data, TuyaManufClusterAttributes, TuyaNewManufCluster
+from zhaquirks.tuya import (
+    SWITCH_EVENT,
+    TUYA_ACTIVE_STATUS_RPT,
+    TUYA_GET_DATA,
+    TUYA_SET_DATA_RESPONSE,
+    Data,
+    TuyaCommand,
+    TuyaCommandView,
+    TuyaData,
+    TuyaDatapointData,
+    TuyaDPType,
+    TuyaManufacturerClusterOnOff,
+    TuyaManufClusterAttributes,
+    TuyaNewManufCluster,
+    TuyaOnOff,
+    TuyaSwitch,
+)
 import zhaquirks.tuya.sm0202_motion
 import zhaquirks.tuya.ts0021
 import zhaquirks.tuya.ts0041
@@ -333,6 +350,59 @@ async def test_tuya_data_conversion():
     assert Data(t.int32s(-20)) == [4, 255, 255, 255, 236]
 
 
+def tuya_data(dp_type: TuyaDPType, raw: bytes) -> TuyaData:
+    """Create a datapoint value from its type and raw bytes."""
+    data = TuyaData()
+    data.dp_type = dp_type
+    data.raw = raw
+    return data
+
+
+@pytest.mark.parametrize(
+    "dp_type,raw,zigpy_type",
+    [
+        (TuyaDPType.VALUE, b"\xff\xff\xff\xec", t.int32s_be),
+        (TuyaDPType.VALUE, b"\x00\x00\x01\x27\xff", t.int32s_be),
+        (TuyaDPType.BOOL, b"\x01", t.Bool),
+        (TuyaDPType.BOOL, b"\x00", t.Bool),
+        (TuyaDPType.ENUM, b"\x05", t.enum8),
+        (TuyaDPType.BITMAP, b"\x81", t.bitmap8),
+        (TuyaDPType.BITMAP, b"\x01\x02", t.bitmap16),
+        (TuyaDPType.BITMAP, b"\x01\x02\x03\x04", t.bitmap32),
+    ],
+)
+def test_tuya_data_payload_decoding(dp_type, raw, zigpy_type):
+    """Test datapoint payloads decode like the zigpy types they represent."""
+    data = tuya_data(dp_type, raw)
+    payload = data.payload
+
+    expected = zigpy_type.deserialize(raw)[0]
+    assert payload == expected
+    assert type(payload) is type(expected)
+    # nothing but the fields is stored on the struct
+    assert "_payload_cache" not in vars(data)
+    assert TuyaData.deserialize(data.serialize())[0] == data
+
+
+def test_tuya_data_payload_errors():
+    """Test malformed datapoint payloads."""
+    with pytest.raises(ValueError):
+        tuya_data(TuyaDPType.VALUE, b"\x01").payload
+    with pytest.raises(ValueError):
+        tuya_data(TuyaDPType.BOOL, b"").payload
+    with pytest.raises(ValueError):
+        tuya_data(TuyaDPType.BITMAP, b"\x01\x02\x03").payload
+    with pytest.raises(ValueError):
+        tuya_data(0x08, b"\x01").payload
+
+    data = tuya_data(TuyaDPType.RAW, b"\x01\x02")
+    assert data.payload == b"\x01\x02"
+    data.dp_type = TuyaDPType.STRING
+    data.raw = b"abc"
+    assert data.payload == "abc"
+    assert isinstance(data.payload, t.CharacterString)
+
+
 class TuyaTestManufCluster(TuyaManufClusterAttributes):
     """Cluster for synthetic tests."""
 
@@ -367,6 +437,63 @@ class TuyaTestDevice(CustomDevice):
     }
 
 
+class TuyaTestDoubleSwitch(TuyaSwitch):
+    """Two gang switch for synthetic tests."""
+
+    signature = {
+        MODELS_INFO: [("_test_manuf", "_test_double_switch")],
+        ENDPOINTS: {
+            1: {
+                PROFILE_ID: zha.PROFILE_ID,
+                DEVICE_TYPE: zha.DeviceType.SMART_PLUG,
+                INPUT_CLUSTERS: [TuyaManufacturerClusterOnOff.cluster_id],
+                OUTPUT_CLUSTERS: [],
+            }
+        },
+    }
+
+    replacement = {
+        ENDPOINTS: {
+            1: {
+                PROFILE_ID: zha.PROFILE_ID,
+                DEVICE_TYPE: zha.DeviceType.ON_OFF_LIGHT,
+                INPUT_CLUSTERS: [TuyaManufacturerClusterOnOff, TuyaOnOff],
+                OUTPUT_CLUSTERS: [],
+            },
+            2: {
+                PROFILE_ID: zha.PROFILE_ID,
+                DEVICE_TYPE: zha.DeviceType.ON_OFF_LIGHT,
+                INPUT_CLUSTERS: [TuyaOnOff],
+                OUTPUT_CLUSTERS: [],
+            },
+        },
+    }
+
+
+@pytest.mark.parametrize("quirk", (TuyaTestDoubleSwitch,))
+async def test_tuya_switch_broadcast_event(zigpy_device_from_quirk, quirk):
+    """Test unrouted switch events only update the gang of their channel."""
+
+    switch_dev = zigpy_device_from_quirk(quirk)
+    switch1_listener = ClusterListener(switch_dev.endpoints[1].on_off)
+    switch2_listener = ClusterListener(switch_dev.endpoints[2].on_off)
+
+    switch_dev.switch_bus.listener_event(SWITCH_EVENT, 2, ON)
+    assert switch1_listener.attribute_updates == []
+    assert switch2_listener.attribute_updates == [(0x0000, ON)]
+
+    switch_dev.switch_bus.listener_event(SWITCH_EVENT, 1, OFF)
+    assert switch1_listener.attribute_updates == [(0x0000, OFF)]
+    assert switch2_listener.attribute_updates == [(0x0000, ON)]
+
+    # events routed to a channel are still handled
+    tuya_cluster = switch_dev.endpoints[1].tuya_manufacturer
+    hdr, args = tuya_cluster.deserialize(ZCL_TUYA_SWITCH_ON)
+    tuya_cluster.handle_message(hdr, args)
+    assert switch1_listener.attribute_updates == [(0x0000, OFF), (0x0000, ON)]
+    assert switch2_listener.attribute_updates == [(0x0000, ON)]
+
+
 @pytest.mark.parametrize("quirk", (TuyaTestDevice,))
 async def test_tuya_receive_attribute(zigpy_device_from_quirk, quirk):
     """Test conversion of tuya commands to attributes."""
@@ -1531,6 +1658,62 @@ def test_multiple_attributes_report():
     assert data.data.datapoints[3].dp == 9
 
 
+def test_multiple_attributes_report_lazy_parsing():
+    """Test only the datapoints with a handler are parsed from a report."""
+
+    ep = mock.Mock()  # fake endpoint object
+    cluster = TuyaNewManufCluster(ep)
+    cluster.data_point_handlers = {10: "handle_test_dp"}
+    cluster.handle_test_dp = mock.Mock()
+
+    message = b"\x09\xe0\x02\x0b\x33\x01\x02\x00\x04\x00\x00\x00\xfd\x02\x02\x00\x04\x00\x00\x00\x47\x04\x02\x00\x04\x00\x00\x00\x64\x0a\x02\x00\x04\x00\x00\x01\x68\x0b\x02\x00\x04\x00\x00\x00\xc8"
+    hdr, data = cluster.deserialize(message)
+    command = data.data
+
+    assert isinstance(command, TuyaCommandView)
+    assert command.tsn == 0x33
+    assert command.dps == [1, 2, 4, 10, 11]
+    assert command.serialize() == message[3:]
+    assert command == TuyaCommand.deserialize(message[3:])[0]
+
+    with mock.patch.object(
+        TuyaDatapointData, "deserialize", wraps=TuyaDatapointData.deserialize
+    ) as deserialize:
+        status = cluster.handle_get_data(command)
+
+    assert deserialize.call_count == 1
+    assert status == foundation.Status.UNSUPPORTED_ATTRIBUTE
+    (record,) = cluster.handle_test_dp.call_args[0]
+    assert record.dp == 10
+    assert record.data.payload == 360
+
+    with pytest.raises(ValueError):
+        TuyaCommandView.deserialize(message[3:-1])
+
+
+def test_tuya_command_view_struct():
+    """Test received commands keep behaving like the TuyaCommand struct."""
+
+    ep = mock.Mock()  # fake endpoint object
+    cluster = TuyaNewManufCluster(ep)
+
+    message = b"\x09\xe0\x02\x0b\x33\x01\x02\x00\x04\x00\x00\x00\xfd\x02\x02\x00\x04\x00\x00\x00\x47"
+    _, data = cluster.deserialize(message)
+    command = data.data
+
+    assert isinstance(command, TuyaCommand)
+    assert command.fields == TuyaCommand.fields
+    assert command.as_dict() == TuyaCommand.deserialize(message[3:])[0].as_dict()
+
+    command.tsn = 0x34
+    assert command.serialize() == b"\x0b\x34" + message[5:]
+
+    command.datapoints = command.datapoints[1:]
+    assert command.dps == [2]
+    assert list(command.iter_datapoints({1, 2})) == command.datapoints
+    assert command.serialize() == b"\x0b\x34" + message[13:]
+
+
 @mock.patch("zigpy.zcl.Cluster.bind", mock.AsyncMock())
 @pytest.mark.parametrize(
     "quirk",
@@ -2018,3 +2201,52 @@ async def test_ts601_door_sensor(
     attrs = await cluster.read_attributes(attributes=[attribute])
 
     assert attrs[0].get(attribute) == expected_value
+
+
+@pytest.mark.parametrize("realtime", [False, True])
+async def test_tuya_trace_record_replay(zigpy_device_from_v2_quirk, tmp_path, realtime):
+    """Test recorded Tuya frames replay to the same attribute values."""
+
+    recorded = zigpy_device_from_v2_quirk("_TZE200_bjawzodf", "TS0601")
+    recorder = TuyaFrameRecorder(recorded.endpoints[1].tuya_manufacturer)
+
+    messages = (
+        b"\x09\xe0\x02\x0b\x33\x01\x02\x00\x04\x00\x00\x00\xfd",
+        b"\x09\xe1\x06\x0b\x34\x02\x02\x00\x04\x00\x00\x00\x47",
+        # manufacturer specific, without default response
+        b"\x1d\x02\x10\xe2\x01\x0b\x35\x04\x02\x00\x04\x00\x00\x00\x64",
+        # not recorded
+        b"\x09\xe3\x11\x00\x01\x40",
+    )
+    for message in messages:
+        hdr, args = recorded.endpoints[1].tuya_manufacturer.deserialize(message)
+        recorded.endpoints[1].tuya_manufacturer.handle_message(hdr, args)
+
+    trace = recorder.stop()
+    assert [frame.command_id for frame in trace.frames] == [
+        TUYA_SET_DATA_RESPONSE,
+        TUYA_ACTIVE_STATUS_RPT,
+        TUYA_GET_DATA,
+    ]
+    assert [frame.data for frame in trace.frames] == list(messages[:3])
+    assert trace.frames[0].header.manufacturer is None
+    assert not trace.frames[0].header.frame_control.disable_default_response
+    assert trace.frames[2].header.manufacturer == 0x1002
+    assert trace.frames[2].header.frame_control.disable_default_response
+    for frame in trace.frames:
+        assert frame.header.direction == foundation.Direction.Server_to_Client
+    trace.save(tmp_path / "trace.jsonl.gz")
+
+    loaded = TuyaTrace.load(tmp_path / "trace.jsonl.gz")
+    assert loaded == trace
+
+    replayed = zigpy_device_from_v2_quirk(loaded.manufacturer, loaded.model)
+    cluster = replayed.endpoints[loaded.endpoint_id].in_clusters[loaded.cluster_id]
+    report = await replay_trace(loaded, cluster, realtime=realtime)
+
+    assert len(report.latencies) == 3
+    assert report.as_dict()["frames"] == 3
+    for ep_attribute in ("temperature", "humidity", "power"):
+        expected = getattr(recorded.endpoints[1], ep_attribute)._attr_cache
+        assert expected
+        assert getattr(replayed.endpoints[1], ep_attribute)._attr_cache == expected
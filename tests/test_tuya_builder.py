@@ -1,12 +1,15 @@
 """Tests for TuyaQuirkBuilder."""
 
+import asyncio
 from collections.abc import ByteString
 import datetime
+import gc
 from unittest import mock
+import weakref
 
 import pytest
 from zigpy.quirks.registry import DeviceRegistry
-from zigpy.quirks.v2 import CustomDeviceV2
+from zigpy.quirks.v2 import CustomDeviceV2, QuirkBuilder
 import zigpy.types as t
 from zigpy.zcl import foundation
 from zigpy.zcl.clusters.general import Basic
@@ -16,15 +19,20 @@ from tests.common import ClusterListener, MockDatetime, wait_for_zigpy_tasks
 import zhaquirks
 from zhaquirks.const import BatterySize
 from zhaquirks.tuya import (
+    TUYA_CLUSTER_ID,
     TUYA_QUERY_DATA,
     TUYA_SEND_DATA,
     TUYA_SET_TIME,
+    AttributeWithMask,
+    ReportThrottle,
     TuyaCommand,
+    TuyaCommandView,
     TuyaData,
     TuyaDatapointData,
     TuyaLocalCluster,
     TuyaPowerConfigurationCluster,
     TuyaPowerConfigurationCluster2AAA,
+    TuyaRawField,
 )
 from zhaquirks.tuya.builder import (
     TuyaAirQualityVOC,
@@ -42,7 +50,12 @@ from zhaquirks.tuya.builder import (
     TuyaTemperatureMeasurement,
     TuyaValveWaterConsumedNoInstDemand,
 )
-from zhaquirks.tuya.mcu import DPToAttributeMapping, TuyaMCUCluster, TuyaOnOffNM
+from zhaquirks.tuya.mcu import (
+    DPToAttributeMapping,
+    TuyaClusterData,
+    TuyaMCUCluster,
+    TuyaOnOffNM,
+)
 from zhaquirks.tuya.tuya_sensor import NoManufTimeTuyaMCUCluster
 
 ZCL_TUYA_SET_TIME = b"\x09\x12\x24\x0d\x00"
@@ -566,3 +579,714 @@ async def test_tuya_override_mcu_command(
 
     assert tuya_listener.attribute_updates[0][0] == 0xEF0A
     assert tuya_listener.attribute_updates[0][1] == TestEnum.B
+
+
+async def test_tuya_valid_attributes_precomputed(device_mock):
+    """Test mapped LocalDataCluster attributes are marked valid from shared frozensets."""
+
+    registry = DeviceRegistry()
+
+    (
+        TuyaQuirkBuilder(device_mock.manufacturer, device_mock.model, registry=registry)
+        .tuya_temperature(dp_id=1)
+        .tuya_humidity(dp_id=2)
+        .skip_configuration()
+        .add_to_registry()
+    )
+
+    first = registry.get_device(device_mock)
+    second = registry.get_device(device_mock)
+
+    temperature_attr_id = TuyaTemperatureMeasurement.AttributeDefs.measured_value.id
+    humidity_attr_id = TuyaRelativeHumidity.AttributeDefs.measured_value.id
+    assert type(first.endpoints[1].tuya_manufacturer).valid_attributes == {
+        1: {
+            (1, TuyaTemperatureMeasurement): frozenset({temperature_attr_id}),
+            (1, TuyaRelativeHumidity): frozenset({humidity_attr_id}),
+        }
+    }
+
+    for ep_attribute, attr_id in (
+        ("temperature", temperature_attr_id),
+        ("humidity", humidity_attr_id),
+    ):
+        first_cluster = getattr(first.endpoints[1], ep_attribute)
+        second_cluster = getattr(second.endpoints[1], ep_attribute)
+        assert frozenset({attr_id}) == first_cluster._VALID_ATTRIBUTES
+        assert first_cluster._VALID_ATTRIBUTES is second_cluster._VALID_ATTRIBUTES
+
+
+async def test_tuya_valid_attributes_other_endpoint(device_mock):
+    """Test attributes are found per device when the cluster is on another endpoint."""
+
+    registry = DeviceRegistry()
+
+    (
+        TuyaQuirkBuilder(device_mock.manufacturer, device_mock.model, registry=registry)
+        .tuya_temperature(dp_id=1)
+        .skip_configuration()
+        .add_to_registry()
+    )
+    replacement_cluster = type(
+        registry.get_device(device_mock).endpoints[1].tuya_manufacturer
+    )
+
+    device_mock.add_endpoint(2)
+    device_mock[2].add_input_cluster(TUYA_CLUSTER_ID)
+    other_registry = DeviceRegistry()
+    (
+        QuirkBuilder(
+            device_mock.manufacturer, device_mock.model, registry=other_registry
+        )
+        .adds(TuyaTemperatureMeasurement, endpoint_id=2)
+        .replaces(replacement_cluster, endpoint_id=2)
+        .add_to_registry()
+    )
+    device = other_registry.get_device(device_mock)
+
+    temperature_attr_id = TuyaTemperatureMeasurement.AttributeDefs.measured_value.id
+    assert (
+        frozenset({temperature_attr_id})
+        == device.endpoints[2].temperature._VALID_ATTRIBUTES
+    )
+
+
+async def test_tuya_dp_raw(device_mock):
+    """Test raw datapoint fields are decoded at once and mapped to attributes."""
+
+    registry = DeviceRegistry()
+
+    class TuyaTestElectricalMeasurement(ElectricalMeasurement, TuyaLocalCluster):
+        """Tuya Electrical Measurement cluster."""
+
+    (
+        TuyaQuirkBuilder(device_mock.manufacturer, device_mock.model, registry=registry)
+        .tuya_dp_raw(
+            dp_id=6,
+            ep_attribute=TuyaTestElectricalMeasurement.ep_attribute,
+            fields=[
+                TuyaRawField("rms_voltage", offset=0, scale=10),
+                TuyaRawField("rms_current", offset=2, width=3),
+                TuyaRawField("active_power", offset=6, signed=True),
+                TuyaRawField("ac_frequency", offset=8, width=1, converter=abs),
+            ],
+            byteorder="little",
+        )
+        .adds(TuyaTestElectricalMeasurement)
+        .skip_configuration()
+        .add_to_registry()
+    )
+
+    quirked = registry.get_device(device_mock)
+    ep = quirked.endpoints[1]
+
+    data = TuyaData(t.SerializableBytes(b"\xe6\x00\x10\x27\x01\xff\x9c\xff\x32"))
+    status = ep.tuya_manufacturer.handle_get_data(
+        TuyaCommand(status=0, tsn=2, datapoints=[TuyaDatapointData(6, data)])
+    )
+    assert status == foundation.Status.SUCCESS
+
+    assert ep.electrical_measurement.get("rms_voltage") == 2300
+    assert ep.electrical_measurement.get("rms_current") == 0x01_27_10
+    assert ep.electrical_measurement.get("active_power") == -100
+    assert ep.electrical_measurement.get("ac_frequency") == 50
+
+    with pytest.raises(ValueError, match="overlaps"):
+        TuyaQuirkBuilder(
+            device_mock.manufacturer, device_mock.model, registry=registry
+        ).tuya_dp_raw(
+            dp_id=6,
+            ep_attribute=TuyaTestElectricalMeasurement.ep_attribute,
+            fields=[
+                TuyaRawField("rms_voltage", offset=0, width=4),
+                TuyaRawField("rms_current", offset=2),
+            ],
+        )
+
+
+async def test_tuya_dp_dispatch_table(device_mock):
+    """Test datapoint mappings are bound to their clusters once per datapoint."""
+
+    registry = DeviceRegistry()
+
+    class TuyaTestElectricalMeasurement(ElectricalMeasurement, TuyaLocalCluster):
+        """Tuya Electrical Measurement cluster."""
+
+    (
+        TuyaQuirkBuilder(device_mock.manufacturer, device_mock.model, registry=registry)
+        .tuya_dp_multi(
+            dp_id=11,
+            attribute_mapping=[
+                DPToAttributeMapping(
+                    ep_attribute=TuyaTestElectricalMeasurement.ep_attribute,
+                    attribute_name=("rms_voltage", "ac_alarms_mask"),
+                    converter=lambda data: (
+                        data[0],
+                        AttributeWithMask(data[1] << 4, 0xF0),
+                    ),
+                ),
+            ],
+        )
+        .adds(TuyaTestElectricalMeasurement)
+        .skip_configuration()
+        .add_to_registry()
+    )
+
+    quirked = registry.get_device(device_mock)
+    ep = quirked.endpoints[1]
+    tuya_cluster = ep.tuya_manufacturer
+    electrical_meas_cluster = ep.electrical_measurement
+    electrical_meas_cluster.update_attribute("ac_alarms_mask", 0x0F)
+
+    with mock.patch.object(
+        tuya_cluster, "_compile_dp", wraps=tuya_cluster._compile_dp
+    ) as compile_dp:
+        for voltage in (230, 231):
+            tuya_cluster.handle_get_data(
+                TuyaCommand(
+                    status=0,
+                    tsn=2,
+                    datapoints=[
+                        TuyaDatapointData(
+                            11, TuyaData(t.SerializableBytes(bytes([voltage, 0x0A])))
+                        ),
+                        TuyaDatapointData(12, TuyaData(1)),
+                    ],
+                )
+            )
+
+    compile_dp.assert_called_once_with(11)
+    (target,) = tuya_cluster._dp_dispatch[11]
+    assert target.cluster is electrical_meas_cluster
+    assert 12 not in tuya_cluster._dp_dispatch
+    assert electrical_meas_cluster.get("rms_voltage") == 231
+    assert electrical_meas_cluster.get("ac_alarms_mask") == 0xAF
+
+
+@pytest.fixture
+def tuya_number_cluster(device_mock):
+    """Return a factory building the Tuya cluster of a quirk with number datapoints."""
+
+    def build(**cluster_options):
+        registry = DeviceRegistry()
+
+        builder = TuyaQuirkBuilder(
+            device_mock.manufacturer, device_mock.model, registry=registry
+        )
+        for dp_id in (7, 8, 9):
+            builder.tuya_number(
+                dp_id=dp_id,
+                attribute_name=f"test_number_{dp_id}",
+                type=t.uint16_t,
+                translation_key=f"test_number_{dp_id}",
+                fallback_name=f"Test number {dp_id}",
+            )
+        builder.skip_configuration().add_to_registry(**cluster_options)
+
+        quirked = registry.get_device(device_mock)
+        return quirked.endpoints[1].tuya_manufacturer
+
+    return build
+
+
+@pytest.mark.parametrize(
+    "max_payload,expected_frames",
+    [
+        (77, [[7, 8, 9]]),
+        (20, [[7, 8], [9]]),
+        (5, [[7], [8], [9]]),
+    ],
+)
+async def test_tuya_mcu_write_batching(
+    tuya_number_cluster, max_payload, expected_frames
+):
+    """Test datapoints written together are packed into as few frames as fit."""
+
+    tuya_cluster = tuya_number_cluster(mcu_write_batch_window=0)
+    tuya_cluster.mcu_write_max_payload = max_payload
+
+    with mock.patch.object(
+        tuya_cluster.endpoint, "request", return_value=foundation.Status.SUCCESS
+    ) as m1:
+        await tuya_cluster.write_attributes({"test_number_7": 1, "test_number_8": 2})
+        await tuya_cluster.write_attributes({"test_number_8": 3, "test_number_9": 4})
+
+        # attributes are updated right away, the datapoints are sent later on
+        assert tuya_cluster.get("test_number_8") == 3
+        assert m1.call_count == 0
+
+        await asyncio.sleep(0)
+        await wait_for_zigpy_tasks()
+
+    frames = []
+    for call in m1.call_args_list:
+        _, args = tuya_cluster.deserialize(call.kwargs["data"])
+        frames.append({dp.dp: dp.data.payload for dp in args.data.datapoints})
+
+    assert [list(frame) for frame in frames] == expected_frames
+    assert {dp: v for frame in frames for dp, v in frame.items()} == {7: 1, 8: 3, 9: 4}
+
+    # no batching by default
+    assert TuyaMCUCluster.mcu_write_batch_window is None
+
+
+async def test_tuya_mcu_write_debounce(tuya_number_cluster, fake_clock):
+    """Test bursts of writes to a datapoint only send the latest value."""
+
+    tuya_cluster = tuya_number_cluster(mcu_write_debounce=1)
+
+    with mock.patch.object(
+        tuya_cluster.endpoint, "request", return_value=foundation.Status.SUCCESS
+    ) as m1:
+        for value in (10, 20, 30):
+            await tuya_cluster.write_attributes({"test_number_7": value})
+            # the attribute cache is updated right away
+            assert tuya_cluster.get("test_number_7") == value
+            # every write restarts the debounce window of its datapoints
+            await fake_clock.advance(0.75)
+        await tuya_cluster.write_attributes({"test_number_8": 5})
+
+        await wait_for_zigpy_tasks()
+        assert m1.call_count == 0
+
+        await fake_clock.advance(0.25)
+        await wait_for_zigpy_tasks()
+        assert m1.call_count == 1
+
+        await fake_clock.advance(0.5)
+        await wait_for_zigpy_tasks()
+        assert m1.call_count == 1
+
+        await fake_clock.advance(0.5)
+        await wait_for_zigpy_tasks()
+
+    sent = {}
+    for call in m1.call_args_list:
+        _, args = tuya_cluster.deserialize(call.kwargs["data"])
+        for datapoint in args.data.datapoints:
+            sent[datapoint.dp] = datapoint.data.payload
+
+    assert m1.call_count == 2
+    assert sent == {7: 30, 8: 5}
+    assert not tuya_cluster._debounced_writes
+
+
+async def test_tuya_mcu_write_debounce_shared_datapoint(
+    tuya_number_cluster, fake_clock
+):
+    """Test debounced commands sharing a datapoint only send its latest value."""
+
+    tuya_cluster = tuya_number_cluster(mcu_write_debounce=1)
+    cluster_data = TuyaClusterData(
+        endpoint_id=1,
+        cluster_name="tuya_manufacturer",
+        cluster_attr="test_number_7",
+        attr_value=0,
+        expect_reply=False,
+        manufacturer=None,
+    )
+
+    with mock.patch.object(
+        tuya_cluster.endpoint, "request", return_value=foundation.Status.SUCCESS
+    ) as m1:
+        tuya_cluster._debounce_write(
+            cluster_data,
+            TuyaCommand(
+                status=0,
+                tsn=1,
+                datapoints=[
+                    TuyaDatapointData(7, TuyaData(1)),
+                    TuyaDatapointData(8, TuyaData(2)),
+                ],
+            ),
+        )
+        tuya_cluster._debounce_write(
+            cluster_data,
+            TuyaCommand(
+                status=0, tsn=2, datapoints=[TuyaDatapointData(7, TuyaData(3))]
+            ),
+        )
+        await fake_clock.advance(1)
+        await wait_for_zigpy_tasks()
+
+    sent = [
+        tuya_cluster.deserialize(call.kwargs["data"])[1].data.datapoints
+        for call in m1.call_args_list
+    ]
+    assert sorted((dp.dp, dp.data.payload) for (dp,) in sent) == [(7, 3), (8, 2)]
+
+
+async def test_tuya_mcu_write_debounce_duplicate_reports(
+    tuya_number_cluster, fake_clock
+):
+    """Test the first report after a debounced write is sent is not a duplicate."""
+
+    tuya_cluster = tuya_number_cluster(
+        mcu_write_debounce=1, duplicate_report_refresh=60
+    )
+
+    def report(value: int) -> None:
+        tuya_cluster.handle_get_data(
+            TuyaCommand(
+                status=0, tsn=2, datapoints=[TuyaDatapointData(7, TuyaData(value))]
+            )
+        )
+
+    report(20)
+    with mock.patch.object(
+        tuya_cluster.endpoint, "request", return_value=foundation.Status.SUCCESS
+    ) as m1:
+        await tuya_cluster.write_attributes({"test_number_7": 30})
+
+        # the device didn't get the written value yet, its reports are duplicates
+        report(20)
+        assert tuya_cluster.get("test_number_7") == 30
+
+        await fake_clock.advance(1)
+        await wait_for_zigpy_tasks()
+        assert m1.call_count == 1
+
+    # the device rejected the written value
+    report(20)
+    assert tuya_cluster.get("test_number_7") == 20
+
+
+async def test_tuya_mcu_write_debounce_teardown(tuya_number_cluster, fake_clock):
+    """Test debounced writes are cancelled once their cluster goes away."""
+
+    tuya_cluster = tuya_number_cluster(mcu_write_debounce=1)
+    await tuya_cluster.write_attributes({"test_number_7": 10, "test_number_8": 20})
+    handles = [handle for handle, _, _ in tuya_cluster._debounced_writes.values()]
+    assert len(handles) == 2
+
+    cluster_ref = weakref.ref(tuya_cluster)
+    del tuya_cluster
+    gc.collect()
+
+    assert cluster_ref() is None
+    assert all(handle.cancelled() for handle in handles)
+
+
+async def test_tuya_mcu_command_pipeline(tuya_number_cluster):
+    """Test written commands wait for their response within a bounded window."""
+
+    tuya_cluster = tuya_number_cluster(mcu_command_window=2)
+    tuya_cluster.command_pipeline.timeout = 0.01
+    tuya_cluster.command_pipeline.retries = 1
+    tuya_cluster.command_pipeline.backoff = 0
+
+    def sent_commands(mock_request):
+        return [
+            tuya_cluster.deserialize(call.kwargs["data"])[1].data
+            for call in mock_request.call_args_list
+        ]
+
+    with mock.patch.object(
+        tuya_cluster.endpoint, "request", return_value=foundation.Status.SUCCESS
+    ) as m1:
+        for dp_id in (7, 8, 9):
+            await tuya_cluster.write_attributes({f"test_number_{dp_id}": dp_id})
+        await asyncio.sleep(0)
+
+        # the third command waits for one of the first two to be acknowledged
+        first, second = sent_commands(m1)
+        stats = tuya_cluster.command_pipeline.stats
+        assert (stats.queued, stats.in_flight, stats.sent) == (1, 2, 2)
+
+        response = TuyaCommand(status=0, tsn=first.tsn, datapoints=[])
+        tuya_cluster.handle_set_data_response(response)
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        assert len(m1.call_args_list) == 3
+        third = sent_commands(m1)[2]
+        assert third.datapoints[0].dp == 9
+
+        # the second command is resent once, then given up
+        tuya_cluster.handle_set_data_response(
+            TuyaCommand(status=0, tsn=third.tsn, datapoints=[])
+        )
+        await asyncio.sleep(0.05)
+        await wait_for_zigpy_tasks()
+
+    assert [command.tsn for command in sent_commands(m1)] == [
+        first.tsn,
+        second.tsn,
+        third.tsn,
+        second.tsn,
+    ]
+    stats = tuya_cluster.command_pipeline.stats
+    assert (stats.queued, stats.in_flight) == (0, 0)
+    assert (stats.sent, stats.acknowledged, stats.retried, stats.failed) == (4, 2, 1, 1)
+    assert stats.average_latency is not None
+    assert stats.max_latency >= stats.last_latency
+
+
+async def test_tuya_mcu_command_pipeline_acknowledgements(tuya_number_cluster):
+    """Test default responses and reports of the written values acknowledge commands."""
+
+    tuya_cluster = tuya_number_cluster(mcu_command_window=1)
+    default_response = foundation.GENERAL_COMMANDS[
+        foundation.GeneralCommand.Default_Response
+    ].schema
+
+    def sent_commands(mock_request):
+        return [
+            tuya_cluster.deserialize(call.kwargs["data"])[1].data
+            for call in mock_request.call_args_list
+        ]
+
+    with mock.patch.object(
+        tuya_cluster.endpoint, "request", return_value=foundation.Status.SUCCESS
+    ) as m1:
+        for dp_id in (7, 8, 9):
+            await tuya_cluster.write_attributes({f"test_number_{dp_id}": dp_id})
+        await asyncio.sleep(0)
+        (first,) = sent_commands(m1)
+        # the ZCL frame uses the tsn of the Tuya command
+        assert m1.call_args.kwargs["sequence"] == first.tsn
+
+        # default response sent for a command not expecting a reply
+        hdr = foundation.ZCLHeader.general(
+            tsn=first.tsn,
+            command_id=foundation.GeneralCommand.Default_Response,
+            direction=foundation.Direction.Server_to_Client,
+        )
+        tuya_cluster.handle_message(
+            hdr,
+            default_response(
+                command_id=tuya_cluster.mcu_write_command,
+                status=foundation.Status.SUCCESS,
+            ),
+        )
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        first, second = sent_commands(m1)
+
+        # report of the written value, other values don't acknowledge the command
+        report = TuyaCommand(status=0, tsn=0, datapoints=[TuyaDatapointData(8, 1)])
+        tuya_cluster.handle_get_data(report)
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        assert len(sent_commands(m1)) == 2
+        report = TuyaCommand(status=0, tsn=0, datapoints=second.datapoints)
+        tuya_cluster.handle_get_data(TuyaCommandView.deserialize(report.serialize())[0])
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        third = sent_commands(m1)[2]
+        tuya_cluster.handle_set_data_response(
+            TuyaCommand(status=0, tsn=third.tsn, datapoints=[])
+        )
+        await wait_for_zigpy_tasks()
+
+    # default response returned for a command expecting a reply
+    command = TuyaCommand(status=0, tsn=0x42, datapoints=[TuyaDatapointData(7, 1)])
+    with mock.patch.object(
+        tuya_cluster.endpoint,
+        "request",
+        return_value=default_response(
+            command_id=tuya_cluster.mcu_write_command,
+            status=foundation.Status.SUCCESS,
+        ),
+    ):
+        tuya_cluster._send_command(command, True, None)
+        await wait_for_zigpy_tasks()
+
+    stats = tuya_cluster.command_pipeline.stats
+    assert (stats.in_flight, stats.queued) == (0, 0)
+    assert (stats.acknowledged, stats.retried, stats.failed) == (4, 0, 0)
+
+
+async def test_tuya_duplicate_report_suppression(device_mock):
+    """Test identical datapoint reports are only handled once per refresh interval."""
+
+    registry = DeviceRegistry()
+
+    (
+        TuyaQuirkBuilder(device_mock.manufacturer, device_mock.model, registry=registry)
+        .tuya_number(
+            dp_id=7,
+            attribute_name="test_number",
+            type=t.uint16_t,
+            translation_key="test_number",
+            fallback_name="Test number",
+        )
+        .skip_configuration()
+        .add_to_registry(duplicate_report_refresh=60)
+    )
+
+    quirked = registry.get_device(device_mock)
+    tuya_cluster = quirked.endpoints[1].tuya_manufacturer
+    tuya_listener = ClusterListener(tuya_cluster)
+
+    def report(value: int) -> None:
+        tuya_cluster.handle_get_data(
+            TuyaCommand(
+                status=0, tsn=2, datapoints=[TuyaDatapointData(7, TuyaData(value))]
+            )
+        )
+
+    with mock.patch("time.monotonic", return_value=1000):
+        report(10)
+        report(10)
+        report(20)
+        report(20)
+    assert [update[1] for update in tuya_listener.attribute_updates] == [10, 20]
+
+    # forced refresh after the interval
+    with mock.patch("time.monotonic", return_value=1061):
+        report(20)
+        report(20)
+    assert [update[1] for update in tuya_listener.attribute_updates] == [10, 20, 20]
+
+    # writing a datapoint handles its next report, even if it didn't change
+    with mock.patch.object(
+        tuya_cluster.endpoint, "request", return_value=foundation.Status.SUCCESS
+    ):
+        await tuya_cluster.write_attributes({"test_number": 30})
+        await wait_for_zigpy_tasks()
+
+    with mock.patch("time.monotonic", return_value=1062):
+        report(20)
+    assert tuya_cluster.get("test_number") == 20
+
+
+@pytest.fixture
+def throttled_sensor_cluster(device_mock):
+    """Return a factory building the Tuya cluster of a quirk with a throttled sensor."""
+
+    def build(
+        throttle=ReportThrottle(min_interval=5, max_interval=60, relative_deadband=0.1),
+    ):
+        registry = DeviceRegistry()
+
+        (
+            TuyaQuirkBuilder(
+                device_mock.manufacturer, device_mock.model, registry=registry
+            )
+            .tuya_sensor(
+                dp_id=9,
+                attribute_name="test_sensor",
+                type=t.uint16_t,
+                translation_key="test_sensor",
+                fallback_name="Test sensor",
+                throttle=throttle,
+            )
+            .skip_configuration()
+            .add_to_registry()
+        )
+
+        quirked = registry.get_device(device_mock)
+        return quirked.endpoints[1].tuya_manufacturer
+
+    return build
+
+
+async def test_tuya_sensor_throttle(throttled_sensor_cluster):
+    """Test throttled datapoints only update their attribute when due."""
+
+    tuya_cluster = throttled_sensor_cluster()
+    tuya_listener = ClusterListener(tuya_cluster)
+
+    reports = [
+        (0, 100),  # first report
+        (1, 200),  # within min_interval
+        (10, 105),  # within deadband
+        (20, 111),  # significant change
+        (30, 111),  # unchanged
+        (80, 111),  # heartbeat
+        (81, 0),  # within min_interval
+    ]
+    for now, value in reports:
+        with mock.patch("time.monotonic", return_value=now):
+            tuya_cluster.handle_get_data(
+                TuyaCommand(
+                    status=0,
+                    tsn=2,
+                    datapoints=[TuyaDatapointData(9, TuyaData(value))],
+                )
+            )
+
+    assert [update[1] for update in tuya_listener.attribute_updates] == [
+        100,
+        111,
+        111,
+    ]
+
+
+async def test_tuya_sensor_throttle_trailing(throttled_sensor_cluster, fake_clock):
+    """Test held back values are updated once min_interval or max_interval expires."""
+
+    tuya_cluster = throttled_sensor_cluster()
+    tuya_listener = ClusterListener(tuya_cluster)
+
+    def report(value):
+        tuya_cluster.handle_get_data(
+            TuyaCommand(
+                status=0, tsn=2, datapoints=[TuyaDatapointData(9, TuyaData(value))]
+            )
+        )
+
+    def updates():
+        return [update[1] for update in tuya_listener.attribute_updates]
+
+    report(100)
+    await fake_clock.advance(1)
+    report(200)  # change within min_interval
+    await fake_clock.advance(3)
+    assert updates() == [100]
+
+    # the change is updated once min_interval expires
+    await fake_clock.advance(1)
+    assert updates() == [100, 200]
+
+    await fake_clock.advance(5)
+    report(205)  # within deadband
+    await fake_clock.advance(54)
+    assert updates() == [100, 200]
+
+    # the device stopped reporting, the value is updated as a heartbeat
+    await fake_clock.advance(1)
+    assert updates() == [100, 200, 205]
+    await fake_clock.advance(120)
+    assert updates() == [100, 200, 205]
+
+    # a later change replaces the held back value and its deadline
+    report(300)
+    await fake_clock.advance(1)
+    report(290)  # within deadband
+    await fake_clock.advance(1)
+    report(400)  # change within min_interval
+    await fake_clock.advance(3)
+    assert updates() == [100, 200, 205, 300, 400]
+    await fake_clock.advance(120)
+    assert updates() == [100, 200, 205, 300, 400]
+
+    # an update passing the throttle cancels the held back one
+    report(500)
+    await fake_clock.advance(1)
+    report(501)  # within deadband
+    await fake_clock.advance(10)
+    report(700)
+    await fake_clock.advance(120)
+    assert updates() == [100, 200, 205, 300, 400, 500, 700]
+
+
+async def test_tuya_sensor_throttle_min_interval(throttled_sensor_cluster, fake_clock):
+    """Test changes within min_interval aren't lost without max_interval."""
+
+    tuya_cluster = throttled_sensor_cluster(ReportThrottle(min_interval=5))
+    tuya_listener = ClusterListener(tuya_cluster)
+
+    for value in (1, 2, 3, 3):
+        tuya_cluster.handle_get_data(
+            TuyaCommand(
+                status=0, tsn=2, datapoints=[TuyaDatapointData(9, TuyaData(value))]
+            )
+        )
+        await fake_clock.advance(1)
+
+    assert [update[1] for update in tuya_listener.attribute_updates] == [1]
+    await fake_clock.advance(1)
+    assert [update[1] for update in tuya_listener.attribute_updates] == [1, 3]
+    await fake_clock.advance(120)
+    assert [update[1] for update in tuya_listener.attribute_updates] == [1, 3]
@@ -210,6 +210,51 @@ async def test_tuya_mcu_set_time(zigpy_device_from_quirk, quirk):
     datetime.datetime = origdatetime  # restore datetime
 
 
+@pytest.mark.parametrize(
+    "quirk",
+    (
+        zhaquirks.tuya.ts0601_dimmer.TuyaDoubleSwitchDimmer,
+        zhaquirks.tuya.ts0601_rcbo.TuyaCircuitBreaker,
+    ),
+)
+def test_tuya_get_dp_mapping(zigpy_device_from_quirk, quirk):
+    """Test the DP mapping index matches a scan of all DP mappings."""
+
+    tuya_device = zigpy_device_from_quirk(quirk)
+    tuya_cluster = tuya_device.endpoints[1].tuya_manufacturer
+
+    def scan(endpoint_id, attribute_name):
+        result = {}
+        for dp, dp_mapping in tuya_cluster._dp_to_attributes.items():
+            for mapped_attr in dp_mapping:
+                names = mapped_attr.attribute_name
+                if not isinstance(names, tuple):
+                    names = (names,)
+                mapped_ep = mapped_attr.endpoint_id or tuya_cluster.endpoint.endpoint_id
+                if attribute_name in names and endpoint_id == mapped_ep:
+                    result[dp] = mapped_attr
+        return result
+
+    keys = {
+        (endpoint_id, attribute_name)
+        for endpoint_id in tuya_device.endpoints
+        for dp_mapping in tuya_cluster._dp_to_attributes.values()
+        for mapped_attr in dp_mapping
+        for attribute_name in (
+            mapped_attr.attribute_name
+            if isinstance(mapped_attr.attribute_name, tuple)
+            else (mapped_attr.attribute_name,)
+        )
+    }
+    assert any(scan(*key) for key in keys)
+
+    for key in keys:
+        assert tuya_cluster.get_dp_mapping(*key) == scan(*key)
+        assert list(tuya_cluster.get_dp_mapping(*key)) == list(scan(*key))
+
+    assert tuya_cluster.get_dp_mapping(1, "unknown_attribute") == {}
+
+
 @pytest.mark.parametrize(
     "quirk", (zhaquirks.tuya.ts0601_dimmer.TuyaDoubleSwitchDimmer,)
 )
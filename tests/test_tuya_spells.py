@@ -1,5 +1,6 @@
 """Tests for Tuya spells."""
 
+import asyncio
 from unittest import mock
 
 import pytest
@@ -20,6 +21,7 @@ from zhaquirks.tuya import (
     TUYA_QUERY_DATA,
     EnchantedDevice,
     TuyaNewManufCluster,
+    TuyaSpellScheduler,
     TuyaZBOnOffAttributeCluster,
 )
 import zhaquirks.tuya.tuya_valve
@@ -157,3 +159,100 @@ def test_tuya_spell_devices_valid():
             pytest.fail(
                 f"{quirk} set Tuya data query spell but has no cluster subclassing `TuyaNewManufCluster` on endpoint 1"
             )
+
+
+async def test_tuya_spell_scheduler():
+    """Test spells are cast on a limited number of devices, mains powered first."""
+
+    scheduler = TuyaSpellScheduler(max_concurrent=1)
+    release = asyncio.Event()
+    cast = []
+
+    def spells(name):
+        async def spell():
+            cast.append(name)
+            await release.wait()
+
+        return {"attribute_reads": spell}
+
+    devices = {name: mock.Mock() for name in ("first", "battery", "mains")}
+    tasks = [
+        asyncio.create_task(
+            scheduler.cast(device, spells(name), mains_powered=name == "mains")
+        )
+        for name, device in devices.items()
+    ]
+    await asyncio.sleep(0)
+
+    assert cast == ["first"]
+    stats = scheduler.stats
+    assert (stats.active, stats.queued) == (1, 2)
+
+    release.set()
+    await asyncio.gather(*tasks)
+    assert cast == ["first", "mains", "battery"]
+
+    # configuring a device while its spells are being cast waits for that cast
+    release.clear()
+    first = asyncio.create_task(scheduler.cast(devices["first"], spells("again")))
+    await asyncio.sleep(0)
+    duplicate = asyncio.create_task(
+        scheduler.cast(devices["first"], spells("duplicate"))
+    )
+    await asyncio.sleep(0)
+    assert not duplicate.done()
+    release.set()
+    await asyncio.gather(first, duplicate)
+    assert cast == ["first", "mains", "battery", "again"]
+
+    # spells are cast again by the next configuration
+    await scheduler.cast(devices["first"], spells("reconfigure"))
+    assert cast == ["first", "mains", "battery", "again", "reconfigure"]
+
+    stats = scheduler.stats
+    assert (stats.active, stats.queued) == (0, 0)
+    assert (stats.cast, stats.skipped, stats.failed) == (5, 1, 0)
+    assert stats.max_wait > 0
+    assert stats.average_duration is not None
+
+
+async def test_tuya_spell_cast_once(zigpy_device_from_quirk):
+    """Test concurrent configurations cast spells once, unless the device rejoined."""
+
+    device = zigpy_device_from_quirk(TuyaTestSpellDevice)
+    started = asyncio.Event()
+    release = asyncio.Event()
+
+    async def request(*args, **kwargs):
+        started.set()
+        await release.wait()
+        return foundation.Status.SUCCESS, "done"
+
+    request_patch = mock.patch("zigpy.zcl.Cluster.request", side_effect=request)
+    scheduler_patch = mock.patch.object(
+        device, "tuya_spell_scheduler", TuyaSpellScheduler()
+    )
+    with request_patch as request_mock, scheduler_patch:
+        configure = [
+            asyncio.create_task(device.apply_custom_configuration()) for _ in range(2)
+        ]
+        await started.wait()
+        assert request_mock.call_count == 1
+
+        # the device rejoined and lost its state, so the spells are cast again
+        started.clear()
+        device.zdo.handle_device_annce(None, device.nwk, device.ieee, 0)
+        configure.append(asyncio.create_task(device.apply_custom_configuration()))
+        await started.wait()
+        assert request_mock.call_count == 2
+
+        release.set()
+        await asyncio.gather(*configure)
+        # each cast reads the attributes and queries the data
+        assert request_mock.call_count == 4
+        stats = device.tuya_spell_scheduler.stats
+        assert (stats.cast, stats.skipped) == (2, 1)
+
+        # an explicit reconfigure casts the spells again
+        await device.apply_custom_configuration()
+        assert request_mock.call_count == 6
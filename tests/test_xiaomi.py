@@ -7,12 +7,14 @@ from unittest import mock
 
 import pytest
 import zigpy.device
+import zigpy.quirks
 import zigpy.types as t
 from zigpy.zcl import Cluster, foundation
 from zigpy.zcl.clusters.closures import WindowCovering
 from zigpy.zcl.clusters.general import (
     AnalogInput,
     AnalogOutput,
+    Basic,
     DeviceTemperature,
     MultistateInput,
     MultistateOutput,
@@ -49,14 +51,18 @@ from zhaquirks.const import (
     ZONE_STATUS_CHANGE_COMMAND,
     BatterySize,
 )
+from zhaquirks.loader import RegistryWatcher
 from zhaquirks.xiaomi import (
     LUMI,
+    QUICK_INIT_INDEX,
     XIAOMI_AQARA_ATTRIBUTE,
     XIAOMI_AQARA_ATTRIBUTE_E1,
+    XIAOMI_ATTR_4,
     XIAOMI_NODE_DESC,
     BasicCluster,
     XiaomiCustomDevice,
     XiaomiQuickInitDevice,
+    aqara_tag_table,
     handle_quick_init,
 )
 import zhaquirks.xiaomi.aqara.cube
@@ -243,6 +249,60 @@ def test_xiaomi_quick_init_wrong_cluster_or_message(raw_device, cluster, message
     assert raw_device.application.device_initialized.call_count == 0
 
 
+@pytest.mark.parametrize(
+    "cluster, message",
+    (
+        (0, b"\x19\x00\n\x05\x00B\x11lumi.sensor_sm0ke"),  # cluster command
+        (1, b"\x18\x00\n\x05\x00B\x11lumi.sensor_sm0ke"),  # wrong cluster
+        (0, b"\x18\x00\x01\x05\x00B\x11lumi.sensor_sm0ke"),  # wrong command
+        (0, b"\x1c\x5f\x11\x00\x01\x05\x00B\x11lumi"),  # manufacturer specific
+        (0, b"\x1c\x5f\x11\x00"),  # truncated header
+        (0, b""),  # empty
+    ),
+)
+def test_xiaomi_quick_init_not_deserialized(raw_device, cluster, message):
+    """Test quick init rejects frames which aren't attribute reports from the header."""
+
+    with mock.patch("zigpy.zcl.foundation.ZCLHeader.deserialize") as hdr_deserialize:
+        assert handle_quick_init(raw_device, 0x0260, cluster, 1, 1, message) is None
+        assert hdr_deserialize.call_count == 0
+
+
+def test_xiaomi_quick_init_index():
+    """Test quick init quirks are looked up without growing or patching the registry."""
+
+    registry = zigpy.quirks.DEVICE_REGISTRY
+    assert RegistryWatcher.installed(registry) is None
+    assert QUICK_INIT_INDEX.get("lumi.unknown_model") == ()
+    assert "lumi.unknown_model" not in registry.registry_v1[LUMI]
+
+    quirks = QUICK_INIT_INDEX.get("lumi.sensor_smoke")
+    assert quirks
+    assert all(issubclass(quirk, XiaomiQuickInitDevice) for quirk in quirks)
+
+    # lookups reuse the quirks while the registry doesn't change
+    assert QUICK_INIT_INDEX.get("lumi.sensor_smoke") is quirks
+
+    class IndexedDevice(XiaomiQuickInitDevice):
+        signature = {
+            MANUFACTURER: LUMI,
+            MODEL: "lumi.sensor_indexed",
+        }
+
+    assert QUICK_INIT_INDEX.get("lumi.sensor_indexed") == (IndexedDevice,)
+    assert QUICK_INIT_INDEX.get("lumi.sensor_smoke") is quirks
+
+    registry.remove(IndexedDevice)
+    assert QUICK_INIT_INDEX.get("lumi.sensor_indexed") == ()
+
+    # quirks added to a model are found right away
+    registry.add_to_registry(IndexedDevice)
+    try:
+        assert QUICK_INIT_INDEX.get("lumi.sensor_indexed") == (IndexedDevice,)
+    finally:
+        registry.remove(IndexedDevice)
+
+
 def test_xiaomi_quick_init_wrong_quirk_type(raw_device):
     """Test quick init for existing quirk which is not enabled for quick joining."""
 
@@ -508,7 +568,16 @@ def test_attribute_parsing(raw_report):
     )
     cluster = BasicCluster(mock.MagicMock())
 
-    hdr, reports = cluster.deserialize(hdr.serialize() + raw_report)
+    with mock.patch.object(
+        foundation.Attribute, "serialize", side_effect=foundation.Attribute.serialize
+    ) as serialize_mock:
+        hdr, reports = cluster.deserialize(hdr.serialize() + raw_report)
+
+    # The repaired attributes are returned without being serialized again
+    assert serialize_mock.call_count == 0
+    assert Basic(mock.MagicMock()).deserialize(
+        hdr.serialize() + reports.serialize()
+    ) == (hdr, reports)
 
     # Keep track of all the data encoded in the attribute report
     parsed_chunks = []
@@ -529,6 +598,98 @@ def test_attribute_parsing(raw_report):
     assert len(raw_report) == 2 * len(reports[0])
 
 
+def test_attribute_parsing_ambiguous_report(caplog):
+    """Test reports with exponentially many interpretations are parsed in linear time."""
+
+    # every length byte can be read as 0 or 1, the number of interpretations grows
+    # like the Fibonacci sequence
+    raw_report = b"\x01\xff\x42\x00" * 25
+
+    hdr = foundation.ZCLHeader.general(
+        manufacturer=4447,
+        tsn=127,
+        command_id=foundation.GeneralCommand.Report_Attributes,
+    )
+    cluster = BasicCluster(mock.MagicMock())
+
+    report, interpretations = cluster._interpret_attr_reports(raw_report, count=True)
+    assert interpretations == 196418
+    assert [attr.value.value for attr in report] == [b""] * 25
+    assert cluster._interpret_attr_reports(raw_report) == (report, 1)
+    assert cluster._interpret_attr_reports(raw_report[:-1]) == (None, 0)
+
+    with caplog.at_level(logging.WARNING):
+        hdr, reports = cluster.deserialize(hdr.serialize() + raw_report)
+
+    assert len(reports[0]) == 25
+    assert "has 196418 valid interpretations" in caplog.text
+
+
+@pytest.mark.parametrize(
+    "raw_report",
+    [
+        b"\x01\xff\x42\x00",
+        b"\x01\xff\x42\x00" * 6,
+        b"\x01\xff\x42\x00\x01\xff\x42\x01a",
+        b"\x01\xff\x42\x00\x05\x00\x21\x01\x00",
+        b"\x01\xff\x42\x00\x01\xff\x42\x00\x01\xff\x42\x02ab",
+        b"\x01\xff\x42\x03abcd",
+    ],
+)
+def test_attribute_parsing_zero_length_strings(raw_report):
+    """Test reports are interpreted like enumerating every interpretation did."""
+
+    cluster = BasicCluster(mock.MagicMock())
+
+    def interpret_all(data):
+        if not data:
+            yield ()
+            return
+
+        try:
+            parsed = list(cluster._iter_parse_attr_report(data))
+        except (KeyError, ValueError):
+            return
+
+        for attr, remaining_data in parsed:
+            for remaining_attrs in interpret_all(remaining_data):
+                yield (attr,) + remaining_attrs
+
+    reports = list(interpret_all(raw_report))
+    assert cluster._interpret_attr_reports(raw_report, count=True) == (
+        reports[0],
+        len(reports),
+    )
+
+
+def test_aqara_attribute_report_tags():
+    """Test Aqara report tags are resolved through a table built once per model."""
+
+    tags = aqara_tag_table("lumi.weather")
+    assert aqara_tag_table("lumi.weather") is tags
+    assert tags[102].name == "pressure_measurement_precision"
+    assert tags[102].targets[0].converter(100000) == 1000
+    assert tags[4].name == XIAOMI_ATTR_4
+    assert not tags[4].targets
+    assert aqara_tag_table("lumi.sensor_ht")[102].name == "pressure_measurement"
+    assert 102 not in aqara_tag_table("lumi.unknown")
+
+    # the shared table can't be changed by its users
+    with pytest.raises(TypeError):
+        tags[102] = tags[4]
+
+    cluster = BasicCluster(mock.MagicMock())
+    cluster.endpoint.device.model = "lumi.weather"
+    attributes = cluster._parse_aqara_attributes(
+        create_aqara_attr_report({1: 3000, 102: 100000, 200: 1})
+    )
+    assert attributes == {
+        "battery_voltage_mV": 3000,
+        "pressure_measurement_precision": 100000,
+        "0xff01-200": 1,
+    }
+
+
 @mock.patch("zigpy.zcl.Cluster.bind", mock.AsyncMock())
 @pytest.mark.parametrize("quirk", (zhaquirks.xiaomi.aqara.plug_eu.PlugMAEU01,))
 async def test_xiaomi_eu_plug_binding(zigpy_device_from_quirk, quirk):
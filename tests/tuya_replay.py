@@ -0,0 +1,185 @@
+"""Record and replay Tuya manufacturer cluster traffic in tests."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Iterable
+import dataclasses
+import gzip
+import json
+import pathlib
+import statistics
+import time
+from typing import IO, Any
+
+from zigpy.zcl import Cluster, foundation
+
+from zhaquirks.tuya import TUYA_ACTIVE_STATUS_RPT, TUYA_GET_DATA, TUYA_SET_DATA_RESPONSE
+
+RECORDED_COMMANDS = frozenset(
+    {TUYA_GET_DATA, TUYA_SET_DATA_RESPONSE, TUYA_ACTIVE_STATUS_RPT}
+)
+
+
+@dataclasses.dataclass(frozen=True)
+class TuyaFrame:
+    """ZCL frame received by a Tuya cluster, with its full header."""
+
+    timestamp: float
+    data: bytes
+
+    @property
+    def header(self) -> foundation.ZCLHeader:
+        """ZCL header of the frame."""
+        return foundation.ZCLHeader.deserialize(self.data)[0]
+
+    @property
+    def tsn(self) -> int:
+        """Transaction sequence number of the frame."""
+        return self.header.tsn
+
+    @property
+    def command_id(self) -> int:
+        """Command of the frame."""
+        return self.header.command_id
+
+
+@dataclasses.dataclass
+class TuyaTrace:
+    """Frames received by a Tuya cluster of a device.
+
+    Traces are stored as JSON lines, the device signature followed by one
+    `[timestamp, frame]` line per frame, gzip compressed when the file name ends
+    with `.gz`.
+    """
+
+    manufacturer: str
+    model: str
+    endpoint_id: int
+    cluster_id: int
+    frames: list[TuyaFrame] = dataclasses.field(default_factory=list)
+
+    @classmethod
+    def from_cluster(cls, cluster: Cluster) -> TuyaTrace:
+        """Create an empty trace with the signature of the cluster's device."""
+        device = cluster.endpoint.device
+        return cls(
+            manufacturer=device.manufacturer,
+            model=device.model,
+            endpoint_id=cluster.endpoint.endpoint_id,
+            cluster_id=cluster.cluster_id,
+        )
+
+    def save(self, path: str | pathlib.Path) -> None:
+        """Write the trace to a file."""
+        with _open(path, "wt") as file:
+            signature = {
+                "manufacturer": self.manufacturer,
+                "model": self.model,
+                "endpoint_id": self.endpoint_id,
+                "cluster_id": self.cluster_id,
+            }
+            file.write(json.dumps(signature) + "\n")
+            for frame in self.frames:
+                line = [frame.timestamp, frame.data.hex()]
+                file.write(json.dumps(line, separators=(",", ":")) + "\n")
+
+    @classmethod
+    def load(cls, path: str | pathlib.Path) -> TuyaTrace:
+        """Read a trace written by `save`."""
+        with _open(path, "rt") as file:
+            trace = cls(**json.loads(file.readline()))
+            for line in file:
+                timestamp, data = json.loads(line)
+                trace.frames.append(TuyaFrame(timestamp, bytes.fromhex(data)))
+        return trace
+
+
+def _open(path: str | pathlib.Path, mode: str) -> IO[str]:
+    if str(path).endswith(".gz"):
+        return gzip.open(path, mode, encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class TuyaFrameRecorder:
+    """Append the Tuya datapoint commands received by a cluster to a trace.
+
+    The cluster's `handle_message` is wrapped while recording, so frames are
+    recorded with their full header, including the frame control and
+    manufacturer code.
+    """
+
+    def __init__(
+        self, cluster: Cluster, commands: Iterable[int] = RECORDED_COMMANDS
+    ) -> None:
+        """Init."""
+        self.trace = TuyaTrace.from_cluster(cluster)
+        self._commands = frozenset(commands)
+        self._cluster = cluster
+        self._handle_message = cluster.handle_message
+        cluster.handle_message = self.handle_message
+
+    def handle_message(
+        self, hdr: foundation.ZCLHeader, args: Any, **kwargs: Any
+    ) -> None:
+        """Record a received cluster command and handle it."""
+        if hdr.frame_control.is_cluster and hdr.command_id in self._commands:
+            self.trace.frames.append(
+                TuyaFrame(time.time(), hdr.serialize() + args.serialize())
+            )
+        self._handle_message(hdr, args, **kwargs)
+
+    def stop(self) -> TuyaTrace:
+        """Stop recording and return the trace."""
+        del self._cluster.handle_message
+        return self.trace
+
+
+@dataclasses.dataclass
+class ReplayReport:
+    """Handling latencies of replayed frames."""
+
+    latencies: list[tuple[TuyaFrame, float]] = dataclasses.field(default_factory=list)
+
+    @property
+    def total(self) -> float:
+        """Seconds spent handling frames."""
+        return sum(latency for _, latency in self.latencies)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Summarize the report as a JSON serializable dict."""
+        latencies = [latency for _, latency in self.latencies]
+        return {
+            "frames": len(latencies),
+            "total": self.total,
+            "mean": statistics.fmean(latencies) if latencies else None,
+            "median": statistics.median(latencies) if latencies else None,
+            "max": max(latencies, default=None),
+        }
+
+
+async def replay_trace(
+    trace: TuyaTrace, cluster: Cluster, *, realtime: bool = False
+) -> ReplayReport:
+    """Feed the frames of a trace to a cluster, measuring how long each takes to handle.
+
+    With `realtime`, frames are spaced like they were recorded, otherwise they are
+    replayed as fast as possible. Pending tasks run between frames either way.
+    """
+    report = ReplayReport()
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+
+    for frame in trace.frames:
+        if realtime:
+            offset = frame.timestamp - trace.frames[0].timestamp
+            await asyncio.sleep(max(0.0, start + offset - loop.time()))
+
+        began = time.perf_counter()
+        hdr, args = cluster.deserialize(frame.data)
+        cluster.handle_message(hdr, args)
+        report.latencies.append((frame, time.perf_counter() - began))
+
+        await asyncio.sleep(0)
+
+    return report
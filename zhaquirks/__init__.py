@@ -2,9 +2,8 @@
 
 from __future__ import annotations
 
-import asyncio
+from collections.abc import Iterable
 import importlib
-import importlib.util
 import logging
 import pathlib
 import pkgutil
@@ -14,6 +13,7 @@ from typing import Any
 
 import zigpy.device
 import zigpy.endpoint
+import zigpy.quirks
 from zigpy.quirks import DEVICE_REGISTRY, CustomCluster, CustomDevice
 import zigpy.types as t
 from zigpy.util import ListenableMixin
@@ -47,6 +47,24 @@ from .const import (
     ZHA_SEND_EVENT,
     ZONE_STATUS_CHANGE_COMMAND,
 )
+from .loader import (
+    CUSTOM_QUIRK_SOURCES,
+    MANIFEST_PATH,
+    CustomQuirksReload,
+    DeviceFilter,
+    ImportProfiler,
+    LazyQuirkLoader,
+    ModuleSource,
+    QuirkManifest,
+    QuirkSnapshot,
+    SetupReport,
+    custom_quirk_modules,
+    custom_quirk_spec,
+    exec_custom_quirk,
+    quirks_fingerprint,
+    remove_module_quirks,
+)
+from .timers import TimerWheel
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -60,6 +78,54 @@ class Bus(ListenableMixin):
         self._listeners = {}
 
 
+class KeyedBus(Bus):
+    """Event bus routing events to the listeners of a key, e.g. an endpoint id.
+
+    Listeners added with a key receive the events routed to that key and all
+    events sent with `listener_event`. Listeners added without a key receive
+    every event.
+    """
+
+    def __init__(self, *args, **kwargs):
+        """Init keyed event bus."""
+        super().__init__(*args, **kwargs)
+        self._keyed_listeners: dict[typing.Hashable, list[typing.Any]] = {}
+
+    def add_listener(self, listener: typing.Any, key: typing.Hashable = None) -> int:
+        """Add a listener for the events routed to `key`, or all events if None."""
+        self._keyed_listeners.setdefault(key, []).append(listener)
+        return super().add_listener(listener)
+
+    def remove_listener(self, listener: typing.Any) -> None:
+        """Remove a listener."""
+        super().remove_listener(listener)
+        for listeners in self._keyed_listeners.values():
+            for index, attached in enumerate(listeners):
+                if attached is listener:
+                    del listeners[index]
+                    return
+
+    def route_event(
+        self, key: typing.Hashable, method_name: str, *args
+    ) -> list[typing.Any]:
+        """Call `method_name` of the listeners for `key` and the unkeyed listeners."""
+        listeners = self._keyed_listeners.get(key, [])
+        if key is not None:
+            listeners = listeners + self._keyed_listeners.get(None, [])
+
+        result = []
+        for listener in listeners:
+            if (method := getattr(listener, method_name, None)) is None:
+                continue
+            try:
+                result.append(method(*args))
+            except Exception as exc:
+                _LOGGER.debug(
+                    "Error calling listener %r with args %r", method, args, exc_info=exc
+                )
+        return result
+
+
 class LocalDataCluster(CustomCluster):
     """Cluster meant to prevent remote calls.
 
@@ -69,7 +135,7 @@ class LocalDataCluster(CustomCluster):
     """
 
     _CONSTANT_ATTRIBUTES: dict[int, typing.Any] = {}
-    _VALID_ATTRIBUTES: set[int] = set()
+    _VALID_ATTRIBUTES: set[int] | frozenset[int] = set()
 
     async def bind(self):
         """Prevent bind."""
@@ -254,11 +320,9 @@ class _Motion(CustomCluster, IasZone):
     def __init__(self, *args, **kwargs):
         """Init."""
         super().__init__(*args, **kwargs)
-        self._loop = asyncio.get_running_loop()
-        self._timer_handle = None
+        self._reset_timer = TimerWheel.for_loop().timer(self._turn_off)
 
     def _turn_off(self):
-        self._timer_handle = None
         self.debug("%s - Resetting motion sensor", self.endpoint.device.ieee)
         self.listener_event(
             CLUSTER_COMMAND, 253, ZONE_STATUS_CHANGE_COMMAND, [OFF, 0, 0, 0]
@@ -284,9 +348,7 @@ class MotionWithReset(_Motion):
         """Handle the cluster command."""
         # check if the command is for a zone status change of ZoneStatus.Alarm_1 or ZoneStatus.Alarm_2
         if hdr.command_id == ZONE_STATUS_CHANGE_COMMAND and args[0] & 3:
-            if self._timer_handle:
-                self._timer_handle.cancel()
-            self._timer_handle = self._loop.call_later(self.reset_s, self._turn_off)
+            self._reset_timer.arm(self.reset_s)
             if self.send_occupancy_event:
                 self.endpoint.device.occupancy_bus.listener_event(OCCUPANCY_EVENT)
 
@@ -309,10 +371,7 @@ class MotionOnEvent(_Motion):
 
         self.debug("%s - Received motion event message", self.endpoint.device.ieee)
 
-        if self._timer_handle:
-            self._timer_handle.cancel()
-
-        self._timer_handle = self._loop.call_later(self.reset_s, self._turn_off)
+        self._reset_timer.arm(self.reset_s)
 
 
 class _Occupancy(CustomCluster, OccupancySensing):
@@ -323,11 +382,9 @@ class _Occupancy(CustomCluster, OccupancySensing):
     def __init__(self, *args, **kwargs):
         """Init."""
         super().__init__(*args, **kwargs)
-        self._timer_handle = None
-        self._loop = asyncio.get_running_loop()
+        self._reset_timer = TimerWheel.for_loop().timer(self._turn_off)
 
     def _turn_off(self):
-        self._timer_handle = None
         self._update_attribute(OCCUPANCY_STATE, OFF)
 
 
@@ -342,11 +399,7 @@ class OccupancyOnEvent(_Occupancy):
     def occupancy_event(self):
         """Occupancy event."""
         self._update_attribute(OCCUPANCY_STATE, ON)
-
-        if self._timer_handle:
-            self._timer_handle.cancel()
-
-        self._timer_handle = self._loop.call_later(self.reset_s, self._turn_off)
+        self._reset_timer.arm(self.reset_s)
 
 
 class OccupancyWithReset(_Occupancy):
@@ -356,10 +409,8 @@ class OccupancyWithReset(_Occupancy):
         super()._update_attribute(attrid, value)
 
         if attrid == OCCUPANCY_STATE and value == ON:
-            if self._timer_handle:
-                self._timer_handle.cancel()
+            self._reset_timer.arm(self.reset_s)
             self.endpoint.device.motion_bus.listener_event(MOTION_EVENT)
-            self._timer_handle = self._loop.call_later(self.reset_s, self._turn_off)
 
 
 class QuickInitDevice(CustomDevice):
@@ -446,44 +497,246 @@ class NoReplyMixin:
         return rsp
 
 
-def setup(custom_quirks_path: str | None = None) -> None:
-    """Register all quirks with zigpy, including optional custom quirks."""
+def quirk_modules() -> list[str]:
+    """Return the names of all modules in the `zhaquirks` package, in import order."""
+    return [
+        modname
+        for _importer, modname, _ispkg in pkgutil.walk_packages(
+            path=__path__,
+            prefix=__name__ + ".",
+        )
+    ]
 
-    if custom_quirks_path is not None:
-        DEVICE_REGISTRY.purge_custom_quirks(custom_quirks_path)
 
-    # Import all quirks in the `zhaquirks` package first
-    for _importer, modname, _ispkg in pkgutil.walk_packages(
-        path=__path__,
-        prefix=__name__ + ".",
-    ):
-        _LOGGER.debug("Loading quirks module %r", modname)
-        importlib.import_module(modname)
+def build_quirk_manifest(
+    custom_modules: dict[str, str] | None = None, *, package: bool = True
+) -> QuirkManifest:
+    """Build the quirk manifest from the currently registered quirks.
 
-    if custom_quirks_path is None:
-        return
+    `custom_modules` maps the names of loaded custom quirk modules to their
+    source files. They are included after the `zhaquirks` modules, which are
+    left out without `package`.
+    """
+    custom_modules = custom_modules or {}
+    modules = (quirk_modules() if package else []) + list(custom_modules)
+
+    eager = {
+        quirk.__module__
+        for models in DEVICE_REGISTRY.registry_v1.values()
+        for quirks in models.values()
+        for quirk in quirks
+        if issubclass(quirk, QuickInitDevice)
+    }
+    eager.update(
+        handler.__module__
+        for handler in zigpy.quirks._uninitialized_device_message_handlers
+    )
+
+    return QuirkManifest.from_registry(DEVICE_REGISTRY, modules, eager, custom_modules)
+
+
+def load_custom_quirks(
+    custom_quirks_path: str, profiler: ImportProfiler | None = None
+) -> dict[str, str]:
+    """Import all custom quirks, returning the source file of each loaded module."""
+    if profiler is None:
+        profiler = ImportProfiler(DEVICE_REGISTRY, enabled=False)
 
     path = pathlib.Path(custom_quirks_path)
     _LOGGER.debug("Loading custom quirks from %r", path)
 
-    loaded = False
+    loaded = {}
 
     # Treat the custom quirk path (e.g. `/config/custom_quirks/`) itself as a module
     for importer, modname, _ispkg in pkgutil.walk_packages(path=[str(path)]):
         _LOGGER.debug("Loading custom quirk module %r", modname)
 
         try:
-            spec = importer.find_spec(modname)
-            module = importlib.util.module_from_spec(spec)
-            sys.modules[modname] = module
-            spec.loader.exec_module(module)
+            module = profiler.measure(
+                modname, exec_custom_quirk, modname, importer.find_spec(modname)
+            )
         except Exception:
             _LOGGER.exception("Unexpected exception importing custom quirk %r", modname)
         else:
-            loaded = True
+            loaded[modname] = module.__file__
 
     if loaded:
-        _LOGGER.warning(
-            "Loaded custom quirks. Please contribute them to"
-            " https://github.com/zigpy/zha-device-handlers"
+        _warn_custom_quirks()
+
+    return loaded
+
+
+def _warn_custom_quirks() -> None:
+    _LOGGER.warning(
+        "Loaded custom quirks. Please contribute them to"
+        " https://github.com/zigpy/zha-device-handlers"
+    )
+
+
+def quirk_match_report() -> dict[str, int]:
+    """Return the number of devices each loaded quirk module matched so far.
+
+    Modules that never matched a device are reported with a count of zero.
+    Only available if `setup` was called with `lazy`, `snapshot_path`,
+    `packages` or `device_filter`.
+    """
+    if (loader := LazyQuirkLoader.installed(DEVICE_REGISTRY)) is None:
+        return {}
+    return loader.match_report()
+
+
+def reload_custom_quirks(custom_quirks_path: str) -> CustomQuirksReload:
+    """Re-execute only the custom quirks that changed since they were loaded.
+
+    Registry entries of changed and removed modules are swapped out, all other
+    quirks stay registered. Modules importing from a changed module keep
+    referencing its previous version until they are changed themselves.
+    """
+    if (loader := LazyQuirkLoader.installed(DEVICE_REGISTRY)) is not None:
+        # load custom quirks still pending in a snapshot so they aren't executed twice
+        loader.load_modules(loader.manifest.paths)
+
+    root = pathlib.Path(custom_quirks_path)
+    modules = custom_quirk_modules(custom_quirks_path)
+    result = CustomQuirksReload()
+
+    for modname, source in list(CUSTOM_QUIRK_SOURCES.items()):
+        if modname in modules or not pathlib.Path(source.file).is_relative_to(root):
+            continue
+
+        _LOGGER.debug("Removing custom quirk module %r", modname)
+        remove_module_quirks(DEVICE_REGISTRY, modname, source.file)
+        del CUSTOM_QUIRK_SOURCES[modname]
+        sys.modules.pop(modname, None)
+        result.removed.append(modname)
+
+    for modname, file in modules.items():
+        previous = CUSTOM_QUIRK_SOURCES.get(modname)
+        source = ModuleSource.from_file(file, previous)
+
+        if previous is not None and previous.sha256 == source.sha256:
+            CUSTOM_QUIRK_SOURCES[modname] = source
+            continue
+
+        if previous is not None:
+            remove_module_quirks(DEVICE_REGISTRY, modname, previous.file)
+
+        _LOGGER.debug("Reloading custom quirk module %r", modname)
+        try:
+            exec_custom_quirk(modname, custom_quirk_spec(modname, file))
+        except Exception:
+            _LOGGER.exception("Unexpected exception importing custom quirk %r", modname)
+            result.failed.append(modname)
+        else:
+            (result.changed if previous is not None else result.added).append(modname)
+
+    return result
+
+
+def setup(
+    custom_quirks_path: str | None = None,
+    *,
+    lazy: bool = False,
+    snapshot_path: str | None = None,
+    packages: Iterable[str] | None = None,
+    device_filter: DeviceFilter | None = None,
+    profile: bool = False,
+) -> SetupReport | None:
+    """Register all quirks with zigpy, including optional custom quirks.
+
+    With `lazy`, quirk modules listed in the quirk manifest are only imported
+    once zigpy looks up a device they provide a quirk for.
+
+    With `snapshot_path`, a manifest covering both the `zhaquirks` and the custom
+    quirks is persisted after loading the quirks, even if `lazy`, `packages` or
+    `device_filter` left some of them out. As long as the package version and
+    the custom quirk files don't change, later calls load quirks lazily from
+    this snapshot instead.
+
+    `packages` (e.g. `["tuya", "xiaomi"]`) and `device_filter` restrict the
+    quirks to some vendor subpackages and to the (manufacturer, model) pairs the
+    filter accepts. Modules of other vendors and devices are never imported.
+    Custom quirks are always loaded. See `QuirkManifest.filter`.
+
+    With `profile`, the duration, memory and number of quirks of every module
+    imported by this call are measured and returned as a `SetupReport`.
+    """
+    with ImportProfiler(DEVICE_REGISTRY, enabled=profile) as profiler:
+        _setup(
+            custom_quirks_path,
+            lazy=lazy,
+            snapshot_path=snapshot_path,
+            packages=packages,
+            device_filter=device_filter,
+            profiler=profiler,
+        )
+
+    return profiler.report() if profile else None
+
+
+def _setup(
+    custom_quirks_path: str | None,
+    *,
+    lazy: bool,
+    snapshot_path: str | None,
+    packages: Iterable[str] | None,
+    device_filter: DeviceFilter | None,
+    profiler: ImportProfiler,
+) -> None:
+    if custom_quirks_path is not None:
+        DEVICE_REGISTRY.purge_custom_quirks(custom_quirks_path)
+        CUSTOM_QUIRK_SOURCES.clear()
+
+    if (loader := LazyQuirkLoader.installed(DEVICE_REGISTRY)) is not None:
+        loader.uninstall()
+
+    if snapshot_path is not None:
+        fingerprint = quirks_fingerprint(custom_quirks_path)
+        snapshot = QuirkSnapshot.load(snapshot_path)
+
+        if snapshot is not None and snapshot.fingerprint == fingerprint:
+            _LOGGER.debug("Loading quirks lazily from snapshot %r", snapshot_path)
+            manifest = snapshot.manifest.filter(packages, device_filter)
+            loader = LazyQuirkLoader(manifest, DEVICE_REGISTRY)
+            loader.import_module = profiler.wrap(loader.import_module)
+            loader.install()
+            if custom_quirks_path is not None and snapshot.manifest.paths:
+                _LOGGER.debug(
+                    "Loading custom quirks lazily from %r",
+                    pathlib.Path(custom_quirks_path),
+                )
+                _warn_custom_quirks()
+            return
+
+    partial = lazy or packages is not None or device_filter is not None
+
+    if partial:
+        manifest = QuirkManifest.load(MANIFEST_PATH)
+        loader = LazyQuirkLoader(
+            manifest.filter(packages, device_filter), DEVICE_REGISTRY
         )
+        loader.import_module = profiler.wrap(loader.import_module)
+        loader.install()
+        if not lazy:
+            loader.load_modules(loader.manifest.modules)
+    else:
+        # Import all quirks in the `zhaquirks` package first
+        import_module = profiler.wrap(importlib.import_module)
+        for modname in quirk_modules():
+            _LOGGER.debug("Loading quirks module %r", modname)
+            import_module(modname)
+
+    custom_modules = {}
+    if custom_quirks_path is not None:
+        custom_modules = load_custom_quirks(custom_quirks_path, profiler)
+
+    if snapshot_path is not None:
+        _LOGGER.debug("Writing quirk snapshot %r", snapshot_path)
+        if partial:
+            # the shipped manifest covers the `zhaquirks` modules that weren't imported
+            snapshot_manifest = manifest.merge(
+                build_quirk_manifest(custom_modules, package=False)
+            )
+        else:
+            snapshot_manifest = build_quirk_manifest(custom_modules)
+        QuirkSnapshot(fingerprint, snapshot_manifest).save(snapshot_path)
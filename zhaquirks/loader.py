@@ -0,0 +1,901 @@
+"""Quirk module loading helpers used by `zhaquirks.setup`."""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from collections.abc import Callable, Iterable
+import dataclasses
+import hashlib
+import importlib
+from importlib.machinery import ModuleSpec
+import importlib.metadata
+import importlib.util
+import json
+import logging
+import os
+import pathlib
+import pkgutil
+import sys
+import time
+import tracemalloc
+from types import ModuleType
+from typing import Any, TypeVar
+
+from zigpy.quirks import BaseCustomDevice, DeviceRegistry
+from zigpy.quirks.v2 import QuirksV2RegistryEntry
+import zigpy.types as t
+from zigpy.typing import CustomDeviceType, DeviceType
+
+_LOGGER = logging.getLogger(__name__)
+
+MANIFEST_PATH = pathlib.Path(__file__).parent / "quirk_manifest.json"
+
+RegistryKey = tuple[str | None, str | None]
+DeviceFilter = Callable[[str | None, str | None], bool]
+
+_T = TypeVar("_T")
+
+
+def module_name_by_file() -> dict[str, str]:
+    """Map the source file of every imported module to the module name."""
+    return {
+        str(pathlib.Path(module.__file__)): name
+        for name, module in list(sys.modules.items())
+        if getattr(module, "__file__", None)
+    }
+
+
+def registry_modules(
+    registry: DeviceRegistry, files: dict[str, str] | None = None
+) -> dict[RegistryKey, list[str]]:
+    """Return the modules registering quirks for each registry key.
+
+    Modules are listed in matching priority, i.e. in the order the registry
+    considers their quirks.
+    """
+    if files is None:
+        files = module_name_by_file()
+
+    result: dict[RegistryKey, list[str]] = defaultdict(list)
+
+    for manufacturer, models in registry.registry_v1.items():
+        for model, quirks in models.items():
+            for quirk in quirks:
+                if quirk.__module__ not in result[(manufacturer, model)]:
+                    result[(manufacturer, model)].append(quirk.__module__)
+
+    for key, entries in registry.registry_v2.items():
+        for entry in entries:
+            module = files.get(str(entry.quirk_file))
+            if module is not None and module not in result[key]:
+                result[key].append(module)
+
+    return {key: modules for key, modules in result.items() if modules}
+
+
+@dataclasses.dataclass(frozen=True)
+class ModuleSource:
+    """State of the source file of a custom quirk module."""
+
+    file: str
+    mtime_ns: int
+    size: int
+    sha256: str
+
+    @classmethod
+    def from_file(cls, file: str, previous: ModuleSource | None = None) -> ModuleSource:
+        """Read the state of `file`, skipping hashing if it wasn't touched."""
+        stat = os.stat(file)
+        if (
+            previous is not None
+            and previous.file == file
+            and previous.mtime_ns == stat.st_mtime_ns
+            and previous.size == stat.st_size
+        ):
+            return previous
+
+        return cls(
+            file=file,
+            mtime_ns=stat.st_mtime_ns,
+            size=stat.st_size,
+            sha256=hashlib.sha256(pathlib.Path(file).read_bytes()).hexdigest(),
+        )
+
+
+# source state of every custom quirk module executed so far, by module name
+CUSTOM_QUIRK_SOURCES: dict[str, ModuleSource] = {}
+
+
+@dataclasses.dataclass
+class CustomQuirksReload:
+    """Custom quirk modules affected by a reload."""
+
+    added: list[str] = dataclasses.field(default_factory=list)
+    changed: list[str] = dataclasses.field(default_factory=list)
+    removed: list[str] = dataclasses.field(default_factory=list)
+    failed: list[str] = dataclasses.field(default_factory=list)
+
+
+def custom_quirk_spec(name: str, path: str) -> ModuleSpec:
+    """Create the spec of a custom quirk module from its source file."""
+    file = pathlib.Path(path)
+    return importlib.util.spec_from_file_location(
+        name,
+        file,
+        submodule_search_locations=(
+            [str(file.parent)] if file.name == "__init__.py" else None
+        ),
+    )
+
+
+def exec_custom_quirk(name: str, spec: ModuleSpec) -> ModuleType:
+    """Execute a custom quirk module and record the state of its source file."""
+    CUSTOM_QUIRK_SOURCES[name] = ModuleSource.from_file(
+        spec.origin, CUSTOM_QUIRK_SOURCES.get(name)
+    )
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def custom_quirk_modules(custom_quirks_path: str) -> dict[str, str]:
+    """Find all custom quirk modules and their source files without importing them.
+
+    Modules are returned in the order `pkgutil.walk_packages` would import them.
+    """
+    result = {}
+
+    def walk(path: pathlib.Path, prefix: str) -> None:
+        for finder, name, ispkg in pkgutil.iter_modules([str(path)]):
+            spec = finder.find_spec(name)
+            if spec is None or spec.origin is None:
+                continue
+            result[prefix + name] = spec.origin
+            if ispkg:
+                walk(path / name, f"{prefix}{name}.")
+
+    walk(pathlib.Path(custom_quirks_path), "")
+    return result
+
+
+def remove_module_quirks(registry: DeviceRegistry, name: str, file: str) -> None:
+    """Remove all quirks registered by a module from the registry."""
+    for models in registry.registry_v1.values():
+        for quirks in models.values():
+            for quirk in [q for q in quirks if q.__module__ == name]:
+                _LOGGER.debug("Removing custom v1 quirk: %s", quirk)
+                quirks.remove(quirk)
+
+    for entries in registry.registry_v2.values():
+        for entry in [e for e in entries if str(e.quirk_file) == file]:
+            _LOGGER.debug("Removing custom v2 quirk: %s", entry)
+            entries.remove(entry)
+
+    if (watcher := RegistryWatcher.installed(registry)) is not None:
+        watcher.bump()
+
+
+def package_version() -> str | None:
+    """Return the installed `zha-quirks` version, if known."""
+    try:
+        return importlib.metadata.version("zha-quirks")
+    except importlib.metadata.PackageNotFoundError:
+        return None
+
+
+def quirks_fingerprint(custom_quirks_path: str | None = None) -> dict[str, Any]:
+    """Fingerprint the available quirks.
+
+    The fingerprint covers the package version, the shipped quirk manifest and
+    the content of every custom quirk file.
+    """
+    custom_quirks = {}
+    if custom_quirks_path is not None:
+        root = pathlib.Path(custom_quirks_path)
+        custom_quirks = {
+            file.relative_to(root).as_posix(): hashlib.sha256(
+                file.read_bytes()
+            ).hexdigest()
+            for file in sorted(root.rglob("*.py"))
+        }
+
+    return {
+        "version": package_version(),
+        "manifest": hashlib.sha256(MANIFEST_PATH.read_bytes()).hexdigest(),
+        "custom_quirks_path": custom_quirks_path,
+        "custom_quirks": custom_quirks,
+    }
+
+
+@dataclasses.dataclass
+class QuirkManifest:
+    """Mapping of registry keys to the quirk modules registering them.
+
+    `modules` lists every quirk module in import order, `eager` the modules
+    that have to be imported up front (quick init devices and uninitialized
+    device message handlers) and `quirks` the modules for each
+    (manufacturer, model) key in matching priority. Wildcard keys use `None`
+    for the manufacturer or model. `paths` holds the source file of modules
+    that can't be imported by name, like custom quirks.
+    """
+
+    modules: list[str] = dataclasses.field(default_factory=list)
+    eager: list[str] = dataclasses.field(default_factory=list)
+    quirks: dict[RegistryKey, list[str]] = dataclasses.field(default_factory=dict)
+    paths: dict[str, str] = dataclasses.field(default_factory=dict)
+
+    @classmethod
+    def from_registry(
+        cls,
+        registry: DeviceRegistry,
+        modules: Iterable[str],
+        eager: Iterable[str] = (),
+        paths: dict[str, str] | None = None,
+    ) -> QuirkManifest:
+        """Build a manifest for `modules` from the quirks currently registered."""
+        modules = list(modules)
+        known = set(modules)
+
+        quirks = {}
+        for key, key_modules in registry_modules(registry).items():
+            key_modules = [module for module in key_modules if module in known]
+            if key_modules:
+                quirks[key] = key_modules
+
+        eager = set(eager) & known
+        registering = {
+            module for key_modules in quirks.values() for module in key_modules
+        }
+
+        return cls(
+            modules=[module for module in modules if module in registering | eager],
+            eager=[module for module in modules if module in eager],
+            quirks=dict(sorted(quirks.items(), key=lambda item: str(item[0]))),
+            paths=dict(paths or {}),
+        )
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> QuirkManifest:
+        """Create a manifest from its JSON representation."""
+        return cls(
+            modules=data["modules"],
+            eager=data["eager"],
+            quirks={
+                (manufacturer, model): modules
+                for manufacturer, model, modules in data["quirks"]
+            },
+            paths=data.get("paths", {}),
+        )
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the JSON representation of the manifest."""
+        return {
+            "modules": self.modules,
+            "eager": self.eager,
+            "quirks": [
+                [manufacturer, model, modules]
+                for (manufacturer, model), modules in self.quirks.items()
+            ],
+            "paths": self.paths,
+        }
+
+    @classmethod
+    def load(cls, path: pathlib.Path = MANIFEST_PATH) -> QuirkManifest:
+        """Load a manifest written by `save`."""
+        return cls.from_dict(json.loads(pathlib.Path(path).read_text(encoding="utf-8")))
+
+    def save(self, path: pathlib.Path = MANIFEST_PATH) -> None:
+        """Write the manifest as JSON, one registry key per line."""
+        data = self.as_dict()
+        lines = [
+            f"  {json.dumps(key)}: {json.dumps(value, ensure_ascii=False)}"
+            for key, value in data.items()
+            if key != "quirks"
+        ]
+        quirks = ",\n".join(
+            f"    {json.dumps(item, ensure_ascii=False)}" for item in data["quirks"]
+        )
+        lines.append(f'  "quirks": [\n{quirks}\n  ]')
+        pathlib.Path(path).write_text(
+            "{\n" + ",\n".join(lines) + "\n}\n", encoding="utf-8"
+        )
+
+    def modules_for(self, manufacturer: str | None, model: str | None) -> list[str]:
+        """Return the modules that may provide a quirk for a device."""
+        result = []
+        for key in (
+            (manufacturer, model),
+            (manufacturer, None),
+            (None, model),
+            (None, None),
+        ):
+            for module in self.quirks.get(key, ()):
+                if module not in result:
+                    result.append(module)
+        return result
+
+    def merge(self, other: QuirkManifest) -> QuirkManifest:
+        """Return a manifest with the modules of `other` imported after this one's.
+
+        Like quirks registered later, the modules of `other` take priority over
+        the ones of this manifest for the same registry key.
+        """
+        quirks = {key: list(modules) for key, modules in other.quirks.items()}
+        for key, key_modules in self.quirks.items():
+            quirks.setdefault(key, []).extend(
+                module for module in key_modules if module not in quirks[key]
+            )
+
+        return QuirkManifest(
+            modules=self.modules + [m for m in other.modules if m not in self.modules],
+            eager=self.eager + [m for m in other.eager if m not in self.eager],
+            quirks=dict(sorted(quirks.items(), key=lambda item: str(item[0]))),
+            paths={**self.paths, **other.paths},
+        )
+
+    def filter(
+        self,
+        packages: Iterable[str] | None = None,
+        device_filter: DeviceFilter | None = None,
+    ) -> QuirkManifest:
+        """Return a manifest restricted to some vendors and devices.
+
+        `packages` names the `zhaquirks` subpackages to keep, like `tuya`.
+        `device_filter` is called with the manufacturer and model of every known
+        registry key, `None` standing in for wildcards. Custom quirk modules are
+        always kept.
+        """
+        if packages is None and device_filter is None:
+            return self
+
+        if packages is not None:
+            packages = set(packages)
+
+        def allowed(module: str) -> bool:
+            return (
+                packages is None
+                or module in self.paths
+                or module.split(".")[1] in packages
+            )
+
+        quirks = {}
+        for key, key_modules in self.quirks.items():
+            keep_key = device_filter is None or device_filter(*key)
+            key_modules = [
+                module
+                for module in key_modules
+                if allowed(module) and (keep_key or module in self.paths)
+            ]
+            if key_modules:
+                quirks[key] = key_modules
+
+        registering = {m for key_modules in self.quirks.values() for m in key_modules}
+        kept = {m for key_modules in quirks.values() for m in key_modules}
+        # modules not registering any quirk are only needed for their side effects
+        eager = [
+            module
+            for module in self.eager
+            if allowed(module) and (module in kept or module not in registering)
+        ]
+
+        return QuirkManifest(
+            modules=[m for m in self.modules if m in kept or m in eager],
+            eager=eager,
+            quirks=quirks,
+            paths=dict(self.paths),
+        )
+
+
+@dataclasses.dataclass
+class QuirkSnapshot:
+    """Quirk manifest persisted together with the fingerprint it is valid for."""
+
+    fingerprint: dict[str, Any]
+    manifest: QuirkManifest
+
+    @classmethod
+    def load(cls, path: pathlib.Path) -> QuirkSnapshot | None:
+        """Load a snapshot, returning `None` if it is missing or unreadable."""
+        try:
+            data = json.loads(pathlib.Path(path).read_text(encoding="utf-8"))
+            return cls(
+                fingerprint=data["fingerprint"],
+                manifest=QuirkManifest.from_dict(data["manifest"]),
+            )
+        except (OSError, KeyError, TypeError, ValueError):
+            _LOGGER.debug("Ignoring unusable quirk snapshot %r", path, exc_info=True)
+            return None
+
+    def save(self, path: pathlib.Path) -> None:
+        """Atomically write the snapshot."""
+        path = pathlib.Path(path)
+        tmp_path = path.with_name(path.name + ".tmp")
+        tmp_path.write_text(
+            json.dumps(
+                {"fingerprint": self.fingerprint, "manifest": self.manifest.as_dict()}
+            ),
+            encoding="utf-8",
+        )
+        tmp_path.replace(path)
+
+
+class RegistryWatcher:
+    """Track changes of a device registry without walking it.
+
+    Installing the watcher wraps the registry methods adding and removing
+    quirks until it is uninstalled. `generation` changes whenever quirks may
+    have been added, removed or reordered, so indexes built from the registry
+    know when to rebuild, and `v1_added` and `v2_added` count the quirks
+    registered so far.
+    """
+
+    _METHODS = (
+        "add_to_registry",
+        "add_to_registry_v2",
+        "remove",
+        "purge_custom_quirks",
+    )
+
+    def __init__(self, registry: DeviceRegistry) -> None:
+        """Init."""
+        self.registry = registry
+        self.generation = 0
+        self.v1_added = 0
+        self.v2_added = 0
+        self._last_v2_entry: Any = None
+        self._overridden: dict[str, Any] = {}
+        self._add_to_registry = registry.add_to_registry
+        self._add_to_registry_v2 = registry.add_to_registry_v2
+        self._remove = registry.remove
+        self._purge_custom_quirks = registry.purge_custom_quirks
+
+    @staticmethod
+    def installed(registry: DeviceRegistry) -> RegistryWatcher | None:
+        """Return the watcher currently installed on `registry`, if any."""
+        watcher = getattr(registry.__dict__.get("add_to_registry"), "__self__", None)
+        return watcher if isinstance(watcher, RegistryWatcher) else None
+
+    @classmethod
+    def for_registry(cls, registry: DeviceRegistry) -> RegistryWatcher:
+        """Return the watcher of `registry`, installing one if needed."""
+        if (watcher := cls.installed(registry)) is None:
+            watcher = cls(registry)
+            watcher.install()
+        return watcher
+
+    def install(self) -> None:
+        """Start watching the registry."""
+        # methods already replaced on the registry instance, e.g. by tests
+        self._overridden = {
+            name: vars(self.registry)[name]
+            for name in self._METHODS
+            if name in vars(self.registry)
+        }
+        for name in self._METHODS:
+            setattr(self.registry, name, getattr(self, name))
+
+    def uninstall(self) -> None:
+        """Stop watching the registry, restoring the wrapped methods."""
+        if self.installed(self.registry) is not self:
+            return
+        for name in self._METHODS:
+            if name in self._overridden:
+                setattr(self.registry, name, self._overridden[name])
+            else:
+                delattr(self.registry, name)
+
+    def bump(self) -> None:
+        """Record a change made to the registry contents directly."""
+        self.generation += 1
+
+    def add_to_registry(self, custom_device: CustomDeviceType) -> None:
+        """Add a v1 quirk to the registry."""
+        self._add_to_registry(custom_device)
+        self.v1_added += 1
+        self.bump()
+
+    def add_to_registry_v2(
+        self, manufacturer: str, model: str, entry: QuirksV2RegistryEntry
+    ) -> None:
+        """Add a v2 quirk entry to the registry."""
+        self._add_to_registry_v2(manufacturer, model, entry)
+        # an entry is added once for each of its manufacturer and model pairs
+        if entry is not self._last_v2_entry:
+            self._last_v2_entry = entry
+            self.v2_added += 1
+        self.bump()
+
+    def remove(self, custom_device: CustomDeviceType) -> None:
+        """Remove a quirk from the registry."""
+        self._remove(custom_device)
+        self.bump()
+
+    def purge_custom_quirks(self, custom_quirks_root: pathlib.Path) -> None:
+        """Remove all custom quirks from the registry."""
+        self._purge_custom_quirks(custom_quirks_root)
+        self.bump()
+
+
+class LazyQuirkLoader:
+    """Import quirk modules only when the registry is asked about their devices.
+
+    Installing the loader wraps `DeviceRegistry.get_device` so the modules
+    listed in the manifest for a device's manufacturer and model are imported
+    right before the registry is queried. Modules imported out of order are
+    moved back to their manifest priority, so matching behaves exactly as if
+    all quirks had been imported at startup. The loader also keeps track of
+    the devices each quirk module matched.
+    """
+
+    def __init__(
+        self,
+        manifest: QuirkManifest,
+        registry: DeviceRegistry,
+        import_module: Callable[[str], ModuleType | None] | None = None,
+    ) -> None:
+        """Init."""
+        self.manifest = manifest
+        self.registry = registry
+        self.import_module = import_module or self._import
+        self._get_device = registry.get_device
+        self._loaded: set[str] = set()
+        self._files: dict[str, str] = {}
+        self._matches: dict[str, set[t.EUI64]] = defaultdict(set)
+        self._keys_by_module: dict[str, list[RegistryKey]] = defaultdict(list)
+        for key, modules in manifest.quirks.items():
+            for module in modules:
+                self._keys_by_module[module].append(key)
+
+    @staticmethod
+    def installed(registry: DeviceRegistry) -> LazyQuirkLoader | None:
+        """Return the loader currently installed on `registry`, if any."""
+        get_device = registry.__dict__.get("get_device")
+        return getattr(get_device, "__self__", None)
+
+    @property
+    def loaded_modules(self) -> set[str]:
+        """Quirk modules imported so far."""
+        return set(self._loaded)
+
+    def install(self) -> None:
+        """Import eager modules and start intercepting registry lookups."""
+        self.registry.get_device = self.get_device
+        self.load_modules(self.manifest.eager)
+
+    def uninstall(self) -> None:
+        """Stop intercepting registry lookups."""
+        if self.registry.__dict__.get("get_device") == self.get_device:
+            del self.registry.get_device
+
+    def load(self, manufacturer: str | None, model: str | None) -> None:
+        """Import all modules that may provide a quirk for a device."""
+        self.load_modules(self.manifest.modules_for(manufacturer, model))
+
+    def load_modules(self, modules: Iterable[str]) -> None:
+        """Import `modules` and restore the matching priority of their quirks."""
+        pending = [module for module in modules if module not in self._loaded]
+        if not pending:
+            return
+
+        for module in pending:
+            _LOGGER.debug("Lazily loading quirks module %r", module)
+            imported = self.import_module(module)
+            self._loaded.add(module)
+            if (file := getattr(imported, "__file__", None)) is not None:
+                self._files[str(pathlib.Path(file))] = module
+
+        self._restore_priority(
+            {key for module in pending for key in self._keys_by_module[module]}
+        )
+
+    def match_report(self) -> dict[str, int]:
+        """Return the number of devices each loaded quirk module matched."""
+        return {
+            module: len(self._matches.get(module, ()))
+            for module in sorted(self._loaded | self._matches.keys())
+        }
+
+    def get_device(self, device: DeviceType) -> CustomDeviceType | DeviceType:
+        """Load the quirks for `device` and look it up in the registry."""
+        if isinstance(device, BaseCustomDevice):
+            return self._get_device(device)
+
+        self.load(device.manufacturer, device.model)
+        quirked = self._get_device(device)
+
+        if quirked is not device:
+            if (metadata := getattr(quirked, "quirk_metadata", None)) is not None:
+                file = str(metadata.quirk_file)
+                module = self._files.get(file, file)
+            else:
+                module = type(quirked).__module__
+            self._matches[module].add(device.ieee)
+
+        return quirked
+
+    def _import(self, name: str) -> ModuleType | None:
+        if name not in self.manifest.paths:
+            return importlib.import_module(name)
+
+        try:
+            # custom quirk packages have to be imported before their modules
+            parts = name.split(".")
+            for index in range(1, len(parts)):
+                parent = ".".join(parts[:index])
+                if parent in self.manifest.paths and parent not in sys.modules:
+                    exec_custom_quirk(
+                        parent, custom_quirk_spec(parent, self.manifest.paths[parent])
+                    )
+            return exec_custom_quirk(
+                name, custom_quirk_spec(name, self.manifest.paths[name])
+            )
+        except Exception:
+            _LOGGER.exception("Unexpected exception importing custom quirk %r", name)
+            return None
+
+    def _restore_priority(self, keys: Iterable[RegistryKey]) -> None:
+        for key in keys:
+            priority = {
+                module: index for index, module in enumerate(self.manifest.quirks[key])
+            }
+
+            # quirks from modules missing in the manifest (custom quirks) stay in front
+            manufacturer, model = key
+            if model in self.registry.registry_v1.get(manufacturer, {}):
+                quirks = self.registry.registry_v1[manufacturer][model]
+                ordered = sorted(quirks, key=lambda q: priority.get(q.__module__, -1))
+                quirks.clear()
+                quirks.extend(ordered)
+
+            if key in self.registry.registry_v2:
+                entries = self.registry.registry_v2[key]
+                ordered = sorted(
+                    entries,
+                    key=lambda e: priority.get(self._files.get(str(e.quirk_file)), -1),
+                )
+                entries.clear()
+                entries.extend(ordered)
+
+        if (watcher := RegistryWatcher.installed(self.registry)) is not None:
+            watcher.bump()
+
+
+@dataclasses.dataclass(frozen=True)
+class ModuleImportStats:
+    """Cost of importing a single quirk module."""
+
+    module: str
+    seconds: float
+    memory_bytes: int
+    v1_quirks: int
+    v2_quirks: int
+
+
+@dataclasses.dataclass
+class SetupReport:
+    """Import statistics collected by `zhaquirks.setup(profile=True)`.
+
+    Costs are exclusive: modules imported for the first time by a quirk module,
+    including third party ones, are reported separately instead of being
+    charged to it. Times include the `tracemalloc` overhead and are only
+    meaningful relative to each other.
+    """
+
+    modules: list[ModuleImportStats]
+    seconds: float
+
+    @property
+    def v1_quirks(self) -> int:
+        """Total number of v1 quirks registered."""
+        return sum(stats.v1_quirks for stats in self.modules)
+
+    @property
+    def v2_quirks(self) -> int:
+        """Total number of v2 quirk entries registered."""
+        return sum(stats.v2_quirks for stats in self.modules)
+
+    @property
+    def memory_bytes(self) -> int:
+        """Total memory retained by all imported modules."""
+        return sum(stats.memory_bytes for stats in self.modules)
+
+    def slowest(self, count: int = 10) -> list[ModuleImportStats]:
+        """Return the `count` modules that took the longest to import."""
+        return sorted(self.modules, key=lambda stats: stats.seconds, reverse=True)[
+            :count
+        ]
+
+    def as_dict(self) -> dict[str, Any]:
+        """Serialize the report, e.g. for `json.dumps`."""
+        return {
+            "seconds": self.seconds,
+            "memory_bytes": self.memory_bytes,
+            "v1_quirks": self.v1_quirks,
+            "v2_quirks": self.v2_quirks,
+            "modules": [dataclasses.asdict(stats) for stats in self.modules],
+        }
+
+
+@dataclasses.dataclass
+class _MeasureFrame:
+    """Module import being measured, with the inclusive cost of nested imports."""
+
+    name: str
+    start: float
+    memory: int
+    v1_added: int
+    v2_added: int
+    nested_seconds: float = 0.0
+    nested_memory: int = 0
+    nested_v1_quirks: int = 0
+    nested_v2_quirks: int = 0
+
+
+class _MeasuringLoader:
+    """Loader measuring the execution of a module as a nested import."""
+
+    def __init__(self, loader: Any, profiler: ImportProfiler) -> None:
+        """Init."""
+        self.loader = loader
+        self.profiler = profiler
+
+    def create_module(self, spec: ModuleSpec) -> ModuleType | None:
+        """Create the module with the original loader."""
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module: ModuleType) -> None:
+        """Execute the module with the original loader, which it keeps."""
+        module.__loader__ = self.loader
+        if module.__spec__ is not None:
+            module.__spec__.loader = self.loader
+        self.profiler.measure(module.__name__, self.loader.exec_module, module)
+
+
+class _MeasuringFinder:
+    """Meta path finder measuring modules imported for the first time by others."""
+
+    def __init__(self, profiler: ImportProfiler) -> None:
+        """Init."""
+        self.profiler = profiler
+
+    def find_spec(
+        self, fullname: str, path: Any, target: ModuleType | None = None
+    ) -> ModuleSpec | None:
+        """Find the module with the other finders and measure its execution."""
+        frames = self.profiler._frames
+        if not frames or frames[-1].name == fullname:
+            return None
+
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            if (spec := finder.find_spec(fullname, path, target)) is not None:
+                break
+        else:
+            return None
+
+        if hasattr(spec.loader, "exec_module"):
+            spec.loader = _MeasuringLoader(spec.loader, self.profiler)
+        return spec
+
+
+class ImportProfiler:
+    """Measure duration, memory and registered quirks of quirk module imports.
+
+    While profiling, modules imported for the first time by a measured module
+    are measured as well and their cost is subtracted from the importing one.
+    Quirks are counted by a `RegistryWatcher`. A disabled profiler simply calls
+    the wrapped functions, so callers don't need to special case profiling.
+    Profiling stops when the context exits.
+    """
+
+    def __init__(self, registry: DeviceRegistry, *, enabled: bool = True) -> None:
+        """Init."""
+        self.registry = registry
+        self.enabled = enabled
+        self.stats: dict[str, ModuleImportStats] = {}
+        self._start = 0.0
+        self._seconds = 0.0
+        self._started_tracemalloc = False
+        self._frames: list[_MeasureFrame] = []
+        self._finder = _MeasuringFinder(self)
+        self._watcher: RegistryWatcher | None = None
+        self._installed_watcher = False
+
+    def __enter__(self) -> ImportProfiler:
+        """Start tracing memory allocations, registered quirks and nested imports."""
+        if self.enabled:
+            if (watcher := RegistryWatcher.installed(self.registry)) is None:
+                watcher = RegistryWatcher(self.registry)
+                watcher.install()
+                self._installed_watcher = True
+            self._watcher = watcher
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracemalloc = True
+            sys.meta_path.insert(0, self._finder)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        """Stop profiling, leaving wrapped import functions unmeasured."""
+        self._seconds = time.perf_counter() - self._start
+        self.enabled = False
+        if self._finder in sys.meta_path:
+            sys.meta_path.remove(self._finder)
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+        if self._installed_watcher:
+            self._watcher.uninstall()
+            self._installed_watcher = False
+
+    def measure(
+        self, name: str, func: Callable[..., _T], *args: Any, **kwargs: Any
+    ) -> _T:
+        """Call `func`, recording its cost as the import of module `name`."""
+        if not self.enabled:
+            return func(*args, **kwargs)
+
+        assert self._watcher is not None
+        frame = _MeasureFrame(
+            name=name,
+            start=time.perf_counter(),
+            memory=tracemalloc.get_traced_memory()[0],
+            v1_added=self._watcher.v1_added,
+            v2_added=self._watcher.v2_added,
+        )
+        self._frames.append(frame)
+
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self._frames.pop()
+            seconds = time.perf_counter() - frame.start
+            memory = tracemalloc.get_traced_memory()[0] - frame.memory
+            v1_quirks = self._watcher.v1_added - frame.v1_added
+            v2_quirks = self._watcher.v2_added - frame.v2_added
+
+            if self._frames:
+                parent = self._frames[-1]
+                parent.nested_seconds += seconds
+                parent.nested_memory += memory
+                parent.nested_v1_quirks += v1_quirks
+                parent.nested_v2_quirks += v2_quirks
+
+            self._record(
+                ModuleImportStats(
+                    module=name,
+                    seconds=seconds - frame.nested_seconds,
+                    memory_bytes=memory - frame.nested_memory,
+                    v1_quirks=v1_quirks - frame.nested_v1_quirks,
+                    v2_quirks=v2_quirks - frame.nested_v2_quirks,
+                )
+            )
+
+    def _record(self, stats: ModuleImportStats) -> None:
+        # a module imported by another one is measured again when setup reaches it
+        if (previous := self.stats.get(stats.module)) is not None:
+            stats = ModuleImportStats(
+                module=stats.module,
+                seconds=previous.seconds + stats.seconds,
+                memory_bytes=previous.memory_bytes + stats.memory_bytes,
+                v1_quirks=previous.v1_quirks + stats.v1_quirks,
+                v2_quirks=previous.v2_quirks + stats.v2_quirks,
+            )
+        self.stats[stats.module] = stats
+
+    def wrap(self, func: Callable[[str], _T]) -> Callable[[str], _T]:
+        """Wrap an import function taking the module name."""
+        if not self.enabled:
+            return func
+
+        def import_module(name: str) -> _T:
+            return self.measure(name, func, name)
+
+        return import_module
+
+    def report(self) -> SetupReport:
+        """Return the statistics collected so far."""
+        return SetupReport(modules=list(self.stats.values()), seconds=self._seconds)
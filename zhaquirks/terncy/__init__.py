@@ -94,10 +94,7 @@ class MotionCluster(LocalDataCluster, _Motion):
             CLUSTER_COMMAND, 254, ZONE_STATUS_CHANGE_COMMAND, [ON, 0, 0, 0]
         )
 
-        if self._timer_handle:
-            self._timer_handle.cancel()
-
-        self._timer_handle = self._loop.call_later(self.reset_s, self._turn_off)
+        self._reset_timer.arm(self.reset_s)
 
         if self.send_occupancy_event:
             self.endpoint.device.occupancy_bus.listener_event(OCCUPANCY_EVENT)
@@ -0,0 +1,139 @@
+"""Timer wheel shared by clusters resetting their state after a delay."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable
+import logging
+import math
+import weakref
+
+_LOGGER = logging.getLogger(__name__)
+
+_TIMER_WHEELS: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, TimerWheel] = (
+    weakref.WeakKeyDictionary()
+)
+
+
+class WheelTimer:
+    """Timer of a `TimerWheel`, re-armed without allocating a new handle."""
+
+    __slots__ = ("_callback", "_expires", "_handle", "_wheel")
+
+    def __init__(self, wheel: TimerWheel, callback: Callable[[], None]) -> None:
+        """Init."""
+        self._wheel = wheel
+        self._callback = callback
+        self._expires: int | None = None  # tick the timer is due at
+        self._handle: asyncio.TimerHandle | None = None
+
+    @property
+    def armed(self) -> bool:
+        """Whether the callback is scheduled."""
+        return self._expires is not None or self._handle is not None
+
+    def arm(self, delay: float) -> None:
+        """Call the callback after `delay` seconds, replacing any earlier deadline."""
+        self._wheel._arm(self, delay)
+
+    def cancel(self) -> None:
+        """Don't call the callback."""
+        self._wheel._disarm(self)
+
+    def _fire(self) -> None:
+        self._handle = None
+        try:
+            self._callback()
+        except Exception:
+            _LOGGER.exception("Error calling timer callback %r", self._callback)
+
+
+class TimerWheel:
+    """Hashed timer wheel driven by a single event loop callback per tick.
+
+    Timers are kept in `slots` buckets by the tick they are due at, so arming,
+    re-arming and cancelling them is O(1). Timers fire at most one tick late.
+    Delays shorter than a tick are scheduled directly on the event loop.
+    """
+
+    def __init__(
+        self, loop: asyncio.AbstractEventLoop, tick: float = 1.0, slots: int = 512
+    ) -> None:
+        """Init."""
+        self.tick = tick
+        self._loop = weakref.ref(loop)
+        self._slots: list[dict[WheelTimer, None]] = [{} for _ in range(slots)]
+        self._current = math.floor(loop.time() / tick)  # last processed tick
+        self._armed = 0
+        self._handle: asyncio.TimerHandle | None = None
+
+    @classmethod
+    def for_loop(cls, loop: asyncio.AbstractEventLoop | None = None) -> TimerWheel:
+        """Return the wheel shared by all timers of an event loop."""
+        if loop is None:
+            loop = asyncio.get_running_loop()
+        if (wheel := _TIMER_WHEELS.get(loop)) is None:
+            wheel = _TIMER_WHEELS[loop] = cls(loop)
+        return wheel
+
+    def __len__(self) -> int:
+        """Return the number of timers in the wheel."""
+        return self._armed
+
+    def timer(self, callback: Callable[[], None]) -> WheelTimer:
+        """Create a timer calling `callback` when it expires."""
+        return WheelTimer(self, callback)
+
+    def _arm(self, timer: WheelTimer, delay: float) -> None:
+        self._disarm(timer)
+        loop = self._loop()
+
+        if delay < self.tick:
+            timer._handle = loop.call_later(delay, timer._fire)
+            return
+
+        if not self._armed:
+            # skip the ticks the wheel was idle for
+            self._current = max(self._current, math.floor(loop.time() / self.tick))
+
+        expires = max(math.ceil((loop.time() + delay) / self.tick), self._current + 1)
+        timer._expires = expires
+        self._slots[expires % len(self._slots)][timer] = None
+        self._armed += 1
+
+        if self._handle is None:
+            self._handle = loop.call_at((self._current + 1) * self.tick, self._advance)
+
+    def _disarm(self, timer: WheelTimer) -> None:
+        if timer._handle is not None:
+            timer._handle.cancel()
+            timer._handle = None
+
+        if timer._expires is not None:
+            del self._slots[timer._expires % len(self._slots)][timer]
+            timer._expires = None
+            self._armed -= 1
+
+    def _advance(self) -> None:
+        """Fire the timers of all ticks passed since the last call."""
+        self._handle = None
+        loop = self._loop()
+        # the loop may run the callback slightly before the tick it was scheduled at
+        now = max(math.floor(loop.time() / self.tick), self._current + 1)
+        last = min(now, self._current + len(self._slots))
+
+        # every slot is visited once even if the loop was blocked for a full turn
+        for tick in range(self._current + 1, last + 1):
+            slot = self._slots[tick % len(self._slots)]
+            expired = [timer for timer in slot if timer._expires <= now]
+            for timer in expired:
+                del slot[timer]
+                timer._expires = None
+                self._armed -= 1
+            self._current = tick
+            for timer in expired:
+                timer._fire()
+
+        self._current = max(self._current, now)
+        if self._armed and self._handle is None:
+            self._handle = loop.call_at((self._current + 1) * self.tick, self._advance)
@@ -2,16 +2,23 @@
 
 from __future__ import annotations
 
-from collections.abc import Callable
+import asyncio
+from collections.abc import Callable, Container, Coroutine, Iterable, Iterator
 import dataclasses
 import datetime
 import enum
+import functools
+import heapq
+import itertools
 import logging
+import struct
+import time
 from typing import Any
+import weakref
 
 from zigpy.quirks import BaseCustomDevice, CustomCluster, CustomDevice
 import zigpy.types as t
-from zigpy.typing import AddressingMode
+from zigpy.typing import AddressingMode, DeviceType
 from zigpy.zcl import BaseAttributeDefs, foundation
 from zigpy.zcl.clusters.closures import WindowCovering
 from zigpy.zcl.clusters.general import Basic, LevelControl, OnOff, PowerConfiguration
@@ -19,7 +26,7 @@ from zigpy.zcl.clusters.homeautomation import ElectricalMeasurement
 from zigpy.zcl.clusters.hvac import Thermostat, UserInterface
 from zigpy.zcl.clusters.smartenergy import Metering
 
-from zhaquirks import Bus, EventableCluster, LocalDataCluster
+from zhaquirks import Bus, EventableCluster, KeyedBus, LocalDataCluster, TimerWheel
 from zhaquirks.const import (
     DOUBLE_PRESS,
     LEFT,
@@ -29,6 +36,7 @@ from zhaquirks.const import (
     ZHA_SEND_EVENT,
     BatterySize,
 )
+from zhaquirks.timers import WheelTimer
 
 # ---------------------------------------------------------
 # Tuya Custom Cluster ID
@@ -148,6 +156,49 @@ class TuyaDPType(t.enum8):
     BITMAP = 0x05
 
 
+def _decode_exact(size: int, raw: bytes) -> bytes:
+    if len(raw) < size:
+        raise ValueError(f"Data is too short to contain {size} bytes")
+    return raw
+
+
+def _decode_bitmap(raw: bytes) -> t.bitmap8 | t.bitmap16 | t.bitmap32:
+    try:
+        bitmap = _BITMAPS_BY_LENGTH[len(raw)]
+    except KeyError as exc:
+        raise ValueError(f"Wrong bitmap length: {len(raw)}") from exc
+    return bitmap(int.from_bytes(raw, "little"))
+
+
+def _encode_bitmap(value: Any) -> bytes:
+    if not isinstance(value, (t.bitmap8, t.bitmap16, t.bitmap32)):
+        value = t.bitmap8(value)
+    return value.serialize()[::-1]
+
+
+_BITMAPS_BY_LENGTH = {1: t.bitmap8, 2: t.bitmap16, 4: t.bitmap32}
+
+# datapoint type -> function converting raw bytes to the payload and back
+_PAYLOAD_DECODERS: dict[TuyaDPType, Callable[[bytes], Any]] = {
+    TuyaDPType.VALUE: lambda raw: t.int32s_be(
+        int.from_bytes(_decode_exact(4, raw)[:4], "big", signed=True)
+    ),
+    TuyaDPType.BOOL: lambda raw: t.Bool(_decode_exact(1, raw)[0]),
+    TuyaDPType.STRING: lambda raw: t.CharacterString(raw.decode("utf8")),
+    TuyaDPType.ENUM: lambda raw: t.enum8(_decode_exact(1, raw)[0]),
+    TuyaDPType.BITMAP: _decode_bitmap,
+    TuyaDPType.RAW: lambda raw: raw,
+}
+_PAYLOAD_ENCODERS: dict[TuyaDPType, Callable[[Any], bytes]] = {
+    TuyaDPType.VALUE: lambda value: t.int32s_be(value).serialize(),
+    TuyaDPType.BOOL: lambda value: t.Bool(value).serialize(),
+    TuyaDPType.STRING: lambda value: value.encode("utf8"),
+    TuyaDPType.ENUM: lambda value: t.enum8(value).serialize(),
+    TuyaDPType.BITMAP: _encode_bitmap,
+    TuyaDPType.RAW: lambda value: value.serialize(),
+}
+
+
 class TuyaData(t.Struct):
     """Tuya Data type."""
 
@@ -169,44 +220,20 @@ class TuyaData(t.Struct):
         | t.LVBytes
     ):
         """Payload accordingly to data point type."""
-        if self.dp_type == TuyaDPType.VALUE:
-            return t.int32s_be.deserialize(self.raw)[0]
-        elif self.dp_type == TuyaDPType.BOOL:
-            return t.Bool.deserialize(self.raw)[0]
-        elif self.dp_type == TuyaDPType.STRING:
-            return t.CharacterString(self.raw.decode("utf8"))
-        elif self.dp_type == TuyaDPType.ENUM:
-            return t.enum8.deserialize(self.raw)[0]
-        elif self.dp_type == TuyaDPType.BITMAP:
-            bitmaps = {1: t.bitmap8, 2: t.bitmap16, 4: t.bitmap32}
-            try:
-                return bitmaps[len(self.raw)].deserialize(self.raw)[0]
-            except KeyError as exc:
-                raise ValueError(f"Wrong bitmap length: {len(self.raw)}") from exc
-        elif self.dp_type == TuyaDPType.RAW:
-            return self.raw
-        else:
-            raise ValueError(f"Unknown {self.dp_type} datapoint type")
+        try:
+            decoder = _PAYLOAD_DECODERS[self.dp_type]
+        except KeyError:
+            raise ValueError(f"Unknown {self.dp_type} datapoint type") from None
+        return decoder(self.raw)
 
     @payload.setter
     def payload(self, value):
         """Set payload accordingly to data point type."""
-        if self.dp_type == TuyaDPType.VALUE:
-            self.raw = t.int32s_be(value).serialize()
-        elif self.dp_type == TuyaDPType.BOOL:
-            self.raw = t.Bool(value).serialize()
-        elif self.dp_type == TuyaDPType.STRING:
-            self.raw = value.encode("utf8")
-        elif self.dp_type == TuyaDPType.ENUM:
-            self.raw = t.enum8(value).serialize()
-        elif self.dp_type == TuyaDPType.BITMAP:
-            if not isinstance(value, (t.bitmap8, t.bitmap16, t.bitmap32)):
-                value = t.bitmap8(value)
-            self.raw = value.serialize()[::-1]
-        elif self.dp_type == TuyaDPType.RAW:
-            self.raw = value.serialize()
-        else:
-            raise ValueError(f"Unknown {self.dp_type} datapoint type")
+        try:
+            encoder = _PAYLOAD_ENCODERS[self.dp_type]
+        except KeyError:
+            raise ValueError(f"Unknown {self.dp_type} datapoint type") from None
+        self.raw = encoder(value)
 
     def __new__(cls, *args, **kwargs):
         """Disable copy constructor."""
@@ -292,6 +319,100 @@ class TuyaCommand(t.Struct):
     datapoints: t.List[TuyaDatapointData]
 
 
+# dp, dp_type, function and payload length preceding each datapoint payload
+TUYA_DATAPOINT_HEADER_SIZE = 4
+
+
+class TuyaCommandView(TuyaCommand):
+    """Received Tuya command, parsing datapoints only when they are accessed.
+
+    Deserializing only walks the datapoint headers. `datapoints` materializes all
+    datapoints on first access, `iter_datapoints` only the requested ones.
+    """
+
+    @classmethod
+    def deserialize(cls, data: bytes) -> tuple[TuyaCommandView, bytes]:
+        """Parse the command header and the location of each datapoint.
+
+        Consumes all data like `TuyaCommand`.
+        """
+        buffer = memoryview(bytes(data))
+        if len(buffer) < 2:
+            raise ValueError("Data is too short to contain a Tuya command")
+
+        # datapoint id, start and end offset of each datapoint
+        spans: list[tuple[int, int, int]] = []
+        offset = 2
+        while offset < len(buffer):
+            end = offset + TUYA_DATAPOINT_HEADER_SIZE
+            if end > len(buffer):
+                raise ValueError(f"Truncated datapoint header at offset {offset}")
+            end += buffer[end - 1]
+            if end > len(buffer):
+                raise ValueError(f"Truncated datapoint payload at offset {offset}")
+            spans.append((buffer[offset], offset, end))
+            offset = end
+
+        instance = cls(status=buffer[0], tsn=buffer[1])
+        # datapoints are materialized by __getattr__ once accessed
+        del instance.datapoints
+        instance._buffer = buffer
+        instance._spans = spans
+        return instance, b""
+
+    def __getattr__(self, name: str) -> Any:
+        """Materialize the datapoints of a deserialized command."""
+        if name != "datapoints" or "_spans" not in vars(self):
+            raise AttributeError(name)
+        self.datapoints = t.List[TuyaDatapointData](
+            self._materialize(start, end) for _, start, end in self._spans
+        )
+        return self.datapoints
+
+    def serialize(self) -> bytes:
+        """Serialize the command, reusing the received datapoints if not accessed."""
+        if "datapoints" in vars(self):
+            return super().serialize()
+        header = t.uint8_t(self.status).serialize() + t.uint8_t(self.tsn).serialize()
+        return header + bytes(self._buffer[2:])
+
+    @property
+    def dps(self) -> list[int]:
+        """Datapoint ids in the order they were received."""
+        if "datapoints" in vars(self):
+            return [datapoint.dp for datapoint in self.datapoints]
+        return [dp for dp, _, _ in self._spans]
+
+    def iter_datapoints(self, dps: Container[int]) -> Iterator[TuyaDatapointData]:
+        """Materialize the datapoints with one of the given ids."""
+        if "datapoints" in vars(self):
+            yield from (
+                datapoint for datapoint in self.datapoints if datapoint.dp in dps
+            )
+            return
+        for dp, start, end in self._spans:
+            if dp in dps:
+                yield self._materialize(start, end)
+
+    def _materialize(self, start: int, end: int) -> TuyaDatapointData:
+        return TuyaDatapointData.deserialize(bytes(self._buffer[start:end]))[0]
+
+    def __eq__(self, other: object) -> bool:
+        """Compare the serialized commands."""
+        if isinstance(other, TuyaCommand):
+            return self.serialize() == other.serialize()
+        return NotImplemented
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        """Represent without materializing the datapoints."""
+        return (
+            f"{type(self).__name__}(status={self.status}, tsn={self.tsn},"
+            f" dps={self.dps})"
+        )
+
+
 class NoManufacturerCluster(CustomCluster):
     """Forces the NO manufacturer id in command."""
 
@@ -532,6 +653,143 @@ class TuyaManufClusterAttributes(TuyaManufCluster):
         return [[foundation.WriteAttributesStatusRecord(foundation.Status.SUCCESS)]]
 
 
+@dataclasses.dataclass
+class TuyaSpellStats:
+    """Counters and timings of a `TuyaSpellScheduler`."""
+
+    active: int = 0
+    queued: int = 0
+    cast: int = 0
+    skipped: int = 0
+    failed: int = 0
+    max_wait: float = 0.0
+    total_wait: float = 0.0
+    max_duration: float = 0.0
+    total_duration: float = 0.0
+
+    @property
+    def average_wait(self) -> float | None:
+        """Average seconds devices waited for a free slot."""
+        if not self.cast + self.failed:
+            return None
+        return self.total_wait / (self.cast + self.failed)
+
+    @property
+    def average_duration(self) -> float | None:
+        """Average seconds casting the spells of a device took."""
+        if not self.cast + self.failed:
+            return None
+        return self.total_duration / (self.cast + self.failed)
+
+
+class TuyaSpellScheduler:
+    """Limit how many devices have their Tuya spells cast at the same time.
+
+    Waiting mains powered devices go first, as routers help the following devices
+    join and report. Configuring a device again while its spells are queued or
+    being cast waits for that cast instead of casting them twice, unless the
+    device rejoined in the meantime and was forgotten. Once cast, spells are
+    cast again by the next configuration, e.g. an explicit reconfigure.
+    """
+
+    def __init__(self, max_concurrent: int = 3) -> None:
+        """Init."""
+        self.max_concurrent = max_concurrent
+        self._active = 0
+        self._waiters: list[tuple[int, int, asyncio.Future[None]]] = []
+        self._order = itertools.count()
+        self._casting: weakref.WeakKeyDictionary[Any, asyncio.Future[None]] = (
+            weakref.WeakKeyDictionary()
+        )
+        self._stats = TuyaSpellStats()
+
+    @property
+    def stats(self) -> TuyaSpellStats:
+        """Snapshot of the scheduler statistics."""
+        return dataclasses.replace(
+            self._stats,
+            active=self._active,
+            queued=sum(not future.done() for _, _, future in self._waiters),
+        )
+
+    def forget(self, device: Any) -> None:
+        """Don't wait for spells cast before the device rejoined."""
+        self._casting.pop(device, None)
+
+    async def cast(
+        self,
+        device: Any,
+        spells: dict[str, Callable[[], Coroutine[Any, Any, Any]]],
+        *,
+        mains_powered: bool = False,
+    ) -> None:
+        """Cast the spells on a device once a slot is free."""
+        if (casting := self._casting.get(device)) is not None:
+            self._stats.skipped += 1
+            await asyncio.shield(casting)
+            return
+
+        casting = asyncio.get_running_loop().create_future()
+        self._casting[device] = casting
+        try:
+            await self._cast(spells, mains_powered)
+        finally:
+            casting.set_result(None)
+            if self._casting.get(device) is casting:
+                del self._casting[device]
+
+    async def _cast(
+        self,
+        spells: dict[str, Callable[[], Coroutine[Any, Any, Any]]],
+        mains_powered: bool,
+    ) -> None:
+        queued = time.monotonic()
+        await self._acquire(0 if mains_powered else 1)
+        started = time.monotonic()
+        try:
+            for spell in spells.values():
+                await spell()
+        except Exception:
+            self._stats.failed += 1
+            raise
+        else:
+            self._stats.cast += 1
+        finally:
+            self._release()
+            wait, duration = started - queued, time.monotonic() - started
+            self._stats.max_wait = max(self._stats.max_wait, wait)
+            self._stats.total_wait += wait
+            self._stats.max_duration = max(self._stats.max_duration, duration)
+            self._stats.total_duration += duration
+
+    async def _acquire(self, priority: int) -> None:
+        if self._active < self.max_concurrent and not self._waiters:
+            self._active += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._order), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            # the slot may have been handed over right before the cancellation
+            if future.done() and not future.cancelled():
+                self._release()
+            raise
+
+    def _release(self) -> None:
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                # hand the slot over to the next device
+                future.set_result(None)
+                return
+        self._active -= 1
+
+
+TUYA_SPELL_SCHEDULER = TuyaSpellScheduler()
+
+
 class BaseEnchantedDevice(BaseCustomDevice):
     """Class for Tuya devices which need to be unlocked by casting a 'spell'.
 
@@ -541,14 +799,34 @@ class BaseEnchantedDevice(BaseCustomDevice):
     # These values can be overridden from a quirk to enable (or disable) additional Tuya spells:
     tuya_spell_read_attributes: bool = True  # spell reading attributes on Basic cluster
     tuya_spell_data_query: bool = False  # additional spell needed for some devices
+    # process-wide scheduler limiting how many devices cast spells at the same time
+    tuya_spell_scheduler: TuyaSpellScheduler = TUYA_SPELL_SCHEDULER
+
+    def __init__(self, *args, **kwargs):
+        """Init, listening for announcements of the device rejoining."""
+        super().__init__(*args, **kwargs)
+        self.zdo.add_listener(self)
+
+    def device_announce(self, device: DeviceType) -> None:
+        """Cast the spells again when the device is configured after rejoining."""
+        self.tuya_spell_scheduler.forget(self)
 
     async def apply_custom_configuration(self, *args, **kwargs):
         """Hooks device configuration to apply custom configuration."""
         # cast Tuya spell
+        spells = {}
         if self.tuya_spell_read_attributes:
-            await self.spell_attribute_reads()
+            spells["attribute_reads"] = self.spell_attribute_reads
         if self.tuya_spell_data_query:
-            await self.spell_data_query()
+            spells["data_query"] = self.spell_data_query
+        if spells:
+            await self.tuya_spell_scheduler.cast(
+                self,
+                spells,
+                mains_powered=(
+                    self.node_desc is not None and self.node_desc.is_mains_powered
+                ),
+            )
 
         # also apply custom configuration to clusters if defined
         await super().apply_custom_configuration(*args, **kwargs)
@@ -583,7 +861,9 @@ class TuyaOnOff(CustomCluster, OnOff):
     def __init__(self, *args, **kwargs):
         """Init."""
         super().__init__(*args, **kwargs)
-        self.endpoint.device.switch_bus.add_listener(self)
+        self.endpoint.device.switch_bus.add_listener(
+            self, key=self.endpoint.endpoint_id
+        )
 
     def switch_event(self, channel, state):
         """Switch event."""
@@ -593,7 +873,7 @@ class TuyaOnOff(CustomCluster, OnOff):
             channel,
             state,
         )
-        # update status only if event == endpoint
+        # update status only if event == endpoint, broadcasts reach every gang
         if self.endpoint.endpoint_id == channel:
             self._update_attribute(ATTR_ON_OFF, state)
 
@@ -648,10 +928,9 @@ class TuyaManufacturerClusterOnOff(TuyaManufCluster):
                 self.send_default_rsp(hdr, status=foundation.Status.SUCCESS)
 
             tuya_payload = args[0]
-            self.endpoint.device.switch_bus.listener_event(
-                SWITCH_EVENT,
-                tuya_payload.command_id - TUYA_CMD_BASE,
-                tuya_payload.data[1],
+            channel = tuya_payload.command_id - TUYA_CMD_BASE
+            self.endpoint.device.switch_bus.route_event(
+                channel, SWITCH_EVENT, channel, tuya_payload.data[1]
             )
         elif hdr.command_id == TUYA_SET_TIME:
             """Time event call super"""
@@ -666,7 +945,7 @@ class TuyaSwitch(CustomDevice):
 
     def __init__(self, *args, **kwargs):
         """Init device."""
-        self.switch_bus = Bus()
+        self.switch_bus = KeyedBus()
         super().__init__(*args, **kwargs)
 
 
@@ -675,7 +954,7 @@ class TuyaDimmerSwitch(TuyaSwitch):
 
     def __init__(self, *args, **kwargs):
         """Init device."""
-        self.dimmer_bus = Bus()
+        self.dimmer_bus = KeyedBus()
         super().__init__(*args, **kwargs)
 
 
@@ -1174,7 +1453,8 @@ class TuyaManufacturerWindowCover(TuyaManufCluster):
                 TUYA_DP_TYPE_VALUE + TUYA_DP_ID_PERCENT_CONTROL,
             ]
             if tuya_payload.command_id in ids:
-                self.endpoint.device.cover_bus.listener_event(
+                self.endpoint.device.cover_bus.route_event(
+                    self.endpoint.endpoint_id,
                     COVER_EVENT,
                     ATTR_COVER_POSITION,
                     tuya_payload.data[4],
@@ -1183,7 +1463,8 @@ class TuyaManufacturerWindowCover(TuyaManufCluster):
                 tuya_payload.command_id
                 == TUYA_DP_TYPE_ENUM + TUYA_DP_ID_DIRECTION_CHANGE
             ):
-                self.endpoint.device.cover_bus.listener_event(
+                self.endpoint.device.cover_bus.route_event(
+                    self.endpoint.endpoint_id,
                     COVER_EVENT,
                     ATTR_COVER_DIRECTION,
                     tuya_payload.data[1],
@@ -1191,7 +1472,8 @@ class TuyaManufacturerWindowCover(TuyaManufCluster):
             elif (
                 tuya_payload.command_id == TUYA_DP_TYPE_ENUM + TUYA_DP_ID_COVER_INVERTED
             ):
-                self.endpoint.device.cover_bus.listener_event(
+                self.endpoint.device.cover_bus.route_event(
+                    self.endpoint.endpoint_id,
                     COVER_EVENT,
                     ATTR_COVER_INVERTED,
                     tuya_payload.data[1],  # Check this
@@ -1220,7 +1502,7 @@ class TuyaWindowCoverControl(LocalDataCluster, WindowCovering):
     def __init__(self, *args, **kwargs):
         """Initialize instance."""
         super().__init__(*args, **kwargs)
-        self.endpoint.device.cover_bus.add_listener(self)
+        self.endpoint.device.cover_bus.add_listener(self, key=self.endpoint.endpoint_id)
 
     def cover_event(self, attribute, value):
         """Event listener for cover events."""
@@ -1339,7 +1621,7 @@ class TuyaWindowCover(CustomDevice):
 
     def __init__(self, *args, **kwargs):
         """Init device."""
-        self.cover_bus = Bus()
+        self.cover_bus = KeyedBus()
         super().__init__(*args, **kwargs)
 
 
@@ -1370,16 +1652,16 @@ class TuyaManufacturerLevelControl(TuyaManufCluster):
 
         if hdr.command_id in (0x0002, 0x0001):
             if tuya_payload.command_id == TUYA_LEVEL_COMMAND:
-                self.endpoint.device.dimmer_bus.listener_event(
+                self.endpoint.device.dimmer_bus.route_event(
+                    self.endpoint.endpoint_id,
                     LEVEL_EVENT,
                     tuya_payload.command_id,
                     tuya_payload.data,
                 )
             else:
-                self.endpoint.device.switch_bus.listener_event(
-                    SWITCH_EVENT,
-                    tuya_payload.command_id - TUYA_CMD_BASE,
-                    tuya_payload.data[1],
+                channel = tuya_payload.command_id - TUYA_CMD_BASE
+                self.endpoint.device.switch_bus.route_event(
+                    channel, SWITCH_EVENT, channel, tuya_payload.data[1]
                 )
 
 
@@ -1389,7 +1671,9 @@ class TuyaLevelControl(CustomCluster, LevelControl):
     def __init__(self, *args, **kwargs):
         """Init."""
         super().__init__(*args, **kwargs)
-        self.endpoint.device.dimmer_bus.add_listener(self)
+        self.endpoint.device.dimmer_bus.add_listener(
+            self, key=self.endpoint.endpoint_id
+        )
 
     def level_event(self, channel, state):
         """Level event."""
@@ -1447,6 +1731,122 @@ class TuyaLevelControl(CustomCluster, LevelControl):
         return foundation.Status.UNSUP_CLUSTER_COMMAND
 
 
+@dataclasses.dataclass(frozen=True)
+class ReportThrottle:
+    """Limit how often a datapoint updates its attribute.
+
+    Tuya datapoints can't be configured with `configure_reporting`. Updates less
+    than `min_interval` seconds after the last one are held back. With `deadband`
+    or `relative_deadband` (a fraction of the last value), numeric values that
+    didn't change by at least that much are held back as well, unless
+    `max_interval` seconds passed since the last update. Like attribute reporting,
+    the last held back value is updated once `min_interval` expires if it changed,
+    or as a heartbeat once `max_interval` expires, even if the device stops
+    reporting.
+    """
+
+    min_interval: float | None = None
+    max_interval: float | None = None
+    deadband: float | None = None
+    relative_deadband: float | None = None
+
+    def should_update(
+        self, value: Any, last: tuple[Any, float] | None, now: float
+    ) -> bool:
+        """Check if `value` is due, given the last (value, monotonic time) update."""
+        if last is None:
+            return True
+
+        last_value, last_time = last
+        elapsed = now - last_time
+        if self.min_interval is not None and elapsed < self.min_interval:
+            return False
+        if self.max_interval is not None and elapsed >= self.max_interval:
+            return True
+        if self.deadband is None and self.relative_deadband is None:
+            return True
+        return self.changed(value, last_value)
+
+    def changed(self, value: Any, last_value: Any) -> bool:
+        """Check if `value` changed by at least the deadband from `last_value`."""
+        if not isinstance(value, (int, float)) or not isinstance(
+            last_value, (int, float)
+        ):
+            return value != last_value
+
+        change = abs(value - last_value)
+        threshold = max(
+            self.deadband or 0, (self.relative_deadband or 0) * abs(last_value)
+        )
+        return change > 0 and change >= threshold
+
+
+@dataclasses.dataclass(frozen=True)
+class TuyaRawField:
+    """Integer field of a raw datapoint, mapped to an attribute.
+
+    The decoded value is passed through `converter`, then multiplied by `scale`.
+    """
+
+    attribute_name: str
+    offset: int
+    width: int = 2
+    signed: bool = False
+    scale: float = 1
+    converter: Callable[[int], Any] | None = None
+
+
+_STRUCT_CODES = {1: "b", 2: "h", 4: "i", 8: "q"}
+
+
+class TuyaRawLayout:
+    """Decode all fields of a raw datapoint with a single `struct` unpack."""
+
+    def __init__(self, fields: Iterable[TuyaRawField], byteorder: str = "big") -> None:
+        """Compile the struct format of the fields."""
+        self.fields = tuple(fields)
+        self.byteorder = byteorder
+        self.attribute_names = tuple(field.attribute_name for field in self.fields)
+
+        by_offset = sorted(range(len(self.fields)), key=lambda i: self.fields[i].offset)
+        fmt = {"big": ">", "little": "<"}[byteorder]
+        position = 0
+        for index in by_offset:
+            field = self.fields[index]
+            if field.offset < position:
+                raise ValueError(f"Field {field.attribute_name} overlaps another field")
+            if field.offset > position:
+                fmt += f"{field.offset - position}x"
+            # widths without struct code are unpacked as bytes and converted after
+            code = _STRUCT_CODES.get(field.width, f"{field.width}s")
+            fmt += code if field.signed or code[-1] == "s" else code.upper()
+            position = field.offset + field.width
+
+        self._struct = struct.Struct(fmt)
+        # position of each field in the unpacked values
+        self._order = tuple(by_offset.index(i) for i in range(len(self.fields)))
+
+    @property
+    def size(self) -> int:
+        """Minimum length of the datapoint."""
+        return self._struct.size
+
+    def __call__(self, data: bytes) -> tuple[Any, ...]:
+        """Decode the fields, in the order they were declared."""
+        unpacked = self._struct.unpack_from(data)
+        values = []
+        for field, position in zip(self.fields, self._order):
+            value = unpacked[position]
+            if isinstance(value, bytes):
+                value = int.from_bytes(value, self.byteorder, signed=field.signed)
+            if field.converter is not None:
+                value = field.converter(value)
+            if field.scale != 1:
+                value = value * field.scale
+            values.append(value)
+        return tuple(values)
+
+
 @dataclasses.dataclass
 class DPToAttributeMapping:
     """Container for datapoint to cluster attribute update mapping."""
@@ -1455,6 +1855,7 @@ class DPToAttributeMapping:
     attribute_name: str | tuple[str, ...]
     converter: Callable[[Any], Any] | None = None
     endpoint_id: int | None = None
+    throttle: ReportThrottle | None = None
 
 
 @dataclasses.dataclass
@@ -1465,6 +1866,137 @@ class AttributeWithMask:
     mask: int
 
 
+def valid_attribute_ids(
+    dp_to_attribute: dict[int, DPToAttributeMapping | list[DPToAttributeMapping]],
+    endpoint_id: int,
+    resolve_cluster: Callable[[int, str], type[CustomCluster] | None],
+) -> dict[tuple[int, type[LocalDataCluster]], frozenset[int]]:
+    """Collect the ids of LocalDataCluster attributes datapoints are mapped to.
+
+    `resolve_cluster` returns the class of the cluster with an `ep_attribute` on an
+    endpoint, or None if the endpoint or cluster does not exist.
+    """
+    valid: dict[tuple[int, type[LocalDataCluster]], set[int]] = {}
+    for dp_map in dp_to_attribute.values():
+        # a mapping with an endpoint_id also applies to the following mappings
+        mapped_endpoint_id = endpoint_id
+        for mapped_attr in dp_map if isinstance(dp_map, list) else [dp_map]:
+            if mapped_attr.endpoint_id:
+                mapped_endpoint_id = mapped_attr.endpoint_id
+
+            cluster = resolve_cluster(mapped_endpoint_id, mapped_attr.ep_attribute)
+            if cluster is None or not issubclass(cluster, LocalDataCluster):
+                continue
+
+            names = mapped_attr.attribute_name
+            for name in names if isinstance(names, tuple) else (names,):
+                if attr := cluster.attributes_by_name.get(name):
+                    valid.setdefault((mapped_endpoint_id, cluster), set()).add(attr.id)
+    return {key: frozenset(ids) for key, ids in valid.items()}
+
+
+@dataclasses.dataclass(frozen=True)
+class DPDispatchTarget:
+    """Datapoint mapping bound to the cluster and attributes it updates."""
+
+    mapping: DPToAttributeMapping
+    cluster: CustomCluster
+    attribute_names: tuple[str, ...]
+    updates: tuple[Callable[[Any], None], ...]
+    # last throttled update of each attribute: (value, monotonic time)
+    last_updates: dict[str, tuple[Any, float]] = dataclasses.field(default_factory=dict)
+    # last value held back by the throttle, with the time it is due at, and the
+    # timer updating it, by attribute
+    dropped: dict[str, tuple[Any, float]] = dataclasses.field(default_factory=dict)
+    flush_timers: dict[str, WheelTimer] = dataclasses.field(default_factory=dict)
+
+    @classmethod
+    def compile(
+        cls, mapping: DPToAttributeMapping, cluster: CustomCluster
+    ) -> DPDispatchTarget:
+        """Resolve the attribute update function for each mapped attribute."""
+        if isinstance(mapping.attribute_name, tuple):
+            names = mapping.attribute_name
+        else:
+            names = (mapping.attribute_name,)
+
+        updates = []
+        for name in names:
+            attr = cluster.attributes_by_name.get(name)
+            # skip the name lookup if `update_attribute` wouldn't do anything else
+            if (
+                attr is not None
+                and type(cluster).update_attribute is TuyaLocalCluster.update_attribute
+            ):
+                updates.append(functools.partial(cluster._update_attribute, attr.id))
+            else:
+                updates.append(functools.partial(cluster.update_attribute, name))
+
+        return cls(mapping, cluster, names, tuple(updates))
+
+    def update(self, value: Any) -> None:
+        """Update the mapped attributes with a datapoint value."""
+        if self.mapping.converter:
+            value = self.mapping.converter(value)
+
+        values = value if isinstance(self.mapping.attribute_name, tuple) else (value,)
+        throttle = self.mapping.throttle
+        for name, update, v in zip(self.attribute_names, self.updates, values):
+            if isinstance(v, AttributeWithMask):
+                v = self.cluster.get(name, 0) & (~v.mask) | v.value
+            elif throttle is not None:
+                now = time.monotonic()
+                last = self.last_updates.get(name)
+                if not throttle.should_update(v, last, now):
+                    self._drop(name, update, v, last, now)
+                    continue
+                self.last_updates[name] = (v, now)
+                self.dropped.pop(name, None)
+                if (timer := self.flush_timers.get(name)) is not None:
+                    timer.cancel()
+            update(v)
+
+    def _drop(
+        self,
+        name: str,
+        update: Callable[[Any], None],
+        value: Any,
+        last: tuple[Any, float],
+        now: float,
+    ) -> None:
+        """Hold back a value until min_interval or max_interval expires."""
+        throttle = self.mapping.throttle
+        last_value, last_time = last
+        if throttle.min_interval is not None and throttle.changed(value, last_value):
+            due = last_time + throttle.min_interval
+        elif throttle.max_interval is not None:
+            due = last_time + throttle.max_interval
+        else:
+            due = None
+
+        if due is None:
+            # e.g. a value within the deadband without max_interval
+            self.dropped.pop(name, None)
+            if (timer := self.flush_timers.get(name)) is not None:
+                timer.cancel()
+            return
+
+        self.dropped[name] = (value, due)
+        if (timer := self.flush_timers.get(name)) is None:
+            timer = self.flush_timers[name] = TimerWheel.for_loop().timer(
+                functools.partial(self._flush, name, update)
+            )
+        timer.arm(due - now)
+
+    def _flush(self, name: str, update: Callable[[Any], None]) -> None:
+        """Update the value of an attribute held back by the throttle."""
+        if (dropped := self.dropped.pop(name, None)) is None:
+            return
+        value, due = dropped
+        self.last_updates[name] = (value, max(time.monotonic(), due))
+        update(value)
+
+
 class TuyaNewManufCluster(CustomCluster):
     """Tuya manufacturer specific cluster.
 
@@ -1504,17 +2036,17 @@ class TuyaNewManufCluster(CustomCluster):
 
     client_commands = {
         TUYA_GET_DATA: foundation.ZCLCommandDef(
-            "get_data", {"data": TuyaCommand}, True, is_manufacturer_specific=True
+            "get_data", {"data": TuyaCommandView}, True, is_manufacturer_specific=True
         ),
         TUYA_SET_DATA_RESPONSE: foundation.ZCLCommandDef(
             "set_data_response",
-            {"data": TuyaCommand},
+            {"data": TuyaCommandView},
             True,
             is_manufacturer_specific=True,
         ),
         TUYA_ACTIVE_STATUS_RPT: foundation.ZCLCommandDef(
             "active_status_report",
-            {"data": TuyaCommand},
+            {"data": TuyaCommandView},
             True,
             is_manufacturer_specific=True,
         ),
@@ -1526,6 +2058,17 @@ class TuyaNewManufCluster(CustomCluster):
     dp_to_attribute: dict[int, DPToAttributeMapping | list[DPToAttributeMapping]] = {}
     data_point_handlers: dict[int, str] = {}
 
+    # ignore datapoint reports byte-identical to the previous report of the datapoint,
+    # unless that was handled at least this many seconds ago. None handles all reports.
+    duplicate_report_refresh: float | None = None
+
+    # ids of LocalDataCluster attributes mapped by dp_to_attribute, marked valid on the
+    # clusters of each device, by the endpoint this cluster is on. Precomputed by
+    # TuyaQuirkBuilder, found per device for endpoints without precomputed ids.
+    valid_attributes: (
+        dict[int, dict[tuple[int, type[LocalDataCluster]], frozenset[int]]] | None
+    ) = None
+
     def __init__(self, *args, **kwargs):
         """Initialize the cluster and mark attributes as valid on LocalDataClusters."""
         super().__init__(*args, **kwargs)
@@ -1534,32 +2077,33 @@ class TuyaNewManufCluster(CustomCluster):
             dp: attr if isinstance(attr, list) else [attr]
             for dp, attr in self.dp_to_attribute.items()
         }
-        for dp_map in self._dp_to_attributes.values():
-            # get the endpoint that is being mapped to
-            endpoint = self.endpoint
-            for mapped_attr in dp_map:
-                if mapped_attr.endpoint_id:
-                    endpoint = self.endpoint.device.endpoints.get(
-                        mapped_attr.endpoint_id
-                    )
-
-                # the endpoint to be mapped to might not actually exist within all quirks
-                if not endpoint:
-                    continue
-
-                cluster = getattr(endpoint, mapped_attr.ep_attribute, None)
-                # the cluster to be mapped to might not actually exist within all quirks
-                if not cluster:
-                    continue
-
-                # mark mapped to attribute as valid if existing and if on a LocalDataCluster
-                attr = cluster.attributes_by_name.get(mapped_attr.attribute_name)
-                if attr and isinstance(cluster, LocalDataCluster):
-                    # _VALID_ATTRIBUTES is only a class variable, but as want to modify it
-                    # per instance here, we need to create an instance variable first
-                    if "_VALID_ATTRIBUTES" not in cluster.__dict__:
-                        cluster._VALID_ATTRIBUTES = set()
-                    cluster._VALID_ATTRIBUTES.add(attr.id)
+        self._dp_dispatch: dict[int, tuple[DPDispatchTarget, ...]] = {}
+        # last handled report of each datapoint: (dp_type, raw, monotonic time)
+        self._last_reports: dict[int, tuple[TuyaDPType, bytes, float]] = {}
+
+        valid_attributes = (self.valid_attributes or {}).get(self.endpoint.endpoint_id)
+        if valid_attributes is None:
+            valid_attributes = valid_attribute_ids(
+                self.dp_to_attribute, self.endpoint.endpoint_id, self._cluster_type
+            )
+        for (endpoint_id, cluster_type), attr_ids in valid_attributes.items():
+            endpoint = self.endpoint.device.endpoints.get(endpoint_id)
+            cluster = getattr(endpoint, cluster_type.ep_attribute, None)
+            if not isinstance(cluster, cluster_type):
+                continue
+            # _VALID_ATTRIBUTES is only a class variable, but as want to extend it
+            # per instance here, we need to create an instance variable
+            if "_VALID_ATTRIBUTES" in cluster.__dict__:
+                attr_ids = cluster._VALID_ATTRIBUTES | attr_ids
+            cluster._VALID_ATTRIBUTES = attr_ids
+
+    def _cluster_type(
+        self, endpoint_id: int, ep_attribute: str
+    ) -> type[CustomCluster] | None:
+        """Return the class of a cluster on an endpoint of the device, if it exists."""
+        endpoint = self.endpoint.device.endpoints.get(endpoint_id)
+        cluster = getattr(endpoint, ep_attribute, None)
+        return type(cluster) if cluster else None
 
     def handle_cluster_request(
         self,
@@ -1599,10 +2143,27 @@ class TuyaNewManufCluster(CustomCluster):
         if not hdr.frame_control.disable_default_response:
             self.send_default_rsp(hdr, status=status)
 
-    def handle_get_data(self, command: TuyaCommand) -> foundation.Status:
+    def handle_get_data(
+        self, command: TuyaCommand | TuyaCommandView
+    ) -> foundation.Status:
         """Handle get_data response (report)."""
         dp_error = False
-        for record in command.datapoints:
+        records: Iterable[TuyaDatapointData]
+        if isinstance(command, TuyaCommandView):
+            # skip parsing datapoints without a handler
+            if unhandled := [
+                dp for dp in command.dps if dp not in self.data_point_handlers
+            ]:
+                self.debug("No datapoint handler for datapoints %s", unhandled)
+                dp_error = True
+            records = command.iter_datapoints(self.data_point_handlers)
+        else:
+            records = command.datapoints
+
+        record = None
+        for record in records:
+            if self._is_duplicate_report(record):
+                continue
             try:
                 dp_handler = self.data_point_handlers[record.dp]
                 getattr(self, dp_handler)(record)
@@ -1611,14 +2172,15 @@ class TuyaNewManufCluster(CustomCluster):
                 dp_error = True
                 # return foundation.Status.UNSUPPORTED_ATTRIBUTE
 
-        _LOGGER.debug(
-            "[0x%04x:%s:0x%04x] Received value %s for attribute 0x%04x",
-            self.endpoint.device.nwk,
-            self.endpoint.endpoint_id,
-            self.cluster_id,
-            record.data.payload,
-            record.dp,
-        )
+        if record is not None:
+            _LOGGER.debug(
+                "[0x%04x:%s:0x%04x] Received value %s for attribute 0x%04x",
+                self.endpoint.device.nwk,
+                self.endpoint.endpoint_id,
+                self.cluster_id,
+                record.data.payload,
+                record.dp,
+            )
 
         return (
             foundation.Status.SUCCESS
@@ -1629,6 +2191,24 @@ class TuyaNewManufCluster(CustomCluster):
     handle_set_data_response = handle_get_data
     handle_active_status_report = handle_get_data
 
+    def _is_duplicate_report(self, record: TuyaDatapointData) -> bool:
+        """Check if a report repeats the last one and is not due for a refresh."""
+        if self.duplicate_report_refresh is None:
+            return False
+
+        now = time.monotonic()
+        last = self._last_reports.get(record.dp)
+        if (
+            last is not None
+            and last[0] == record.data.dp_type
+            and last[1] == record.data.raw
+            and now - last[2] < self.duplicate_report_refresh
+        ):
+            return True
+
+        self._last_reports[record.dp] = (record.data.dp_type, record.data.raw, now)
+        return False
+
     def handle_set_time_request(self, payload: t.uint16_t) -> foundation.Status:
         """Handle Time set request."""
         return foundation.Status.SUCCESS
@@ -1636,29 +2216,27 @@ class TuyaNewManufCluster(CustomCluster):
     def _dp_2_attr_update(self, datapoint: TuyaDatapointData) -> None:
         """Handle data point to attribute report conversion."""
         try:
-            dp_map = self._dp_to_attributes[datapoint.dp]
+            targets = self._dp_dispatch[datapoint.dp]
         except KeyError:
-            self.debug("No attribute mapping for %s data point", datapoint.dp)
-            return
+            if datapoint.dp not in self._dp_to_attributes:
+                self.debug("No attribute mapping for %s data point", datapoint.dp)
+                return
+            targets = self._dp_dispatch[datapoint.dp] = self._compile_dp(datapoint.dp)
 
+        for target in targets:
+            target.update(datapoint.data.payload)
+
+    def _compile_dp(self, dp: int) -> tuple[DPDispatchTarget, ...]:
+        """Bind the mappings of a datapoint to the clusters they update.
+
+        Compiled on the first report of the datapoint, when all endpoints of the
+        device exist.
+        """
+        targets = []
         endpoint = self.endpoint
-        for mapped_attr in dp_map:
+        for mapped_attr in self._dp_to_attributes[dp]:
             if mapped_attr.endpoint_id:
                 endpoint = self.endpoint.device.endpoints[mapped_attr.endpoint_id]
             cluster = getattr(endpoint, mapped_attr.ep_attribute)
-            value = datapoint.data.payload
-            if mapped_attr.converter:
-                value = mapped_attr.converter(value)
-
-            if isinstance(mapped_attr.attribute_name, tuple):
-                for k, v in zip(mapped_attr.attribute_name, value):
-                    if isinstance(v, AttributeWithMask):
-                        v = cluster.get(k, 0) & (~v.mask) | v.value
-                    cluster.update_attribute(k, v)
-            else:
-                if isinstance(value, AttributeWithMask):
-                    value = (
-                        cluster.get(mapped_attr.attribute_name, 0) & (~value.mask)
-                        | value.value
-                    )
-                cluster.update_attribute(mapped_attr.attribute_name, value)
+            targets.append(DPDispatchTarget.compile(mapped_attr, cluster))
+        return tuple(targets)
@@ -37,8 +37,12 @@ from zhaquirks.tuya import (
     TUYA_SET_DATA,
     BaseEnchantedDevice,
     PowerConfiguration,
+    ReportThrottle,
     TuyaLocalCluster,
     TuyaPowerConfigurationCluster,
+    TuyaRawField,
+    TuyaRawLayout,
+    valid_attribute_ids,
 )
 from zhaquirks.tuya.mcu import DPToAttributeMapping, TuyaMCUCluster, TuyaOnOffNM
 
@@ -522,6 +526,7 @@ class TuyaQuirkBuilder(QuirkBuilder):
         dp_converter: Callable[[Any], Any] | None = None,
         endpoint_id: int | None = None,
         dp_handler: str = "_dp_2_attr_update",
+        throttle: ReportThrottle | None = None,
     ) -> QuirkBuilder:
         """Add Tuya DP Converter."""
 
@@ -534,6 +539,7 @@ class TuyaQuirkBuilder(QuirkBuilder):
                     converter=converter,
                     dp_converter=dp_converter,
                     endpoint_id=endpoint_id,
+                    throttle=throttle,
                 )
             ],
             dp_handler,
@@ -555,6 +561,34 @@ class TuyaQuirkBuilder(QuirkBuilder):
         self.tuya_data_point_handlers.update({dp_id: dp_handler})
         return self
 
+    def tuya_dp_raw(
+        self,
+        dp_id: int,
+        ep_attribute: str,
+        fields: list[TuyaRawField],
+        byteorder: str = "big",
+        endpoint_id: int | None = None,
+        dp_handler: str = "_dp_2_attr_update",
+        throttle: ReportThrottle | None = None,
+    ) -> QuirkBuilder:
+        """Add a raw Tuya DP, decoding all of its fields at once into several attributes."""
+
+        layout = TuyaRawLayout(fields, byteorder)
+        self.tuya_dp_multi(
+            dp_id,
+            [
+                DPToAttributeMapping(
+                    ep_attribute,
+                    layout.attribute_names,
+                    converter=layout,
+                    endpoint_id=endpoint_id,
+                    throttle=throttle,
+                )
+            ],
+            dp_handler,
+        )
+        return self
+
     def tuya_dp_attribute(
         self,
         dp_id: int,
@@ -567,6 +601,7 @@ class TuyaQuirkBuilder(QuirkBuilder):
         type: type = t.uint16_t,
         access: foundation.ZCLAttributeAccess = foundation.ZCLAttributeAccess.NONE,
         is_manufacturer_specific=True,
+        throttle: ReportThrottle | None = None,
     ) -> QuirkBuilder:
         """Add an Tuya DataPoint and corresponding AttributeDef."""
         self.tuya_attribute(
@@ -584,6 +619,7 @@ class TuyaQuirkBuilder(QuirkBuilder):
             converter=converter,
             endpoint_id=endpoint_id,
             dp_handler=dp_handler,
+            throttle=throttle,
         )
         return self
 
@@ -777,10 +813,12 @@ class TuyaQuirkBuilder(QuirkBuilder):
         attribute_initialized_from_cache: bool = True,
         translation_key: str | None = None,
         fallback_name: str | None = None,
+        throttle: ReportThrottle | None = None,
     ) -> QuirkBuilder:
         """Add an EntityMetadata containing ZCLSensorMetadata and return self.
 
-        This method allows exposing a sensor entity in Home Assistant.
+        This method allows exposing a sensor entity in Home Assistant. `throttle`
+        limits how often frequently reported datapoints update the sensor.
         """
 
         self.tuya_dp_attribute(
@@ -791,6 +829,7 @@ class TuyaQuirkBuilder(QuirkBuilder):
             dp_converter=dp_converter,
             access=foundation.ZCLAttributeAccess.Read
             | foundation.ZCLAttributeAccess.Report,
+            throttle=throttle,
         )
         self.sensor(
             attribute_name=attribute_name,
@@ -825,11 +864,29 @@ class TuyaQuirkBuilder(QuirkBuilder):
 
         return self
 
+    def _added_cluster_types(self) -> Callable[[int, str], type | None]:
+        """Return a lookup of the clusters classes added by this quirk, by endpoint."""
+        cluster_types = {
+            (meta.endpoint_id, meta.cluster.ep_attribute): meta.cluster
+            for meta in (
+                *self.adds_metadata,
+                *(replace.add for replace in self.replaces_metadata),
+            )
+            if isinstance(meta.cluster, type)
+        }
+        return lambda endpoint_id, ep_attribute: cluster_types.get(
+            (endpoint_id, ep_attribute)
+        )
+
     def add_to_registry(
         self,
         replacement_cluster: TuyaMCUCluster = TuyaMCUCluster,
         force_add_cluster: bool = False,
         mcu_write_command: foundation.GeneralCommand | int | t.uint8_t = TUYA_SET_DATA,
+        mcu_write_batch_window: float | None = None,
+        mcu_write_debounce: float | None = None,
+        duplicate_report_refresh: float | None = None,
+        mcu_command_window: int | None = None,
     ) -> QuirksV2RegistryEntry:
         """Build the quirks v2 registry entry.
 
@@ -838,6 +895,17 @@ class TuyaQuirkBuilder(QuirkBuilder):
             even if no new Tuya attributes/datapoints were added before.
         :param mcu_write_command: The MCU command to use for the Tuya MCU cluster.
             Default is TUYA_SET_DATA. Few devices use TUYA_SEND_DATA instead.
+        :param mcu_write_batch_window: Seconds to collect written datapoints for,
+            before sending them in as few frames as possible. 0 batches the
+            datapoints of a single attribute write. Default is one frame per datapoint.
+        :param mcu_write_debounce: Seconds a datapoint has to stay unwritten before
+            only its latest value is sent. Default is sending every write.
+        :param duplicate_report_refresh: Ignore datapoint reports identical to the
+            previous one, unless that was handled at least this many seconds ago.
+            Default is handling every report.
+        :param mcu_command_window: Number of written commands awaiting their
+            response before holding back further ones, which are resent on timeout.
+            Default is sending commands without waiting for responses.
         :return: The quirks v2 registry entry.
         """
 
@@ -867,6 +935,19 @@ class TuyaQuirkBuilder(QuirkBuilder):
             TuyaReplacementCluster.dp_to_attribute = self.tuya_dp_to_attribute
 
             TuyaReplacementCluster.mcu_write_command = mcu_write_command
-
+            TuyaReplacementCluster.mcu_write_batch_window = mcu_write_batch_window
+            TuyaReplacementCluster.mcu_write_debounce = mcu_write_debounce
+            TuyaReplacementCluster.duplicate_report_refresh = duplicate_report_refresh
+            TuyaReplacementCluster.mcu_command_window = mcu_command_window
             self.replaces(TuyaReplacementCluster)
+            if not self.replaces_cluster_occurrences_metadata:
+                # otherwise clusters are only known once applied to a device
+                endpoint_id = self.replaces_metadata[-1].add.endpoint_id
+                TuyaReplacementCluster.valid_attributes = {
+                    endpoint_id: valid_attribute_ids(
+                        self.tuya_dp_to_attribute,
+                        endpoint_id,
+                        self._added_cluster_types(),
+                    )
+                }
         return super().add_to_registry()
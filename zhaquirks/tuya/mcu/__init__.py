@@ -2,12 +2,19 @@
 
 from __future__ import annotations
 
-from collections.abc import Callable
+import asyncio
+import collections
+from collections.abc import Callable, Coroutine, Iterable
 import dataclasses
 import datetime
+import functools
+import logging
+import time
 from typing import Any
+import weakref
 
 import zigpy.types as t
+from zigpy.typing import AddressingMode
 from zigpy.zcl import foundation
 from zigpy.zcl.clusters.general import LevelControl, OnOff
 
@@ -17,23 +24,33 @@ from zhaquirks import Bus, DoublingPowerConfigurationCluster
 from zhaquirks.tuya import (
     TUYA_MCU_COMMAND,
     TUYA_MCU_VERSION_RSP,
+    TUYA_SET_DATA,
     TUYA_SET_TIME,
     EnchantedDevice,  # noqa: F401
     NoManufacturerCluster,
     PowerOnState,
+    ReportThrottle,
     TuyaCommand,
+    TuyaCommandView,
     TuyaDatapointData,
     TuyaLocalCluster,
     TuyaNewManufCluster,
     TuyaTimePayload,
 )
 
+_LOGGER = logging.getLogger(__name__)
+
 # New manufacturer attributes
 ATTR_MCU_VERSION = 0xEF00
 
 # manufacturer commands
 TUYA_MCU_CONNECTION_STATUS = 0x25
 
+# largest unfragmented APS payload (82 bytes) minus a manufacturer specific ZCL header
+TUYA_MCU_MAX_PAYLOAD = 77
+# status and tsn preceding the datapoints of a TuyaCommand
+TUYA_COMMAND_HEADER_SIZE = 2
+
 
 @dataclasses.dataclass
 class DPToAttributeMapping:
@@ -44,6 +61,7 @@ class DPToAttributeMapping:
     converter: Callable[[Any], Any] | None = None
     dp_converter: Callable[[Any], Any] | None = None
     endpoint_id: int | None = None
+    throttle: ReportThrottle | None = None
 
 
 class TuyaClusterData(t.Struct):
@@ -111,12 +129,225 @@ class TuyaAttributesCluster(TuyaLocalCluster):
         return [[foundation.WriteAttributesStatusRecord(foundation.Status.SUCCESS)]]
 
 
+@dataclasses.dataclass
+class TuyaCommandPipelineStats:
+    """Counters and latencies of a `TuyaCommandPipeline`."""
+
+    queued: int = 0
+    in_flight: int = 0
+    sent: int = 0
+    acknowledged: int = 0
+    retried: int = 0
+    failed: int = 0
+    last_latency: float | None = None
+    max_latency: float = 0.0
+    total_latency: float = 0.0
+
+    @property
+    def average_latency(self) -> float | None:
+        """Average seconds from the first send of a command to its acknowledgement."""
+        if not self.acknowledged:
+            return None
+        return self.total_latency / self.acknowledged
+
+
+@dataclasses.dataclass
+class _PipelineCommand:
+    command: TuyaCommand
+    send: Callable[[], Coroutine[Any, Any, Any]]
+    result: asyncio.Future[bool]
+    acknowledged: asyncio.Event = dataclasses.field(default_factory=asyncio.Event)
+
+
+def _is_default_response_to(response: Any, command_id: int) -> bool:
+    """Check for a successful ZCL default response to a command."""
+    return (
+        isinstance(
+            response,
+            foundation.GENERAL_COMMANDS[
+                foundation.GeneralCommand.Default_Response
+            ].schema,
+        )
+        and response.command_id == command_id
+        and response.status == foundation.Status.SUCCESS
+    )
+
+
+def _call_weak(method: weakref.WeakMethod, *args: Any) -> None:
+    """Call a method, unless its object was garbage collected in the meantime."""
+    if (bound := method()) is not None:
+        bound(*args)
+
+
+def _cancel_debounced_writes(
+    debounced_writes: dict[
+        int, tuple[asyncio.TimerHandle, TuyaClusterData, TuyaDatapointData]
+    ],
+) -> None:
+    """Cancel the loop handles of debounced writes."""
+    for handle, _, _ in debounced_writes.values():
+        handle.cancel()
+    debounced_writes.clear()
+
+
+class TuyaCommandPipeline:
+    """Send Tuya MCU commands with a bounded number awaiting acknowledgement.
+
+    Commands are sent in order, with at most `window` of them waiting for an
+    acknowledgement: a successful ZCL default response or `set_data_response`
+    carrying their tsn, or a report of all their datapoints with the written
+    values. Unacknowledged commands are resent up to `retries` times, waiting
+    `backoff * 2 ** attempt` seconds in between.
+    """
+
+    def __init__(
+        self,
+        create_task: Callable[[Coroutine[Any, Any, Any]], asyncio.Task],
+        *,
+        command_id: int = TUYA_SET_DATA,
+        window: int = 1,
+        timeout: float = 5.0,
+        retries: int = 2,
+        backoff: float = 0.5,
+    ) -> None:
+        """Init."""
+        self._create_task = create_task
+        self.command_id = command_id
+        self.window = window
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self._queue: collections.deque[_PipelineCommand] = collections.deque()
+        self._in_flight: dict[int, _PipelineCommand] = {}
+        self._stats = TuyaCommandPipelineStats()
+
+    @property
+    def stats(self) -> TuyaCommandPipelineStats:
+        """Snapshot of the pipeline statistics."""
+        return dataclasses.replace(
+            self._stats, queued=len(self._queue), in_flight=len(self._in_flight)
+        )
+
+    def submit(
+        self, command: TuyaCommand, send: Callable[[], Coroutine[Any, Any, Any]]
+    ) -> asyncio.Future[bool]:
+        """Queue a command, returning a future resolving to whether it was acknowledged.
+
+        `send` creates the coroutine sending the command and is called for every attempt.
+        """
+        pending = _PipelineCommand(
+            command, send, asyncio.get_running_loop().create_future()
+        )
+        self._queue.append(pending)
+        self._pump()
+        return pending.result
+
+    def acknowledge(self, tsn: int) -> bool:
+        """Mark the command with `tsn` as acknowledged, if it is in flight."""
+        if (pending := self._in_flight.get(tsn)) is None:
+            return False
+        pending.acknowledged.set()
+        return True
+
+    def acknowledge_report(self, command: TuyaCommand | TuyaCommandView) -> None:
+        """Mark commands as acknowledged if all their written values are reported."""
+        if not self._in_flight:
+            return
+
+        written = {
+            datapoint.dp
+            for pending in self._in_flight.values()
+            for datapoint in pending.command.datapoints
+        }
+        if isinstance(command, TuyaCommandView):
+            datapoints: Iterable[TuyaDatapointData] = command.iter_datapoints(written)
+        else:
+            datapoints = [dp for dp in command.datapoints if dp.dp in written]
+        reported = {(datapoint.dp, datapoint.data.raw) for datapoint in datapoints}
+
+        for pending in self._in_flight.values():
+            if all(
+                (datapoint.dp, datapoint.data.raw) in reported
+                for datapoint in pending.command.datapoints
+            ):
+                pending.acknowledged.set()
+
+    def _pump(self) -> None:
+        while self._queue and len(self._in_flight) < self.window:
+            tsn = self._queue[0].command.tsn
+            if tsn in self._in_flight:
+                # wait for the command reusing the same tsn to finish first
+                break
+            pending = self._queue.popleft()
+            self._in_flight[tsn] = pending
+            self._create_task(self._run(pending))
+
+    async def _run(self, pending: _PipelineCommand) -> None:
+        start = time.monotonic()
+        acknowledged = False
+        try:
+            for attempt in range(self.retries + 1):
+                if attempt:
+                    self._stats.retried += 1
+                    await asyncio.sleep(self.backoff * 2 ** (attempt - 1))
+
+                self._stats.sent += 1
+                try:
+                    response = await pending.send()
+                except Exception as exc:
+                    _LOGGER.debug("Failed to send %s: %r", pending.command, exc)
+                    continue
+
+                # requests expecting a reply return the default response
+                if _is_default_response_to(response, self.command_id):
+                    pending.acknowledged.set()
+
+                try:
+                    async with asyncio.timeout(self.timeout):
+                        await pending.acknowledged.wait()
+                except TimeoutError:
+                    _LOGGER.debug("No response to %s", pending.command)
+                    continue
+
+                acknowledged = True
+                break
+        finally:
+            del self._in_flight[pending.command.tsn]
+            if acknowledged:
+                latency = time.monotonic() - start
+                self._stats.acknowledged += 1
+                self._stats.last_latency = latency
+                self._stats.max_latency = max(self._stats.max_latency, latency)
+                self._stats.total_latency += latency
+            else:
+                self._stats.failed += 1
+            if not pending.result.done():
+                pending.result.set_result(acknowledged)
+            self._pump()
+
+
 class TuyaMCUCluster(TuyaAttributesCluster, TuyaNewManufCluster):
     """Manufacturer specific cluster for sending Tuya MCU commands."""
 
     set_time_offset = 1970  # MCU timestamp from 1/1/1970
     set_time_local_offset = None
 
+    # seconds to collect written datapoints for, before sending them packed into as
+    # few frames as possible. With 0, the datapoints of a single `write_attributes`
+    # call are sent together. With None, every datapoint is sent in its own frame.
+    mcu_write_batch_window: float | None = None
+    mcu_write_max_payload: int = TUYA_MCU_MAX_PAYLOAD
+    # seconds a datapoint has to stay unwritten before its latest value is sent,
+    # so bursts of writes (e.g. dragging a slider) result in a single command
+    mcu_write_debounce: float | None = None
+    # number of commands awaiting a default response, set_data_response or report
+    # of their values before further commands are held back. None sends commands
+    # right away without waiting for responses.
+    mcu_command_window: int | None = None
+    mcu_command_timeout: float = 5.0
+    mcu_command_retries: int = 2
+    mcu_command_backoff: float = 0.5
+
     class AttributeDefs(TuyaNewManufCluster.AttributeDefs):
         """Attribute Definitions."""
 
@@ -198,6 +429,46 @@ class TuyaMCUCluster(TuyaAttributesCluster, TuyaNewManufCluster):
         self.endpoint.device.command_bus = Bus()
         self.endpoint.device.command_bus.add_listener(self)
 
+        # datapoints waiting to be sent, by expect_reply and manufacturer
+        self._pending_writes: dict[
+            tuple[bool, int | None], dict[int, TuyaDatapointData]
+        ] = {}
+        self._flush_writes_handle: asyncio.Handle | None = None
+        # datapoints delayed by `mcu_write_debounce`, by datapoint id. Loop handles
+        # only refer to the cluster weakly and are cancelled once it goes away.
+        self._debounced_writes: dict[
+            int, tuple[asyncio.TimerHandle, TuyaClusterData, TuyaDatapointData]
+        ] = {}
+        weakref.finalize(self, _cancel_debounced_writes, self._debounced_writes)
+
+        self.command_pipeline: TuyaCommandPipeline | None = None
+        if self.mcu_command_window is not None:
+            self.command_pipeline = TuyaCommandPipeline(
+                self.create_catching_task,
+                command_id=self.mcu_write_command,
+                window=self.mcu_command_window,
+                timeout=self.mcu_command_timeout,
+                retries=self.mcu_command_retries,
+                backoff=self.mcu_command_backoff,
+            )
+
+        # (endpoint_id, attribute_name) -> {dp: mapping}, used to write attributes
+        self._dp_mapping_index: dict[
+            tuple[int, str], dict[int, DPToAttributeMapping]
+        ] = {}
+        for dp, dp_mapping in self._dp_to_attributes.items():
+            for mapped_attr in dp_mapping:
+                endpoint_id = mapped_attr.endpoint_id
+                if endpoint_id is None:
+                    endpoint_id = self.endpoint.endpoint_id
+                if isinstance(mapped_attr.attribute_name, tuple):
+                    names = mapped_attr.attribute_name
+                else:
+                    names = (mapped_attr.attribute_name,)
+                for name in names:
+                    index = self._dp_mapping_index.setdefault((endpoint_id, name), {})
+                    index[dp] = mapped_attr
+
     def from_cluster_data(self, data: TuyaClusterData) -> list[TuyaCommand]:
         """Convert from cluster data to a tuya data payload."""
 
@@ -258,43 +529,188 @@ class TuyaMCUCluster(TuyaAttributesCluster, TuyaNewManufCluster):
             )
             return
 
-        for tuya_command in tuya_commands:
-            self.create_catching_task(
-                self.command(
-                    self.mcu_write_command,
-                    tuya_command,
-                    expect_reply=cluster_data.expect_reply,
-                    manufacturer=cluster_data.manufacturer,
-                )
-            )
+        if self.mcu_write_debounce is None:
+            self._send_write(cluster_data, tuya_commands)
+        else:
+            for tuya_command in tuya_commands:
+                self._debounce_write(cluster_data, tuya_command)
 
         endpoint = self.endpoint.device.endpoints[cluster_data.endpoint_id]
         cluster = getattr(endpoint, cluster_data.cluster_name)
         cluster.update_attribute(cluster_data.cluster_attr, cluster_data.attr_value)
 
+    def _send_write(
+        self, cluster_data: TuyaClusterData, tuya_commands: list[TuyaCommand]
+    ) -> None:
+        """Send commands right away or queue them for batching."""
+
+        if self.mcu_write_batch_window is not None:
+            self._queue_write(cluster_data, tuya_commands)
+            return
+
+        for tuya_command in tuya_commands:
+            self._send_command(
+                tuya_command, cluster_data.expect_reply, cluster_data.manufacturer
+            )
+
+    def _send_command(
+        self, tuya_command: TuyaCommand, expect_reply: bool, manufacturer: int | None
+    ) -> None:
+        """Send a datapoint command, through the command pipeline if enabled."""
+
+        # the next report of sent datapoints must not be ignored as a duplicate
+        for datapoint in tuya_command.datapoints:
+            self._last_reports.pop(datapoint.dp, None)
+
+        send = functools.partial(
+            self.command,
+            self.mcu_write_command,
+            tuya_command,
+            expect_reply=expect_reply,
+            manufacturer=manufacturer,
+        )
+        if self.command_pipeline is None:
+            self.create_catching_task(send())
+            return
+
+        # the default response carries the ZCL tsn
+        send = functools.partial(send, tsn=tuya_command.tsn)
+        self.command_pipeline.submit(tuya_command, send)
+
+    def handle_cluster_general_request(
+        self,
+        hdr: foundation.ZCLHeader,
+        args: list[Any],
+        *,
+        dst_addressing: AddressingMode | None = None,
+    ) -> None:
+        """Acknowledge commands by their default response."""
+
+        if (
+            self.command_pipeline is not None
+            and hdr.command_id == foundation.GeneralCommand.Default_Response
+            and _is_default_response_to(args, self.mcu_write_command)
+        ):
+            self.command_pipeline.acknowledge(hdr.tsn)
+        super().handle_cluster_general_request(hdr, args, dst_addressing=dst_addressing)
+
+    def handle_get_data(
+        self, command: TuyaCommand | TuyaCommandView
+    ) -> foundation.Status:
+        """Acknowledge commands whose values are reported and handle the report."""
+
+        if self.command_pipeline is not None:
+            self.command_pipeline.acknowledge_report(command)
+        return super().handle_get_data(command)
+
+    handle_active_status_report = handle_get_data
+
+    def handle_set_data_response(
+        self, command: TuyaCommand | TuyaCommandView
+    ) -> foundation.Status:
+        """Acknowledge the command with the same tsn and handle the reported values."""
+
+        if self.command_pipeline is not None:
+            self.command_pipeline.acknowledge(command.tsn)
+            self.command_pipeline.acknowledge_report(command)
+        return super().handle_set_data_response(command)
+
+    def _debounce_write(
+        self, cluster_data: TuyaClusterData, tuya_command: TuyaCommand
+    ) -> None:
+        """Delay the datapoints of a command, replacing pending writes of them."""
+
+        loop = asyncio.get_running_loop()
+        send = weakref.WeakMethod(self._send_debounced_write)
+        for datapoint in tuya_command.datapoints:
+            if (pending := self._debounced_writes.pop(datapoint.dp, None)) is not None:
+                self.debug("Replacing pending write of datapoint %s", datapoint.dp)
+                pending[0].cancel()
+
+            handle = loop.call_later(
+                self.mcu_write_debounce, _call_weak, send, datapoint.dp
+            )
+            self._debounced_writes[datapoint.dp] = (handle, cluster_data, datapoint)
+
+    def _send_debounced_write(self, dp: int) -> None:
+        """Send the latest value of a datapoint once the debounce window passed."""
+
+        _, cluster_data, datapoint = self._debounced_writes.pop(dp)
+        tuya_command = TuyaCommand(
+            status=0,
+            tsn=self.endpoint.device.application.get_sequence(),
+            datapoints=[datapoint],
+        )
+        self._send_write(cluster_data, [tuya_command])
+
+    def _queue_write(
+        self, cluster_data: TuyaClusterData, tuya_commands: list[TuyaCommand]
+    ) -> None:
+        """Queue datapoints to be sent by `flush_writes`."""
+
+        key = (cluster_data.expect_reply, cluster_data.manufacturer)
+        pending = self._pending_writes.setdefault(key, {})
+        for tuya_command in tuya_commands:
+            for datapoint in tuya_command.datapoints:
+                # only the latest value of a datapoint needs to be sent
+                pending[datapoint.dp] = datapoint
+
+        if self._flush_writes_handle is None:
+            loop = asyncio.get_running_loop()
+            if self.mcu_write_batch_window:
+                self._flush_writes_handle = loop.call_later(
+                    self.mcu_write_batch_window, self.flush_writes
+                )
+            else:
+                self._flush_writes_handle = loop.call_soon(self.flush_writes)
+
+    def flush_writes(self) -> None:
+        """Send all queued datapoints, packed into as few frames as possible."""
+
+        if self._flush_writes_handle is not None:
+            self._flush_writes_handle.cancel()
+            self._flush_writes_handle = None
+
+        pending, self._pending_writes = self._pending_writes, {}
+        for (expect_reply, manufacturer), datapoints in pending.items():
+            for tuya_command in self.pack_datapoints(datapoints.values()):
+                self.debug("flush_writes: %s", tuya_command)
+                self._send_command(tuya_command, expect_reply, manufacturer)
+
+    def pack_datapoints(
+        self, datapoints: Iterable[TuyaDatapointData]
+    ) -> list[TuyaCommand]:
+        """Pack datapoints into commands not exceeding `mcu_write_max_payload`.
+
+        A datapoint too large to share a frame is sent on its own.
+        """
+
+        tuya_commands: list[TuyaCommand] = []
+        size = 0
+        for datapoint in datapoints:
+            dp_size = len(datapoint.serialize())
+            if tuya_commands and size + dp_size <= self.mcu_write_max_payload:
+                tuya_commands[-1].datapoints.append(datapoint)
+                size += dp_size
+                continue
+
+            cmd_payload = TuyaCommand()
+            cmd_payload.status = 0
+            cmd_payload.tsn = self.endpoint.device.application.get_sequence()
+            cmd_payload.datapoints = t.List([datapoint])
+            tuya_commands.append(cmd_payload)
+            size = TUYA_COMMAND_HEADER_SIZE + dp_size
+
+        return tuya_commands
+
     def get_dp_mapping(
         self, endpoint_id: int, attribute_name: str
     ) -> dict[int, DPToAttributeMapping]:
         """Search for the DP in _dp_to_attributes."""
 
-        result: dict[int, DPToAttributeMapping] = {}
-        for dp, dp_mapping in self._dp_to_attributes.items():
-            for mapped_attr in dp_mapping:
-                if (
-                    attribute_name == mapped_attr.attribute_name
-                    or (
-                        isinstance(mapped_attr.attribute_name, tuple)
-                        and attribute_name in mapped_attr.attribute_name
-                    )
-                ) and (
-                    (
-                        mapped_attr.endpoint_id is None
-                        and endpoint_id == self.endpoint.endpoint_id
-                    )
-                    or (endpoint_id == mapped_attr.endpoint_id)
-                ):
-                    self.debug("get_dp_mapping --> found DP: %s", dp)
-                    result[dp] = mapped_attr
+        result = dict(self._dp_mapping_index.get((endpoint_id, attribute_name), {}))
+        if result:
+            self.debug("get_dp_mapping --> found DPs: %s", list(result))
         return result
 
     def handle_mcu_version_response(self, payload: MCUVersion) -> foundation.Status:
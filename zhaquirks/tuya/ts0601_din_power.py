@@ -8,7 +8,7 @@ from zigpy.zcl.clusters.general import Basic, Groups, Ota, Scenes, Time
 from zigpy.zcl.clusters.homeautomation import ElectricalMeasurement
 from zigpy.zcl.clusters.smartenergy import Metering
 
-from zhaquirks import Bus, LocalDataCluster
+from zhaquirks import KeyedBus, LocalDataCluster
 from zhaquirks.const import (
     DEVICE_TYPE,
     ENDPOINTS,
@@ -67,8 +67,11 @@ class TuyaManufClusterDinPower(TuyaManufClusterAttributes):
         elif attrid == TUYA_VOLTAGE_ATTR:
             self.endpoint.electrical_measurement.voltage_reported(value / 10)
         elif attrid == TUYA_DIN_SWITCH_ATTR:
-            self.endpoint.device.switch_bus.listener_event(
-                SWITCH_EVENT, self.endpoint.endpoint_id, value
+            self.endpoint.device.switch_bus.route_event(
+                self.endpoint.endpoint_id,
+                SWITCH_EVENT,
+                self.endpoint.endpoint_id,
+                value,
             )
 
 
@@ -161,7 +164,7 @@ class HikingManufClusterDinPower(TuyaManufClusterAttributes):
     def _update_attribute(self, attrid, value):
         super()._update_attribute(attrid, value)
         if attrid == HIKING_DIN_SWITCH_ATTR:
-            self.endpoint.device.switch_bus.listener_event(SWITCH_EVENT, 16, value)
+            self.endpoint.device.switch_bus.route_event(16, SWITCH_EVENT, 16, value)
         elif attrid == HIKING_TOTAL_ENERGY_DELIVERED_ATTR:
             self.endpoint.smartenergy_metering.energy_deliver_reported(value / 100)
         elif attrid == HIKING_TOTAL_ENERGY_RECEIVED_ATTR:
@@ -188,7 +191,7 @@ class TuyaPowerMeter(TuyaSwitch):
 
     def __init__(self, *args, **kwargs):
         """Init device."""
-        self.switch_bus = Bus()
+        self.switch_bus = KeyedBus()
         super().__init__(*args, **kwargs)
 
     signature = {
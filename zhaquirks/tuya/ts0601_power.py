@@ -12,7 +12,7 @@ import zigpy.types as t
 from zigpy.zcl.clusters.general import LevelControl, OnOff
 from zigpy.zcl.clusters.homeautomation import ElectricalMeasurement
 
-from zhaquirks.tuya import DPToAttributeMapping, TuyaLocalCluster
+from zhaquirks.tuya import TuyaLocalCluster, TuyaRawField
 from zhaquirks.tuya.builder import TuyaQuirkBuilder
 
 
@@ -25,26 +25,15 @@ def dp_to_power(data: ByteString) -> int:
     return power
 
 
-def multi_dp_to_power(data: ByteString) -> int:
-    """Convert DP data to power value."""
+def raw_dp_to_power(power: int) -> int:
+    """Convert the power field of a raw DP to a power value."""
     # Support negative power readings
     # From https://github.com/Koenkk/zigbee2mqtt/issues/18603#issuecomment-2277697295
-    power = data[7] | (data[6] << 8)
     if power > 0x7FFF:
         power = (0x999A - power) * -1
     return power
 
 
-def multi_dp_to_current(data: ByteString) -> int:
-    """Convert DP data to current value."""
-    return data[4] | (data[3] << 8)
-
-
-def multi_dp_to_voltage(data: ByteString) -> int:
-    """Convert DP data to voltage value."""
-    return data[1] | (data[0] << 8)
-
-
 class Tuya3PhaseElectricalMeasurement(ElectricalMeasurement, TuyaLocalCluster):
     """Tuya Electrical Measurement cluster."""
 
@@ -135,64 +124,31 @@ class Tuya3PhaseElectricalMeasurement(ElectricalMeasurement, TuyaLocalCluster):
         unit=UnitOfElectricCurrent.AMPERE,
         fallback_name="Total current",
     )
-    .tuya_dp_multi(
+    .tuya_dp_raw(
         dp_id=6,
-        attribute_mapping=[
-            DPToAttributeMapping(
-                ep_attribute=Tuya3PhaseElectricalMeasurement.ep_attribute,
-                attribute_name="active_power",
-                converter=multi_dp_to_power,
-            ),
-            DPToAttributeMapping(
-                ep_attribute=Tuya3PhaseElectricalMeasurement.ep_attribute,
-                attribute_name="rms_voltage",
-                converter=multi_dp_to_voltage,
-            ),
-            DPToAttributeMapping(
-                ep_attribute=Tuya3PhaseElectricalMeasurement.ep_attribute,
-                attribute_name="rms_current",
-                converter=multi_dp_to_current,
-            ),
+        ep_attribute=Tuya3PhaseElectricalMeasurement.ep_attribute,
+        fields=[
+            TuyaRawField("active_power", offset=6, converter=raw_dp_to_power),
+            TuyaRawField("rms_voltage", offset=0),
+            TuyaRawField("rms_current", offset=3),
         ],
     )
-    .tuya_dp_multi(
+    .tuya_dp_raw(
         dp_id=7,
-        attribute_mapping=[
-            DPToAttributeMapping(
-                ep_attribute=Tuya3PhaseElectricalMeasurement.ep_attribute,
-                attribute_name="active_power_ph_b",
-                converter=multi_dp_to_power,
-            ),
-            DPToAttributeMapping(
-                ep_attribute=Tuya3PhaseElectricalMeasurement.ep_attribute,
-                attribute_name="rms_voltage_ph_b",
-                converter=multi_dp_to_voltage,
-            ),
-            DPToAttributeMapping(
-                ep_attribute=Tuya3PhaseElectricalMeasurement.ep_attribute,
-                attribute_name="rms_current_ph_b",
-                converter=multi_dp_to_current,
-            ),
+        ep_attribute=Tuya3PhaseElectricalMeasurement.ep_attribute,
+        fields=[
+            TuyaRawField("active_power_ph_b", offset=6, converter=raw_dp_to_power),
+            TuyaRawField("rms_voltage_ph_b", offset=0),
+            TuyaRawField("rms_current_ph_b", offset=3),
         ],
     )
-    .tuya_dp_multi(
+    .tuya_dp_raw(
         dp_id=8,
-        attribute_mapping=[
-            DPToAttributeMapping(
-                ep_attribute=Tuya3PhaseElectricalMeasurement.ep_attribute,
-                attribute_name="active_power_ph_c",
-                converter=multi_dp_to_power,
-            ),
-            DPToAttributeMapping(
-                ep_attribute=Tuya3PhaseElectricalMeasurement.ep_attribute,
-                attribute_name="rms_voltage_ph_c",
-                converter=multi_dp_to_voltage,
-            ),
-            DPToAttributeMapping(
-                ep_attribute=Tuya3PhaseElectricalMeasurement.ep_attribute,
-                attribute_name="rms_current_ph_c",
-                converter=multi_dp_to_current,
-            ),
+        ep_attribute=Tuya3PhaseElectricalMeasurement.ep_attribute,
+        fields=[
+            TuyaRawField("active_power_ph_c", offset=6, converter=raw_dp_to_power),
+            TuyaRawField("rms_voltage_ph_c", offset=0),
+            TuyaRawField("rms_current_ph_c", offset=3),
         ],
     )
     .tuya_dp(
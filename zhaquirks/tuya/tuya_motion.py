@@ -1,6 +1,5 @@
 """BlitzWolf IS-3/Tuya motion rechargeable occupancy sensor."""
 
-import asyncio
 from typing import Any
 
 from zigpy.quirks.v2 import EntityPlatform, EntityType
@@ -11,6 +10,7 @@ import zigpy.types as t
 from zigpy.zcl.clusters.measurement import OccupancySensing
 from zigpy.zcl.clusters.security import IasZone
 
+from zhaquirks import TimerWheel
 from zhaquirks.tuya import TuyaLocalCluster
 from zhaquirks.tuya.builder import TuyaQuirkBuilder
 
@@ -30,12 +30,10 @@ class TuyaMotionWithReset(IasZone, TuyaLocalCluster):
     def __init__(self, *args, **kwargs):
         """Init."""
         super().__init__(*args, **kwargs)
-        self._loop = asyncio.get_running_loop()
-        self._timer_handle = None
+        self._reset_timer = TimerWheel.for_loop().timer(self._turn_off)
 
     def _turn_off(self) -> None:
         """Reset IAS zone status."""
-        self._timer_handle = None
         self.debug("%s - Resetting Tuya motion sensor", self.endpoint.device.ieee)
         self._update_attribute(IasZone.AttributeDefs.zone_status.id, 0)
 
@@ -46,9 +44,7 @@ class TuyaMotionWithReset(IasZone, TuyaLocalCluster):
             and value == IasZone.ZoneStatus.Alarm_1
         ):
             self.debug("%s - Received Tuya motion event", self.endpoint.device.ieee)
-            if self._timer_handle:
-                self._timer_handle.cancel()
-            self._timer_handle = self._loop.call_later(self.reset_s, self._turn_off)
+            self._reset_timer.arm(self.reset_s)
 
         super()._update_attribute(attrid, value)
 
@@ -2,15 +2,19 @@
 
 from __future__ import annotations
 
-from collections.abc import Iterable, Iterator
+from collections import deque
+from collections.abc import Callable, Iterator, Mapping
+import functools
 import logging
 import math
-from typing import Any
+from types import MappingProxyType
+from typing import Any, NamedTuple
 
 from zigpy import types as t
 import zigpy.device
 from zigpy.profiles import zha
-from zigpy.quirks import CustomCluster, CustomDevice
+from zigpy.quirks import DEVICE_REGISTRY, CustomCluster, CustomDevice
+from zigpy.quirks.registry import DeviceRegistry
 from zigpy.typing import AddressingMode
 from zigpy.zcl import foundation
 from zigpy.zcl.clusters.general import (
@@ -111,6 +115,243 @@ XIAOMI_NODE_DESC = NodeDescriptor(
 _LOGGER = logging.getLogger(__name__)
 
 
+class XiaomiAttributeTarget(NamedTuple):
+    """ZCL attribute updated with a value of a Xiaomi attribute report."""
+
+    ep_attribute: str
+    attribute_id: int
+    converter: Callable[[Any], Any] | None = None
+    optional: bool = False  # skip when the endpoint doesn't have the cluster
+
+
+class XiaomiReportedAttribute(NamedTuple):
+    """Value of a Xiaomi attribute report and where it is dispatched to."""
+
+    name: str
+    targets: tuple[XiaomiAttributeTarget, ...] = ()
+    handler: str | None = None  # XiaomiCluster method called with the value
+
+
+XIAOMI_REPORTED_ATTRIBUTES: dict[str, XiaomiReportedAttribute] = {
+    attribute.name: attribute
+    for attribute in (
+        XiaomiReportedAttribute(
+            BATTERY_VOLTAGE_MV, handler="_battery_voltage_reported"
+        ),
+        XiaomiReportedAttribute(
+            TEMPERATURE_MEASUREMENT,
+            (
+                XiaomiAttributeTarget(
+                    "temperature",
+                    TemperatureMeasurement.AttributeDefs.measured_value.id,
+                ),
+            ),
+        ),
+        XiaomiReportedAttribute(
+            HUMIDITY_MEASUREMENT,
+            (
+                XiaomiAttributeTarget(
+                    "humidity", RelativeHumidity.AttributeDefs.measured_value.id
+                ),
+            ),
+        ),
+        XiaomiReportedAttribute(
+            PRESSURE_MEASUREMENT,
+            (
+                XiaomiAttributeTarget(
+                    "pressure", PressureMeasurement.AttributeDefs.measured_value.id
+                ),
+            ),
+        ),
+        XiaomiReportedAttribute(
+            PRESSURE_MEASUREMENT_PRECISION,
+            (
+                XiaomiAttributeTarget(
+                    "pressure",
+                    PressureMeasurement.AttributeDefs.measured_value.id,
+                    lambda value: value / 100,
+                ),
+            ),
+        ),
+        XiaomiReportedAttribute(
+            POWER,
+            (
+                XiaomiAttributeTarget(
+                    "electrical_measurement",
+                    ElectricalMeasurement.AttributeDefs.active_power.id,
+                    lambda value: round(value * 10),
+                ),
+            ),
+        ),
+        XiaomiReportedAttribute(
+            CONSUMPTION,
+            (
+                XiaomiAttributeTarget(
+                    "electrical_measurement",
+                    ElectricalMeasurement.AttributeDefs.total_active_power.id,
+                    lambda value: round(value * 1000),
+                ),
+                XiaomiAttributeTarget(
+                    "smartenergy_metering",
+                    Metering.AttributeDefs.current_summ_delivered.id,
+                    lambda value: round(value * 1000),
+                ),
+            ),
+        ),
+        XiaomiReportedAttribute(
+            VOLTAGE,
+            (
+                XiaomiAttributeTarget(
+                    "electrical_measurement",
+                    ElectricalMeasurement.AttributeDefs.rms_voltage.id,
+                    lambda value: value * 0.1,
+                ),
+            ),
+        ),
+        XiaomiReportedAttribute(
+            ILLUMINANCE_MEASUREMENT,
+            (
+                XiaomiAttributeTarget(
+                    "illuminance",
+                    IlluminanceMeasurement.AttributeDefs.measured_value.id,
+                ),
+            ),
+        ),
+        XiaomiReportedAttribute(
+            TVOC_MEASUREMENT, (XiaomiAttributeTarget("voc_level", 0x0000),)
+        ),
+        XiaomiReportedAttribute(
+            TEMPERATURE,
+            (
+                XiaomiAttributeTarget(
+                    "device_temperature",
+                    DeviceTemperature.AttributeDefs.current_temperature.id,
+                    lambda value: value * 100,
+                    optional=True,
+                ),
+            ),
+        ),
+        XiaomiReportedAttribute(
+            BATTERY_PERCENTAGE_REMAINING_ATTRIBUTE,
+            handler="_battery_percentage_reported",
+        ),
+        XiaomiReportedAttribute(
+            SMOKE,
+            (XiaomiAttributeTarget("ias_zone", IasZone.AttributeDefs.zone_status.id),),
+        ),
+    )
+}
+
+# tags of the Aqara 0xFF01/0x00F7 attributes reported by all devices
+AQARA_TAGS: dict[int, str] = {
+    1: BATTERY_VOLTAGE_MV,
+    3: TEMPERATURE,
+    4: XIAOMI_ATTR_4,
+    5: XIAOMI_ATTR_5,
+    6: XIAOMI_ATTR_6,
+    10: PATH,
+}
+
+# additional tags by model, replacing the common ones
+AQARA_MODEL_TAGS: dict[str, dict[int, str]] = {
+    # Temperature sensors send temperature/humidity/pressure updates through this
+    # cluster instead of the respective clusters
+    **dict.fromkeys(
+        ("lumi.sensor_ht", "lumi.sens", "lumi.sensor_ht.agl02"),
+        {
+            100: TEMPERATURE_MEASUREMENT,
+            101: HUMIDITY_MEASUREMENT,
+            102: PRESSURE_MEASUREMENT,
+        },
+    ),
+    "lumi.weather": {
+        100: TEMPERATURE_MEASUREMENT,
+        101: HUMIDITY_MEASUREMENT,
+        102: PRESSURE_MEASUREMENT_PRECISION,
+    },
+    "lumi.airmonitor.acn01": {
+        100: TEMPERATURE_MEASUREMENT,
+        101: HUMIDITY_MEASUREMENT,
+        102: TVOC_MEASUREMENT,
+    },
+    **dict.fromkeys(
+        (
+            "lumi.plug",
+            "lumi.plug.maus01",
+            "lumi.plug.maeu01",
+            "lumi.plug.mmeu01",
+            "lumi.relay.c2acn01",
+            "lumi.switch.n0agl1",
+            "lumi.switch.n0acn2",
+        ),
+        {149: CONSUMPTION, 150: VOLTAGE, 152: POWER},
+    ),
+    "lumi.sensor_motion.aq2": {11: ILLUMINANCE_MEASUREMENT},
+    "lumi.curtain.acn002": {101: BATTERY_PERCENTAGE_REMAINING_ATTRIBUTE},
+    **dict.fromkeys(
+        ("lumi.motion.agl02", "lumi.motion.acn001"),
+        {101: ILLUMINANCE_MEASUREMENT},
+    ),
+    "lumi.motion.ac02": {
+        101: ILLUMINANCE_MEASUREMENT,
+        105: DETECTION_INTERVAL,
+        106: MOTION_SENSITIVITY,
+    },
+    "lumi.motion.agl04": {
+        102: DETECTION_INTERVAL,
+        105: MOTION_SENSITIVITY,
+        258: DETECTION_INTERVAL,
+        268: MOTION_SENSITIVITY,
+    },
+    "lumi.motion.ac01": {
+        5: POWER_OUTAGE_COUNT,
+        101: PRESENCE_DETECTED,
+        102: PRESENCE_EVENT,
+        103: MONITORING_MODE,
+        105: APPROACH_DISTANCE,
+        268: MOTION_SENSITIVITY,
+        322: PRESENCE_DETECTED,
+        323: PRESENCE_EVENT,
+        324: MONITORING_MODE,
+        326: APPROACH_DISTANCE,
+    },
+    "lumi.sensor_smoke.acn03": {
+        160: SMOKE,
+        161: SMOKE_DENSITY,
+        162: SELF_TEST,
+        163: BUZZER_MANUAL_MUTE,
+        164: HEARTBEAT_INDICATOR,
+        165: LINKAGE_ALARM,
+    },
+}
+
+MIJA_ATTRIBUTES = (
+    STATE,
+    BATTERY_VOLTAGE_MV,
+    XIAOMI_ATTR_3,
+    XIAOMI_ATTR_4,
+    XIAOMI_ATTR_5,
+    XIAOMI_ATTR_6,
+)
+
+
+MIJA_REPORTED_ATTRIBUTES = tuple(
+    XIAOMI_REPORTED_ATTRIBUTES.get(name, XiaomiReportedAttribute(name))
+    for name in MIJA_ATTRIBUTES
+)
+
+
+@functools.cache
+def aqara_tag_table(model: str | None) -> Mapping[int, XiaomiReportedAttribute]:
+    """Return the reported attribute of every known Aqara report tag of a model."""
+    return MappingProxyType(
+        {
+            tag: XIAOMI_REPORTED_ATTRIBUTES.get(name, XiaomiReportedAttribute(name))
+            for tag, name in (AQARA_TAGS | AQARA_MODEL_TAGS.get(model, {})).items()
+        }
+    )
+
+
 class XiaomiCustomDevice(CustomDevice):
     """Custom device representing xiaomi devices."""
 
@@ -165,7 +406,7 @@ class XiaomiCluster(CustomCluster):
 
             val, final_data = data[:fixed_len], data[fixed_len:]
             attr_val = t.LVBytes(val)
-            attr_type = 0x41  # The data type should be "Octet String"
+            attr_type = t.uint8_t(0x41)  # The data type should be "Octet String"
 
             yield (
                 foundation.Attribute(
@@ -176,58 +417,102 @@ class XiaomiCluster(CustomCluster):
             )
 
     def _interpret_attr_reports(
-        self, data: bytes
-    ) -> Iterable[tuple[foundation.Attribute]]:
-        """Yield all valid interprations of a Xiaomi attribute report."""
-
-        if not data:
-            yield ()
-            return
-
-        try:
-            parsed = list(self._iter_parse_attr_report(data))
-        except (KeyError, ValueError):
-            return
-
-        for attr, remaining_data in parsed:
-            for remaining_attrs in self._interpret_attr_reports(remaining_data):
-                yield (attr,) + remaining_attrs
+        self, data: bytes, *, count: bool = False
+    ) -> tuple[tuple[foundation.Attribute, ...] | None, int]:
+        """Find the first valid interpretation of a Xiaomi attribute report.
+
+        Interpretations are preferred in the order `_iter_parse_attr_report` yields
+        them, but the report is parsed only once from every position. Returns the
+        interpretation, or None, and with `count` the number of valid interpretations.
+        """
+        end = len(data)
+        # position -> [(attribute, position of the next attribute)]
+        candidates: dict[int, list[tuple[foundation.Attribute, int]]] = {}
+        pending = [0]
+        while pending:
+            pos = pending.pop()
+            if pos == end or pos in candidates:
+                continue
+            try:
+                parsed = list(self._iter_parse_attr_report(data[pos:]))
+            except (KeyError, ValueError):
+                parsed = []
+            candidates[pos] = [(attr, end - len(rest)) for attr, rest in parsed]
+            pending.extend(next_pos for _, next_pos in candidates[pos])
+
+        # attributes always move forward, so solve the positions back to front
+        interpretations = {end: 1}
+        first: dict[int, tuple[foundation.Attribute, int]] = {}
+        for pos in sorted(candidates, reverse=True):
+            interpretations[pos] = 0
+            for attr, next_pos in candidates[pos]:
+                if not interpretations[next_pos]:
+                    continue
+                first.setdefault(pos, (attr, next_pos))
+                if not count:
+                    interpretations[pos] = 1
+                    break
+                interpretations[pos] += interpretations[next_pos]
+
+        if not interpretations[0]:
+            return None, 0
+
+        report = []
+        pos = 0
+        while pos != end:
+            attr, pos = first[pos]
+            report.append(attr)
+        return tuple(report), interpretations[0]
 
     def deserialize(self, data):
         """Deserialize cluster data."""
-        hdr, data = foundation.ZCLHeader.deserialize(data)
+        hdr, payload = foundation.ZCLHeader.deserialize(data)
 
         # Only handle attribute reports differently
         if (
             hdr.frame_control.frame_type != foundation.FrameType.GLOBAL_COMMAND
             or hdr.command_id != foundation.GeneralCommand.Report_Attributes
         ):
-            return super().deserialize(hdr.serialize() + data)
+            return super().deserialize(data)
 
-        reports = list(self._interpret_attr_reports(data))
+        report, interpretations = self._interpret_attr_reports(
+            payload, count=_LOGGER.isEnabledFor(logging.WARNING)
+        )
 
-        if not reports:
-            _LOGGER.warning("Failed to parse Xiaomi attribute report: %r", data)
-            return super().deserialize(hdr.serialize() + data)
-        elif len(reports) > 1:
+        if report is None:
+            _LOGGER.warning("Failed to parse Xiaomi attribute report: %r", payload)
+            return super().deserialize(data)
+        elif interpretations > 1:
             _LOGGER.warning(
-                "Xiaomi attribute report has multiple valid interpretations: %r",
-                reports,
+                "Xiaomi attribute report has %d valid interpretations, using %r",
+                interpretations,
+                report,
             )
 
-        fixed_data = b"".join(attr.serialize() for attr in reports[0])
+        # The repaired attributes are already parsed, build the command from them
+        # instead of serializing them to be parsed again
+        command = foundation.GENERAL_COMMANDS[hdr.command_id]
+        hdr.frame_control.direction = command.direction
+        response = command.schema(attribute_reports=list(report))
+        self.debug("Decoded ZCL frame: %s:%r", type(self).__name__, response)
 
-        return super().deserialize(hdr.serialize() + fixed_data)
+        return hdr, response
 
     def _update_attribute(self, attrid, value):
         if attrid in (XIAOMI_AQARA_ATTRIBUTE, XIAOMI_AQARA_ATTRIBUTE_E1):
-            attributes = self._parse_aqara_attributes(value)
+            reported = {
+                attribute.name: (attribute, attr_value)
+                for attribute, attr_value in self._iter_aqara_attributes(value)
+            }
             super()._update_attribute(attrid, value)
             if self.endpoint.device.model == "lumi.sensor_switch.aq2":
                 if value == b"\x04!\xa8C\n!\x00\x00":
                     self.listener_event(ZHA_SEND_EVENT, COMMAND_TRIPLE, [])
         elif attrid == XIAOMI_MIJA_ATTRIBUTE:
-            attributes = self._parse_mija_attributes(value)
+            reported = {
+                attribute.name: (attribute, attr_value.value)
+                for attribute, attr_value in zip(MIJA_REPORTED_ATTRIBUTES, value)
+            }
         else:
             super()._update_attribute(attrid, value)
             if attrid == MODEL:
@@ -251,212 +536,73 @@ class XiaomiCluster(CustomCluster):
                 )
             return
 
-        _LOGGER.debug(
-            "%s - Xiaomi attribute report. attribute_id: [%s] value: [%s]",
-            self.endpoint.device.ieee,
-            attrid,
-            attributes,
-        )
-        if BATTERY_VOLTAGE_MV in attributes:
-            # many Xiaomi devices report this, but not all quirks implement the XiaomiPowerConfiguration cluster,
-            # so we might error out if the method doesn't exist
-            if hasattr(self.endpoint.power, "battery_reported") and callable(
-                self.endpoint.power.battery_reported
-            ):
-                self.endpoint.power.battery_reported(attributes[BATTERY_VOLTAGE_MV])
-            else:
-                # log a debug message if the cluster is not implemented
-                _LOGGER.debug(
-                    "%s - Xiaomi battery voltage attribute received but XiaomiPowerConfiguration not used",
-                    self.endpoint.device.ieee,
-                )
-
-        if TEMPERATURE_MEASUREMENT in attributes:
-            self.endpoint.temperature.update_attribute(
-                TemperatureMeasurement.AttributeDefs.measured_value.id,
-                attributes[TEMPERATURE_MEASUREMENT],
-            )
-
-        if HUMIDITY_MEASUREMENT in attributes:
-            self.endpoint.humidity.update_attribute(
-                RelativeHumidity.AttributeDefs.measured_value.id,
-                attributes[HUMIDITY_MEASUREMENT],
-            )
-
-        if PRESSURE_MEASUREMENT in attributes:
-            self.endpoint.pressure.update_attribute(
-                PressureMeasurement.AttributeDefs.measured_value.id,
-                attributes[PRESSURE_MEASUREMENT],
+        if _LOGGER.isEnabledFor(logging.DEBUG):
+            _LOGGER.debug(
+                "%s - Xiaomi attribute report. attribute_id: [%s] value: [%s]",
+                self.endpoint.device.ieee,
+                attrid,
+                {name: attr_value for name, (_, attr_value) in reported.items()},
             )
+        for attribute, attr_value in reported.values():
+            self._dispatch_reported_attribute(attribute, attr_value)
 
-        if PRESSURE_MEASUREMENT_PRECISION in attributes:
-            self.endpoint.pressure.update_attribute(
-                PressureMeasurement.AttributeDefs.measured_value.id,
-                attributes[PRESSURE_MEASUREMENT_PRECISION] / 100,
-            )
-
-        if POWER in attributes:
-            self.endpoint.electrical_measurement.update_attribute(
-                ElectricalMeasurement.AttributeDefs.active_power.id,
-                round(attributes[POWER] * 10),
-            )
-
-        if CONSUMPTION in attributes:
-            zcl_consumption = round(attributes[CONSUMPTION] * 1000)
-            self.endpoint.electrical_measurement.update_attribute(
-                ElectricalMeasurement.AttributeDefs.total_active_power.id,
-                zcl_consumption,
-            )
-            self.endpoint.smartenergy_metering.update_attribute(
-                Metering.AttributeDefs.current_summ_delivered.id, zcl_consumption
-            )
-
-        if VOLTAGE in attributes:
-            self.endpoint.electrical_measurement.update_attribute(
-                ElectricalMeasurement.AttributeDefs.rms_voltage.id,
-                attributes[VOLTAGE] * 0.1,
-            )
-
-        if ILLUMINANCE_MEASUREMENT in attributes:
-            self.endpoint.illuminance.update_attribute(
-                IlluminanceMeasurement.AttributeDefs.measured_value.id,
-                attributes[ILLUMINANCE_MEASUREMENT],
-            )
-
-        if TVOC_MEASUREMENT in attributes:
-            self.endpoint.voc_level.update_attribute(
-                0x0000, attributes[TVOC_MEASUREMENT]
-            )
-
-        if TEMPERATURE in attributes:
-            if hasattr(self.endpoint, "device_temperature"):
-                self.endpoint.device_temperature.update_attribute(
-                    DeviceTemperature.AttributeDefs.current_temperature.id,
-                    attributes[TEMPERATURE] * 100,
-                )
+    def _dispatch_reported_attribute(
+        self, attribute: XiaomiReportedAttribute, value: Any
+    ) -> None:
+        """Update the clusters a value of a Xiaomi attribute report belongs to."""
+        if attribute.handler is not None:
+            getattr(self, attribute.handler)(value)
 
-        if BATTERY_PERCENTAGE_REMAINING_ATTRIBUTE in attributes:
-            self.endpoint.power.battery_percent_reported(
-                attributes[BATTERY_PERCENTAGE_REMAINING_ATTRIBUTE]
+        for target in attribute.targets:
+            if target.optional and not hasattr(self.endpoint, target.ep_attribute):
+                continue
+            getattr(self.endpoint, target.ep_attribute).update_attribute(
+                target.attribute_id,
+                value if target.converter is None else target.converter(value),
             )
 
-        if SMOKE in attributes:
-            self.endpoint.ias_zone.update_attribute(
-                IasZone.AttributeDefs.zone_status.id, attributes[SMOKE]
+    def _battery_voltage_reported(self, value: int) -> None:
+        # many Xiaomi devices report this, but not all quirks implement the XiaomiPowerConfiguration cluster,
+        # so we might error out if the method doesn't exist
+        if hasattr(self.endpoint.power, "battery_reported") and callable(
+            self.endpoint.power.battery_reported
+        ):
+            self.endpoint.power.battery_reported(value)
+        else:
+            # log a debug message if the cluster is not implemented
+            _LOGGER.debug(
+                "%s - Xiaomi battery voltage attribute received but XiaomiPowerConfiguration not used",
+                self.endpoint.device.ieee,
             )
 
-    def _parse_aqara_attributes(self, value):
-        """Parse non-standard attributes."""
-        attributes = {}
-        attribute_names = {
-            1: BATTERY_VOLTAGE_MV,
-            3: TEMPERATURE,
-            4: XIAOMI_ATTR_4,
-            5: XIAOMI_ATTR_5,
-            6: XIAOMI_ATTR_6,
-            10: PATH,
-        }
+    def _battery_percentage_reported(self, value: int) -> None:
+        self.endpoint.power.battery_percent_reported(value)
 
-        if self.endpoint.device.model in [
-            "lumi.sensor_ht",
-            "lumi.sens",
-            "lumi.weather",
-            "lumi.airmonitor.acn01",
-            "lumi.sensor_ht.agl02",
-        ]:
-            # Temperature sensors send temperature/humidity/pressure updates through this
-            # cluster instead of the respective clusters
-            attribute_names.update(
-                {
-                    100: TEMPERATURE_MEASUREMENT,
-                    101: HUMIDITY_MEASUREMENT,
-                    102: TVOC_MEASUREMENT
-                    if self.endpoint.device.model == "lumi.airmonitor.acn01"
-                    else PRESSURE_MEASUREMENT_PRECISION
-                    if self.endpoint.device.model == "lumi.weather"
-                    else PRESSURE_MEASUREMENT,
-                }
-            )
-        elif self.endpoint.device.model in [
-            "lumi.plug",
-            "lumi.plug.maus01",
-            "lumi.plug.maeu01",
-            "lumi.plug.mmeu01",
-            "lumi.relay.c2acn01",
-            "lumi.switch.n0agl1",
-            "lumi.switch.n0acn2",
-        ]:
-            attribute_names.update({149: CONSUMPTION, 150: VOLTAGE, 152: POWER})
-        elif self.endpoint.device.model == "lumi.sensor_motion.aq2":
-            attribute_names.update({11: ILLUMINANCE_MEASUREMENT})
-        elif self.endpoint.device.model == "lumi.curtain.acn002":
-            attribute_names.update({101: BATTERY_PERCENTAGE_REMAINING_ATTRIBUTE})
-        elif self.endpoint.device.model in [
-            "lumi.motion.agl02",
-            "lumi.motion.ac02",
-            "lumi.motion.acn001",
-        ]:
-            attribute_names.update({101: ILLUMINANCE_MEASUREMENT})
-            if self.endpoint.device.model == "lumi.motion.ac02":
-                attribute_names.update({105: DETECTION_INTERVAL})
-                attribute_names.update({106: MOTION_SENSITIVITY})
-        elif self.endpoint.device.model == "lumi.motion.agl04":
-            attribute_names.update({102: DETECTION_INTERVAL})
-            attribute_names.update({105: MOTION_SENSITIVITY})
-            attribute_names.update({258: DETECTION_INTERVAL})
-            attribute_names.update({268: MOTION_SENSITIVITY})
-        elif self.endpoint.device.model == "lumi.motion.ac01":
-            attribute_names.update({5: POWER_OUTAGE_COUNT})
-            attribute_names.update({101: PRESENCE_DETECTED})
-            attribute_names.update({102: PRESENCE_EVENT})
-            attribute_names.update({103: MONITORING_MODE})
-            attribute_names.update({105: APPROACH_DISTANCE})
-            attribute_names.update({268: MOTION_SENSITIVITY})
-            attribute_names.update({322: PRESENCE_DETECTED})
-            attribute_names.update({323: PRESENCE_EVENT})
-            attribute_names.update({324: MONITORING_MODE})
-            attribute_names.update({326: APPROACH_DISTANCE})
-        elif self.endpoint.device.model == "lumi.sensor_smoke.acn03":
-            attribute_names.update({160: SMOKE})
-            attribute_names.update({161: SMOKE_DENSITY})
-            attribute_names.update({162: SELF_TEST})
-            attribute_names.update({163: BUZZER_MANUAL_MUTE})
-            attribute_names.update({164: HEARTBEAT_INDICATOR})
-            attribute_names.update({165: LINKAGE_ALARM})
-        result = {}
+    def _iter_aqara_attributes(
+        self, value: bytes
+    ) -> Iterator[tuple[XiaomiReportedAttribute, Any]]:
+        """Yield the attribute and value of every tag of an Aqara attribute report."""
+        tags = aqara_tag_table(self.endpoint.device.model)
 
         # Some attribute reports end with a stray null byte
         while value not in (b"", b"\x00"):
-            skey = int(value[0])
+            tag = value[0]
             svalue, value = foundation.TypeValue.deserialize(value[1:])
-            result[skey] = svalue.value
-        for item, val in result.items():
-            key = (
-                attribute_names[item]
-                if item in attribute_names
-                else "0xff01-" + str(item)
-            )
-            attributes[key] = val
+            attribute = tags.get(tag)
+            if attribute is None:
+                attribute = XiaomiReportedAttribute(f"0xff01-{tag}")
+            yield attribute, svalue.value
 
-        return attributes
+    def _parse_aqara_attributes(self, value):
+        """Parse non-standard attributes."""
+        return {
+            attribute.name: attr_value
+            for attribute, attr_value in self._iter_aqara_attributes(value)
+        }
 
     def _parse_mija_attributes(self, value):
         """Parse non-standard attributes."""
-        attribute_names = (
-            STATE,
-            BATTERY_VOLTAGE_MV,
-            XIAOMI_ATTR_3,
-            XIAOMI_ATTR_4,
-            XIAOMI_ATTR_5,
-            XIAOMI_ATTR_6,
-        )
-        result = []
-
-        for attr_value in value:
-            result.append(attr_value.value)
-        attributes = dict(zip(attribute_names, result))
-
-        return attributes
+        return dict(zip(MIJA_ATTRIBUTES, (attr_value.value for attr_value in value)))
 
 
 class BasicCluster(XiaomiCluster, Basic):
@@ -733,6 +879,59 @@ class OnOffCluster(OnOff, CustomCluster):
         )
 
 
+class XiaomiQuickInitIndex:
+    """Quick init quirks of a device registry by Xiaomi model.
+
+    The quirks of a model are filtered on its first lookup and reused for as
+    long as the registry holds the same quirks for that model. Checking this
+    doesn't copy them, so the registry doesn't need to be watched for changes.
+    """
+
+    def __init__(self, registry: DeviceRegistry) -> None:
+        """Init."""
+        self.registry = registry
+        # model -> (registered quirks, quick init quirks)
+        self._quirks: dict[
+            str, tuple[deque[type], tuple[type[XiaomiQuickInitDevice], ...]]
+        ] = {}
+
+    def get(self, model: str) -> tuple[type[XiaomiQuickInitDevice], ...]:
+        """Return the quick init quirks registered for a model, by priority."""
+        registered = self.registry.registry_v1.get(LUMI, {}).get(model)
+        if not registered:
+            self._quirks.pop(model, None)
+            return ()
+
+        cached = self._quirks.get(model)
+        if cached is not None and cached[0] == registered:
+            return cached[1]
+
+        quirks = tuple(
+            quirk for quirk in registered if issubclass(quirk, XiaomiQuickInitDevice)
+        )
+        self._quirks[model] = (deque(registered), quirks)
+        return quirks
+
+
+QUICK_INIT_INDEX = XiaomiQuickInitIndex(DEVICE_REGISTRY)
+
+
+def _is_attribute_report(message: bytes) -> bool:
+    """Check the ZCL header of a frame for a global `Report_Attributes` command."""
+    if not message:
+        return False
+
+    # the frame type is in the lowest two bits of the frame control, which is
+    # followed by a manufacturer code if bit 2 is set, the tsn and the command id
+    frame_control = message[0]
+    command_offset = 4 if frame_control & 0b100 else 2
+    return (
+        frame_control & 0b11 == foundation.FrameType.GLOBAL_COMMAND
+        and len(message) > command_offset
+        and message[command_offset] == foundation.GeneralCommand.Report_Attributes
+    )
+
+
 def handle_quick_init(
     sender: zigpy.device.Device,
     profile: int,
@@ -742,7 +941,9 @@ def handle_quick_init(
     message: bytes,
 ) -> bool | None:
     """Handle message from an uninitialized device which could be a xiaomi."""
-    if src_ep == 0:
+    # only Basic cluster attribute reports can hold the model, skip anything else
+    # before deserializing it
+    if src_ep == 0 or cluster != Basic.cluster_id or not _is_attribute_report(message):
         return
 
     hdr, data = foundation.ZCLHeader.deserialize(message)
@@ -754,12 +955,6 @@ def handle_quick_init(
         hdr,
         data,
     )
-    if hdr.frame_control.is_cluster:
-        return
-
-    if hdr.command_id not in foundation.COMMANDS:
-        sender.debug("Unknown ZCL global command: %s", hdr.command_id)
-        return
 
     try:
         params, data = foundation.COMMANDS[hdr.command_id].schema.deserialize(data)
@@ -769,12 +964,6 @@ def handle_quick_init(
 
     sender.debug("Uninitialized device command '%s' params: %s", hdr.command_id, params)
 
-    if (
-        hdr.command_id != foundation.GeneralCommand.Report_Attributes
-        or cluster != 0x0000
-    ):
-        return
-
     for attr_rec in params.attribute_reports:
         # model_name
         if attr_rec.attrid == 0x0005:
@@ -787,10 +976,7 @@ def handle_quick_init(
     if not model:
         return
 
-    for quirk in zigpy.quirks.get_quirk_list(LUMI, model):
-        if not issubclass(quirk, XiaomiQuickInitDevice):
-            continue
-
+    for quirk in QUICK_INIT_INDEX.get(model):
         sender.debug("Found '%s' quirk for '%s' model", quirk.__name__, model)
 
         try: